@@ -0,0 +1,573 @@
+#!/usr/bin/env python
+
+"""ROS-free acquisition of IMU samples with pluggable transports and sinks.
+
+``ImuAcquisition`` reads chunks of bytes from a transport, decodes them with
+``imu_protocol.PacketDecoder`` and hands every decoded batch with its
+timestamps to a list of sinks. All samples of a read arrived together, so
+the last one is stamped with the arrival time and the earlier ones are
+spread back by the sample period. A replay keeps the recorded timestamps.
+
+Transports (``read(timeout)`` returns the bytes received so far):
+
+- ``SerialTransport``: the Arduino connected over USB.
+- ``BleTransport``: the Arduino over BLE, scanned and connected on a
+  background asyncio loop.
+- ``ReplayTransport``: a log written by ``BinaryLogSink``, for offline
+  testing and benchmarking without hardware.
+
+Sinks (``write(samples, timestamps)`` and ``close()``):
+
+- ``RosSink``: publishes with ``imu_publishing.ImuRosPublisher``.
+- ``BinaryLogSink``: appends (timestamp, sample) records to a file.
+- ``UdpSink``: sends the same records as UDP datagrams.
+- ``SharedMemorySink``: publishes the same records to a ``SensorBus`` (see
+  src/sensor_bus.py) that other processes read without serialization.
+
+Serial, BLE and ROS dependencies are imported only when the corresponding
+transport or sink is created, so headless logging starts without them.
+
+Usage: python imu_acquisition.py <transport> [options] [--log <file>]
+    [--udp <host:port>] [--shm <name>] [--ros]
+
+Example: python imu_acquisition.py serial --port /dev/ttyACM0 --log imu.bin
+"""
+
+import argparse
+import asyncio
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+
+import numpy as np
+from imu_protocol import (
+    BINARY,
+    END_BYTES,
+    PACKET_DTYPE,
+    PROTOCOLS,
+    SAMPLE_DTYPE,
+    START_BYTES,
+    PacketDecoder,
+)
+
+# Shared utilities of the repository (common, profiling, sensor_bus) are
+# in src/.
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../src")
+)
+# pylint: disable=wrong-import-position
+import profiling  # noqa: E402
+
+from common import CLOCK  # noqa: E402
+
+# pylint: enable=wrong-import-position
+
+# Record layout of BinaryLogSink and UdpSink: arrival time in monotonic
+# nanoseconds (see common.Clock) followed by the sample.
+RECORD_DTYPE = np.dtype(
+    [("timestamp", "<i8"), ("quat", "<f4", (4,)), ("gyro", "<f4", (3,))]
+)
+# The firmware sends a sample per accelerometer and gyroscope reading, which
+# Arduino_LSM9DS1 configures at 119 Hz.
+DEFAULT_SAMPLE_RATE = 119.0
+# Records per UDP datagram, keeps datagrams below a typical 1500 byte MTU.
+UDP_RECORDS_PER_DATAGRAM = 1400 // RECORD_DTYPE.itemsize
+
+
+def to_records(samples: np.array, timestamps: np.array) -> np.array:
+    """Combine samples and their timestamps into RECORD_DTYPE records."""
+    records = np.empty(len(samples), dtype=RECORD_DTYPE)
+    records["timestamp"] = timestamps
+    records["quat"] = samples["quat"]
+    records["gyro"] = samples["gyro"]
+    return records
+
+
+def load_log(path: str) -> np.array:
+    """Load all records of a BinaryLogSink file."""
+    return np.fromfile(path, dtype=RECORD_DTYPE)
+
+
+class SerialTransport:
+    """Read the IMU byte stream from a serial port."""
+
+    finished = False
+
+    def __init__(self, port: str = "/dev/ttyACM0", baudrate: int = 115200):
+        """Open the serial port."""
+        import serial  # pylint: disable=import-outside-toplevel
+
+        self._serial = serial.Serial(port=port, baudrate=baudrate, timeout=0.1)
+
+    def read(self, timeout: float = 0.1) -> bytes:
+        """Wait up to timeout for data and return everything waiting."""
+        if self._serial.timeout != timeout:
+            # Changing the timeout reconfigures the port, only do it once.
+            self._serial.timeout = timeout
+        return self._serial.read(max(1, self._serial.in_waiting))
+
+    def close(self):
+        """Close the serial port."""
+        self._serial.close()
+
+
+class BleTransport:  # pylint: disable=too-many-instance-attributes
+    # Justification: connection parameters plus the background loop state.
+    """Receive the IMU byte stream over BLE on a background asyncio loop."""
+
+    finished = False
+
+    def __init__(
+        self,
+        device_name: str = "IMUGacha",
+        adapter: str = "hci0",
+        scan_time: float = 5,
+        service_uuid: str = None,
+    ):
+        """Scan for the device and connect to it.
+
+        Raises:
+            IOError: If the device is not found or the connection fails.
+        """
+        self.device_name = device_name
+        self.adapter = adapter
+        self.scan_time = scan_time
+        self.service_uuid = service_uuid
+        self._queue = queue.SimpleQueue()
+        self._connected = threading.Event()
+        self._stop = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(
+            target=lambda: asyncio.run(self._run()), daemon=True
+        )
+        self._thread.start()
+        self._connected.wait()
+        if self._error is not None:
+            raise IOError(self._error)
+
+    async def _run(self):
+        """Scan, connect and keep the connection open until closed."""
+        # pylint: disable=import-outside-toplevel
+        from ble_serial.bluetooth.ble_interface import BLE_interface
+        from ble_serial.scan import main as scanner
+
+        devices = await scanner.scan(
+            self.adapter, self.scan_time, self.service_uuid
+        )
+        target_id = None
+        for device_id, info in devices.items():
+            if info[0].name == self.device_name:
+                print(f"Found {info[0].name}!")
+                target_id = device_id
+                break
+        if target_id is None:
+            self._error = f"Could not find {self.device_name}!"
+            self._connected.set()
+            return
+
+        ble = BLE_interface(self.adapter, self.service_uuid)
+        ble.set_receiver(self._queue.put)
+        try:
+            await ble.connect(target_id, "public", 10.0)
+            await ble.setup_chars(None, None, "rw")
+        except Exception as error:  # pylint: disable=broad-except
+            # Justification: reported to the caller of the constructor.
+            self._error = f"Failed to connect to {self.device_name}: {error}"
+            self._connected.set()
+            return
+        self._connected.set()
+        try:
+            while not self._stop.is_set():
+                await asyncio.sleep(0.1)
+        finally:
+            await ble.disconnect()
+
+    def read(self, timeout: float = 0.1) -> bytes:
+        """Return the notifications received so far, joined."""
+        try:
+            chunks = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return b""
+        while True:
+            try:
+                chunks.append(self._queue.get_nowait())
+            except queue.Empty:
+                return b"".join(chunks)
+
+    def close(self):
+        """Disconnect and stop the background loop."""
+        self._stop.set()
+        self._thread.join()
+
+
+class ReplayTransport:
+    """Replay a BinaryLogSink file as a binary packet stream."""
+
+    protocol = BINARY
+
+    def __init__(
+        self, path: str, realtime: bool = False, chunk_samples: int = 32
+    ):
+        """Load the log and encode it as the firmware would send it.
+
+        Args:
+            path (str): Log file written by BinaryLogSink.
+            realtime (bool): Pace the replay by the recorded timestamps,
+                otherwise replay as fast as possible.
+            chunk_samples (int): Samples returned per read.
+        """
+        records = load_log(path)
+        packets = np.empty(len(records), dtype=PACKET_DTYPE)
+        packets["start"] = START_BYTES
+        packets["quat"] = records["quat"]
+        packets["gyro"] = records["gyro"]
+        packets["end"] = END_BYTES
+        self._stream = packets.tobytes()
+        self._recorded_ns = records["timestamp"]
+        self._timestamps = (
+            records["timestamp"]
+            - (records["timestamp"][0] if len(records) else 0)
+        ) * 1e-9
+        self._realtime = realtime
+        self._chunk_samples = chunk_samples
+        self._position = 0
+        self._num_stamped = 0
+        self._time_start = None
+
+    @property
+    def finished(self) -> bool:
+        """Whether the whole log has been replayed."""
+        return self._position >= len(self._timestamps)
+
+    def read(self, timeout: float = 0.1) -> bytes:
+        """Return the next chunk of packets."""
+        if self.finished:
+            return b""
+        end = min(self._position + self._chunk_samples, len(self._timestamps))
+        if self._realtime:
+            if self._time_start is None:
+                self._time_start = time.monotonic()
+            delay = self._timestamps[end - 1] - (
+                time.monotonic() - self._time_start
+            )
+            if delay > timeout:
+                time.sleep(timeout)
+                return b""
+            if delay > 0:
+                time.sleep(delay)
+        chunk = self._stream[
+            self._position
+            * PACKET_DTYPE.itemsize : end
+            * PACKET_DTYPE.itemsize
+        ]
+        self._position = end
+        return chunk
+
+    def sample_timestamps(self, num: int) -> np.array:
+        """Return the recorded timestamps of the next num decoded samples."""
+        timestamps = self._recorded_ns[
+            self._num_stamped : self._num_stamped + num
+        ]
+        self._num_stamped += num
+        return timestamps
+
+    def close(self):
+        """Nothing to release."""
+
+
+class RosSink:
+    """Publish samples to ROS, see imu_publishing.ImuRosPublisher."""
+
+    stage_name = "imu.sink.ros"
+
+    def __init__(self, node_name: str = "quaternion_visualization", **rates):
+        """Initialize the ROS node if necessary and create the publishers.
+
+        Args:
+            node_name (str): Name of the ROS node.
+            rates: Per-topic rates passed to ImuRosPublisher.
+        """
+        # pylint: disable=import-outside-toplevel
+        import rospy
+        from imu_publishing import ImuRosPublisher
+
+        self._rospy = rospy
+        if not rospy.core.is_initialized():
+            rospy.init_node(node_name)
+        self._publisher = ImuRosPublisher(clock=CLOCK, **rates)
+
+    @property
+    def finished(self) -> bool:
+        """Whether ROS is shutting down."""
+        return self._rospy.is_shutdown()
+
+    def write(self, samples: np.array, timestamps: np.array):
+        """Queue samples for publishing."""
+        self._publisher.submit(samples, timestamps)
+
+    def close(self):
+        """Publish the queued samples and stop publishing."""
+        self._publisher.close()
+
+
+class BinaryLogSink:
+    """Append samples with timestamps to a binary file of RECORD_DTYPE."""
+
+    stage_name = "imu.sink.log"
+    finished = False
+
+    def __init__(self, path: str):
+        """Open the log file for appending."""
+        self._file = open(path, "ab")  # pylint: disable=consider-using-with
+        # Justification: closed in close().
+
+    def write(self, samples: np.array, timestamps: np.array):
+        """Append the records of a batch."""
+        self._file.write(to_records(samples, timestamps).tobytes())
+
+    def close(self):
+        """Close the log file."""
+        self._file.close()
+
+
+class UdpSink:
+    """Send samples with timestamps as RECORD_DTYPE records over UDP."""
+
+    stage_name = "imu.sink.udp"
+    finished = False
+
+    def __init__(self, host: str, port: int):
+        """Create the socket, records are sent to (host, port)."""
+        self._address = (host, port)
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def write(self, samples: np.array, timestamps: np.array):
+        """Send the records of a batch in as few datagrams as possible."""
+        data = to_records(samples, timestamps).tobytes()
+        step = UDP_RECORDS_PER_DATAGRAM * RECORD_DTYPE.itemsize
+        for start in range(0, len(data), step):
+            self._socket.sendto(data[start : start + step], self._address)
+
+    def close(self):
+        """Close the socket."""
+        self._socket.close()
+
+
+class SharedMemorySink:
+    """Publish samples with timestamps as RECORD_DTYPE records to a bus."""
+
+    stage_name = "imu.sink.shm"
+    finished = False
+
+    def __init__(self, name: str, capacity: int = 65536):
+        """Create the bus, other processes attach with sensor_bus.BusReader.
+
+        Args:
+            name (str): Name of the shared-memory bus.
+            capacity (int): Records kept in the ring buffer.
+        """
+        # pylint: disable=import-outside-toplevel
+        from sensor_bus import SensorBus
+
+        self.bus = SensorBus.create(name, RECORD_DTYPE, capacity)
+
+    def write(self, samples: np.array, timestamps: np.array):
+        """Publish the records of a batch."""
+        self.bus.publish(to_records(samples, timestamps))
+
+    def close(self):
+        """Remove the bus."""
+        self.bus.close()
+
+
+class ImuAcquisition:
+    """Decode samples from a transport and distribute them to sinks."""
+
+    def __init__(
+        self,
+        transport,
+        sinks=(),
+        protocol: str = BINARY,
+        sample_rate: float = DEFAULT_SAMPLE_RATE,
+    ):
+        """Create the acquisition.
+
+        Args:
+            transport: SerialTransport, BleTransport or ReplayTransport.
+            sinks (list): Objects with write(samples, timestamps) and close(),
+                optionally a stage_name for profiling.
+            protocol (str): Framing of the samples, see imu_protocol.
+            sample_rate (float): Rate of the firmware in Hz, spreads the
+                timestamps of samples received in the same read.
+
+        Raises:
+            ValueError: If the transport only supports another protocol.
+        """
+        transport_protocol = getattr(transport, "protocol", protocol)
+        if transport_protocol != protocol:
+            raise ValueError(
+                f"{type(transport).__name__} only supports the "
+                f"{transport_protocol} protocol, not {protocol}"
+            )
+        self.transport = transport
+        self.sinks = list(sinks)
+        self.decoder = PacketDecoder(protocol)
+        self.sample_period_ns = int(1e9 / sample_rate)
+        self.num_samples = 0
+
+    def poll(self, timeout: float = 0.1) -> np.array:
+        """Read and decode one chunk and pass it to all sinks.
+
+        Returns:
+            array(N,): The decoded samples with dtype SAMPLE_DTYPE.
+        """
+        with profiling.timer("imu.read"):
+            data = self.transport.read(timeout)
+        if not data:
+            return np.empty(0, dtype=SAMPLE_DTYPE)
+        timestamp = CLOCK.now_ns()
+        with profiling.timer("imu.decode"):
+            samples = self.decoder.feed(data)
+        if len(samples):
+            timestamps = self._timestamps(len(samples), timestamp)
+            for sink in self.sinks:
+                with profiling.timer(getattr(sink, "stage_name", "imu.sink")):
+                    sink.write(samples, timestamps)
+            self.num_samples += len(samples)
+        return samples
+
+    def _timestamps(self, num: int, arrival_ns: int) -> np.array:
+        """Return the timestamps of num samples decoded at arrival_ns."""
+        if hasattr(self.transport, "sample_timestamps"):
+            return self.transport.sample_timestamps(num)
+        # The last sample arrived last, the others one period apart before.
+        return arrival_ns - self.sample_period_ns * np.arange(
+            num - 1, -1, -1, dtype=np.int64
+        )
+
+    @property
+    def finished(self) -> bool:
+        """Whether the transport or any sink has finished."""
+        return self.transport.finished or any(
+            getattr(sink, "finished", False) for sink in self.sinks
+        )
+
+    def run(self, stop_event: threading.Event = None, duration: float = None):
+        """Poll until stopped, finished or duration seconds have passed."""
+        time_end = None if duration is None else time.monotonic() + duration
+        while not self.finished:
+            if stop_event is not None and stop_event.is_set():
+                break
+            if time_end is not None and time.monotonic() >= time_end:
+                break
+            self.poll()
+
+    def close(self):
+        """Close the transport and all sinks."""
+        self.transport.close()
+        for sink in self.sinks:
+            sink.close()
+
+
+def create_transport(args):
+    """Create the transport selected on the command line."""
+    if args.transport == "serial":
+        return SerialTransport(args.port, args.baudrate)
+    if args.transport == "ble":
+        return BleTransport(args.device_name, args.adapter)
+    return ReplayTransport(args.replay_file, realtime=args.realtime)
+
+
+def create_sinks(args):
+    """Create the sinks selected on the command line."""
+    sinks = []
+    if args.log:
+        sinks.append(BinaryLogSink(args.log))
+    if args.udp:
+        host, port = args.udp.rsplit(":", 1)
+        sinks.append(UdpSink(host, int(port)))
+    if args.shm:
+        sinks.append(SharedMemorySink(args.shm))
+    if args.ros:
+        sinks.append(RosSink())
+    return sinks
+
+
+def add_transport_arguments(parser):
+    """Add the transport selection options to parser."""
+    parser.add_argument(
+        "transport", choices=("serial", "ble", "replay"), help="Data source."
+    )
+    parser.add_argument("--port", default="/dev/ttyACM0", help="Serial port.")
+    parser.add_argument("--baudrate", type=int, default=115200)
+    parser.add_argument(
+        "--protocol",
+        choices=PROTOCOLS,
+        default=BINARY,
+        help="Framing of the samples, the firmware sends binary packets. "
+        "Replays are always binary.",
+    )
+    parser.add_argument(
+        "--sample_rate",
+        type=float,
+        default=DEFAULT_SAMPLE_RATE,
+        help="Sample rate of the firmware in Hz, to timestamp samples that "
+        "are received together.",
+    )
+    parser.add_argument("--device_name", default="IMUGacha")
+    parser.add_argument("--adapter", default="hci0")
+    parser.add_argument("--replay_file", help="Log to replay.")
+    parser.add_argument(
+        "--realtime",
+        action="store_true",
+        help="Replay at the recorded rate instead of as fast as possible.",
+    )
+
+
+def main():
+    """Acquire IMU samples from the command line."""
+    parser = argparse.ArgumentParser(description="Acquire IMU samples.")
+    add_transport_arguments(parser)
+    parser.add_argument("--log", help="Append samples to this binary log.")
+    parser.add_argument("--udp", help="Send samples to host:port over UDP.")
+    parser.add_argument(
+        "--shm", help="Publish samples to a shared-memory bus of this name."
+    )
+    parser.add_argument(
+        "--ros", action="store_true", help="Publish samples to ROS."
+    )
+    parser.add_argument(
+        "--duration", type=float, default=None, help="Stop after seconds."
+    )
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+    if args.transport == "replay" and args.protocol != BINARY:
+        parser.error("replay logs are replayed as binary packets")
+
+    acquisition = ImuAcquisition(
+        create_transport(args),
+        create_sinks(args),
+        protocol=args.protocol,
+        sample_rate=args.sample_rate,
+    )
+    time_start = time.monotonic()
+    with profiling.session(args.profile, "imu_acquisition"):
+        try:
+            acquisition.run(duration=args.duration)
+        except KeyboardInterrupt:
+            print("Interrupted by user")
+        finally:
+            acquisition.close()
+    elapsed = time.monotonic() - time_start
+    print(
+        f"Acquired {acquisition.num_samples} samples in {elapsed:.2f} s "
+        f"({acquisition.num_samples / max(elapsed, 1e-9):.0f} samples/s), "
+        f"skipped {acquisition.decoder.num_skipped_bytes} bytes"
+    )
+
+
+if __name__ == "__main__":
+    main()
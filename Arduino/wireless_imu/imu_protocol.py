@@ -0,0 +1,152 @@
+"""Decoding of the IMU sample stream sent by wireless_imu.ino.
+
+Every sample is 7 floats: quaternion (w, x, y, z) and rotational velocity
+(x, y, z in rad/s). Two framings are supported:
+
+- binary: the packed 32 byte struct the firmware sends over serial and BLE,
+  ``<H7fH`` with start bytes 0xFCFD and end bytes 0xFAFB.
+- csv: one line ``qw,qx,qy,qz,gx,gy,gz`` per sample.
+
+``PacketDecoder`` accepts arbitrary chunks of the byte stream (e.g. everything
+that is waiting on the serial port, or one BLE notification), keeps
+incomplete samples for the next chunk and decodes all complete samples of a
+chunk at once into a NumPy structured array with ``SAMPLE_DTYPE``. Garbage
+between binary packets is skipped by searching for the start and end bytes.
+"""
+
+import numpy as np
+
+START_BYTES = 0xFCFD
+END_BYTES = 0xFAFB
+
+# Layout of one binary packet, see packed_struct_bytearray in the firmware.
+PACKET_DTYPE = np.dtype(
+    [
+        ("start", "<u2"),
+        ("quat", "<f4", (4,)),
+        ("gyro", "<f4", (3,)),
+        ("end", "<u2"),
+    ]
+)
+PACKET_SIZE = PACKET_DTYPE.itemsize
+
+# Decoded samples, quaternion in (w, x, y, z) order.
+SAMPLE_DTYPE = np.dtype([("quat", "<f4", (4,)), ("gyro", "<f4", (3,))])
+
+_START = np.frombuffer(np.uint16(START_BYTES).astype("<u2").tobytes(), "u1")
+_END = np.frombuffer(np.uint16(END_BYTES).astype("<u2").tobytes(), "u1")
+
+BINARY = "binary"
+CSV = "csv"
+PROTOCOLS = (BINARY, CSV)
+
+
+def _find_packets(data: np.array) -> np.array:
+    """Return the offsets of non-overlapping valid packets in data."""
+    last = len(data) - PACKET_SIZE
+    if last < 0:
+        return np.empty(0, dtype=np.intp)
+    num = last + 1
+    candidates = np.flatnonzero(
+        (data[:num] == _START[0])
+        & (data[1 : num + 1] == _START[1])
+        & (data[PACKET_SIZE - 2 : PACKET_SIZE - 2 + num] == _END[0])
+        & (data[PACKET_SIZE - 1 : PACKET_SIZE - 1 + num] == _END[1])
+    )
+    if len(candidates) < 2 or np.all(np.diff(candidates) >= PACKET_SIZE):
+        return candidates
+    # A payload float happened to contain a start/end pattern, keep the
+    # first candidate of every overlapping run.
+    offsets = []
+    next_free = 0
+    for offset in candidates:
+        if offset >= next_free:
+            offsets.append(offset)
+            next_free = offset + PACKET_SIZE
+    return np.array(offsets, dtype=np.intp)
+
+
+class PacketDecoder:
+    """Incrementally decode chunks of the IMU byte stream."""
+
+    def __init__(self, protocol: str = BINARY):
+        """Create a decoder.
+
+        Args:
+            protocol (str): "binary" or "csv".
+        """
+        if protocol not in PROTOCOLS:
+            raise ValueError(f"Unknown protocol {protocol}, use {PROTOCOLS}")
+        self.protocol = protocol
+        self._buffer = bytearray()
+        self.num_skipped_bytes = 0
+
+    def feed(self, data: bytes) -> np.array:
+        """Decode all complete samples in the buffered stream plus data.
+
+        Args:
+            data (bytes): Next chunk of the byte stream.
+
+        Returns:
+            array(N,): Decoded samples with dtype SAMPLE_DTYPE.
+        """
+        self._buffer += data
+        if self.protocol == BINARY:
+            return self._decode_binary()
+        return self._decode_csv()
+
+    def _decode_binary(self) -> np.array:
+        """Decode binary packets, resyncing on the start and end bytes."""
+        data = np.frombuffer(self._buffer, dtype=np.uint8)
+        offsets = _find_packets(data)
+        if len(offsets) == 0:
+            # Keep the tail that may be the beginning of the next packet.
+            consumed = max(0, len(data) - PACKET_SIZE + 1)
+            self.num_skipped_bytes += consumed
+            del data
+            del self._buffer[:consumed]
+            return np.empty(0, dtype=SAMPLE_DTYPE)
+
+        if offsets[0] == 0 and offsets[-1] == (len(offsets) - 1) * PACKET_SIZE:
+            # Common case: contiguous packets, view the bytes directly.
+            packets = data[: len(offsets) * PACKET_SIZE].view(PACKET_DTYPE)
+        else:
+            indices = offsets[:, None] + np.arange(PACKET_SIZE)
+            packets = data[indices].reshape(-1).view(PACKET_DTYPE)
+        samples = np.empty(len(packets), dtype=SAMPLE_DTYPE)
+        samples["quat"] = packets["quat"]
+        samples["gyro"] = packets["gyro"]
+
+        consumed = int(offsets[-1]) + PACKET_SIZE
+        self.num_skipped_bytes += consumed - len(offsets) * PACKET_SIZE
+        del data, packets
+        del self._buffer[:consumed]
+        return samples
+
+    def _decode_csv(self) -> np.array:
+        """Decode complete lines with 7 comma separated values."""
+        end = self._buffer.rfind(b"\n")
+        if end < 0:
+            return np.empty(0, dtype=SAMPLE_DTYPE)
+        lines = bytes(self._buffer[:end]).split(b"\n")
+        del self._buffer[: end + 1]
+        # Lines that were cut off while syncing to the stream are dropped.
+        lines = [line for line in lines if line.count(b",") == 6]
+        if not lines:
+            return np.empty(0, dtype=SAMPLE_DTYPE)
+        try:
+            values = np.array(b",".join(lines).split(b","), dtype=np.float32)
+        except ValueError:
+            values = np.array(
+                [_parse_csv_line(line) for line in lines], dtype=np.float32
+            )
+            values = values[~np.isnan(values).any(axis=1)]
+        return values.reshape(-1, 7).view(SAMPLE_DTYPE).reshape(-1)
+
+
+def _parse_csv_line(line: bytes) -> list:
+    """Parse one CSV line, returning NaNs if it is malformed."""
+    try:
+        return [float(value) for value in line.split(b",")]
+    except ValueError:
+        return [np.nan] * 7
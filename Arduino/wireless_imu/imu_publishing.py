@@ -0,0 +1,200 @@
+"""Rate-limited, batched publishing of IMU samples to ROS.
+
+``ImuRosPublisher`` decouples reception from publishing: receivers hand over
+whole batches of decoded samples with ``submit``, which never blocks, and a
+background thread publishes them. Each topic has its own rate:
+
+- ``imu/samples`` (std_msgs/Float64MultiArray): every sample, one message per
+  batch, rows of [arrival wall time, qw, qx, qy, qz, gx, gy, gz].
+- ``imu/quat`` (QuaternionStamped) and ``imu/gyro`` (TwistStamped): every
+  sample by default, optionally decimated.
+- ``visualization_marker`` (Marker): decimated to a rate rviz can display.
+
+All messages are preallocated once. rospy serializes a message inside
+``publish``, so the same object can be filled and published again right
+after.
+"""
+
+import queue
+import threading
+
+import numpy as np
+import rospy
+from geometry_msgs.msg import QuaternionStamped, TwistStamped
+from std_msgs.msg import Float64MultiArray, MultiArrayDimension
+from visualization_msgs.msg import Marker
+
+
+class _Decimator:  # pylint: disable=too-few-public-methods
+    """Select samples so that a topic is published at most at a given rate."""
+
+    def __init__(self, rate_hz: float = None):
+        """Create a decimator, rate_hz None keeps every sample."""
+        self._period = None if not rate_hz else int(1e9 / rate_hz)
+        self._next_time = -np.inf
+
+    def select(self, timestamps: np.array) -> np.array:
+        """Return the indices of the samples to publish, timestamps in ns."""
+        if self._period is None:
+            return np.arange(len(timestamps))
+        selected = []
+        # At most a few samples per batch pass, so this loop is short.
+        idx = np.searchsorted(timestamps, self._next_time)
+        while idx < len(timestamps):
+            selected.append(idx)
+            self._next_time = timestamps[idx] + self._period
+            idx = np.searchsorted(timestamps, self._next_time, side="left")
+        return np.array(selected, dtype=np.intp)
+
+
+class ImuRosPublisher:  # pylint: disable=too-many-instance-attributes
+    # Justification: one publisher, message and decimator per topic.
+    """Publish IMU samples on a background thread with per-topic rates."""
+
+    def __init__(
+        self,
+        clock,
+        quat_rate: float = None,
+        gyro_rate: float = None,
+        marker_rate: float = 30.0,
+        frame_id: str = "map",
+    ):
+        """Create the publishers and start the publishing thread.
+
+        rospy.init_node must have been called before.
+
+        Args:
+            clock (common.Clock): Converts the monotonic arrival timestamps
+                to wall-clock time for the message headers.
+            quat_rate (float): Max rate of imu/quat in Hz, None for all.
+            gyro_rate (float): Max rate of imu/gyro in Hz, None for all.
+            marker_rate (float): Max rate of the rviz marker in Hz.
+            frame_id (str): Frame of the rviz marker.
+        """
+        self.samples_pub = rospy.Publisher(
+            "imu/samples", Float64MultiArray, queue_size=100
+        )
+        self.quat_pub = rospy.Publisher(
+            "imu/quat", QuaternionStamped, queue_size=100
+        )
+        self.gyro_pub = rospy.Publisher(
+            "imu/gyro", TwistStamped, queue_size=100
+        )
+        self.marker_pub = rospy.Publisher(
+            "visualization_marker", Marker, queue_size=1
+        )
+        self._quat_decimator = _Decimator(quat_rate)
+        self._gyro_decimator = _Decimator(gyro_rate)
+        self._marker_decimator = _Decimator(marker_rate)
+
+        self._samples_msg = Float64MultiArray()
+        self._samples_msg.layout.dim = [
+            MultiArrayDimension(label="sample", size=0, stride=0),
+            MultiArrayDimension(label="value", size=8, stride=8),
+        ]
+        self._quat_msg = QuaternionStamped()
+        self._gyro_msg = TwistStamped()
+        self._marker_msg = Marker()
+        self._marker_msg.header.frame_id = frame_id
+        self._marker_msg.type = Marker.CUBE
+        self._marker_msg.action = Marker.ADD
+        # try to match dimension of Arduino
+        self._marker_msg.scale.x = 0.044
+        self._marker_msg.scale.y = 0.018
+        self._marker_msg.scale.z = 0.005
+        self._marker_msg.color.a = 1.0
+        self._marker_msg.color.r = 1.0
+        self._marker_msg.color.g = 0.0
+        self._marker_msg.color.b = 0.0
+
+        self._clock = clock
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, samples: np.array, timestamps):
+        """Queue a batch of samples for publishing, never blocks.
+
+        Args:
+            samples (array(N,)): Samples with dtype imu_protocol.SAMPLE_DTYPE.
+            timestamps (int or array(N,)): Arrival time(s) in monotonic ns.
+        """
+        if len(samples):
+            timestamps = np.broadcast_to(
+                np.asarray(timestamps, dtype=np.int64), (len(samples),)
+            )
+            self._queue.put((samples, timestamps))
+
+    def close(self):
+        """Publish the queued samples and stop the publishing thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        """Publish queued batches until close is called."""
+        while True:
+            batches = [self._queue.get()]
+            # Publish everything that queued up during a stall at once.
+            while True:
+                try:
+                    batches.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batches[-1] is None
+            batches = [batch for batch in batches if batch is not None]
+            if batches:
+                self._publish(
+                    np.concatenate([batch[0] for batch in batches]),
+                    np.concatenate([batch[1] for batch in batches]),
+                )
+            if stop or rospy.is_shutdown():
+                return
+
+    def _publish(self, samples: np.array, timestamps: np.array):
+        """Publish one batch on all topics according to their rates."""
+        values = samples.view((np.float32, 7))
+        wall_times = self._clock.to_wall(timestamps)
+
+        table = np.empty((len(samples), 8), dtype=np.float64)
+        table[:, 0] = wall_times
+        table[:, 1:] = values
+        self._samples_msg.layout.dim[0].size = len(samples)
+        self._samples_msg.layout.dim[0].stride = table.size
+        self._samples_msg.data = table.ravel().tolist()
+        self.samples_pub.publish(self._samples_msg)
+
+        msg = self._quat_msg
+        for idx in self._quat_decimator.select(timestamps):
+            msg.header.stamp = rospy.Time.from_sec(wall_times[idx])
+            (
+                msg.quaternion.w,
+                msg.quaternion.x,
+                msg.quaternion.y,
+                msg.quaternion.z,
+            ) = values[idx, :4].tolist()
+            self.quat_pub.publish(msg)
+
+        msg = self._gyro_msg
+        for idx in self._gyro_decimator.select(timestamps):
+            msg.header.stamp = rospy.Time.from_sec(wall_times[idx])
+            (
+                msg.twist.angular.x,
+                msg.twist.angular.y,
+                msg.twist.angular.z,
+            ) = values[idx, 4:].tolist()
+            self.gyro_pub.publish(msg)
+
+        msg = self._marker_msg
+        selected = self._marker_decimator.select(timestamps)
+        if len(selected):
+            # Only the newest orientation is visible in rviz.
+            idx = selected[-1]
+            msg.header.stamp = rospy.Time.from_sec(wall_times[idx])
+            orientation = msg.pose.orientation
+            (
+                orientation.w,
+                orientation.x,
+                orientation.y,
+                orientation.z,
+            ) = values[idx, :4].tolist()
+            self.marker_pub.publish(msg)
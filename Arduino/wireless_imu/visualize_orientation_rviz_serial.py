@@ -1,93 +1,79 @@
 #!/usr/bin/env python
 
-import rospy
-import serial
-from geometry_msgs.msg import Quaternion, QuaternionStamped, TwistStamped
-from visualization_msgs.msg import Marker
+import argparse
+
+# imu_acquisition makes the modules in src/ importable, e.g. profiling
+from imu_acquisition import (
+    ImuAcquisition,
+    RosSink,
+    SerialTransport,
+    profiling,
+)
+from imu_protocol import BINARY, PROTOCOLS
 
 """
 minimal script to receive quaternion data from Arduino and visualize it in rviz
 add the /visualization_marker topic in rviz
 """
 
-# Initialize ROS Node
-rospy.init_node("quaternion_visualization")
-
-# Publisher for the Marker message for rviz
-marker_pub = rospy.Publisher("visualization_marker", Marker, queue_size=10)
-quatstamped_pub = rospy.Publisher("imu/quat", QuaternionStamped, queue_size=10)
-twiststamped_pub = rospy.Publisher("imu/gyro", TwistStamped, queue_size=10)
-
-
-def publish_QuaternionStamped(qw, qx, qy, qz):
-    msg = QuaternionStamped()
-    msg.header.stamp = rospy.Time.now()
-    msg.quaternion.w = qw
-    msg.quaternion.x = qx
-    msg.quaternion.y = qy
-    msg.quaternion.z = qz
-    quatstamped_pub.publish(msg)
-
-
-def publish_TwistStamped(gyro_x, gyro_y, gyro_z):
-    msg = TwistStamped()
-    msg.header.stamp = rospy.Time.now()
-    msg.twist.angular.x = gyro_x
-    msg.twist.angular.y = gyro_y
-    msg.twist.angular.z = gyro_z
-    twiststamped_pub.publish(msg)
-
-
-def publish_marker(qw, qx, qy, qz):
-    marker = Marker()
-    marker.header.frame_id = "map"
-    marker.type = marker.CUBE
-    marker.action = marker.ADD
-    # try to match dimension of Arduino
-    marker.scale.x = 0.044
-    marker.scale.y = 0.018
-    marker.scale.z = 0.005
-    marker.color.a = 1.0
-    marker.color.r = 1.0
-    marker.color.g = 0.0
-    marker.color.b = 0.0
 
-    quaternion = Quaternion()
-    quaternion.w = float(qw)
-    quaternion.x = float(qx)
-    quaternion.y = float(qy)
-    quaternion.z = float(qz)
+def add_publishing_arguments(parser):
+    """Add the per-topic rate options of ImuRosPublisher to parser."""
+    parser.add_argument(
+        "--quat_rate",
+        type=float,
+        default=None,
+        help="Max rate of imu/quat in Hz (default: every sample).",
+    )
+    parser.add_argument(
+        "--gyro_rate",
+        type=float,
+        default=None,
+        help="Max rate of imu/gyro in Hz (default: every sample).",
+    )
+    parser.add_argument(
+        "--marker_rate",
+        type=float,
+        default=30.0,
+        help="Max rate of the rviz marker in Hz.",
+    )
 
-    marker.pose.orientation = quaternion
 
-    marker_pub.publish(marker)
+def create_ros_sink(args):
+    """Create the ROS sink with the rates given on the command line."""
+    return RosSink(
+        quat_rate=args.quat_rate,
+        gyro_rate=args.gyro_rate,
+        marker_rate=args.marker_rate,
+    )
 
 
 if __name__ == "__main__":
-    # Configure the serial connections
-    ser = serial.Serial(
-        port="/dev/ttyACM0",  # Change this to your serial port
-        baudrate=115200,
+    parser = argparse.ArgumentParser(
+        description="Visualize IMU orientation received over serial in rviz."
     )
-    try:
-        while not rospy.is_shutdown():
-            if ser.inWaiting():
-                data = (
-                    ser.readline().decode().strip()
-                )  # Read data from serial port
-                q = data.split(",")
-                if len(q) == 7:  # Check if we have 4 components
-                    quaternion = Quaternion()
-                    quaternion.x = float(q[1])
-                    quaternion.y = float(q[2])
-                    quaternion.z = float(q[3])
-                    quaternion.w = float(q[0])
-                    gyro_x = float(q[4])
-                    gyro_y = float(q[5])
-                    gyro_z = float(q[6])
-
-                    publish_marker(
-                        quaternion.x, quaternion.y, quaternion.z, quaternion.w
-                    )
-    except rospy.ROSInterruptException:
-        pass
+    parser.add_argument(
+        "--port", default="/dev/ttyACM0", help="Serial port of the Arduino."
+    )
+    parser.add_argument("--baudrate", type=int, default=115200)
+    parser.add_argument(
+        "--protocol",
+        choices=PROTOCOLS,
+        default=BINARY,
+        help="Framing of the samples, the firmware sends binary packets.",
+    )
+    add_publishing_arguments(parser)
+    profiling.add_argument(parser)
+    args, _ = parser.parse_known_args()  # ROS may append remapping args
+
+    acquisition = ImuAcquisition(
+        SerialTransport(args.port, args.baudrate),
+        [create_ros_sink(args)],
+        protocol=args.protocol,
+    )
+    with profiling.session(args.profile, "imu_serial"):
+        try:
+            # Runs until ROS shuts down
+            acquisition.run()
+        finally:
+            acquisition.close()
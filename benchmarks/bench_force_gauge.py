@@ -0,0 +1,56 @@
+"""Benchmarks of the ForceGauge frame parser over an in-memory stream."""
+
+import numpy as np
+import pytest
+import synthetic
+from force_events import (
+    DerivativeDetector,
+    HysteresisDetector,
+    ThresholdDetector,
+)
+
+from force_gauge import ForceGauge
+
+FRAME_COUNTS = [100, 1000, 10000]
+
+
+@pytest.mark.parametrize("num_frames", FRAME_COUNTS)
+def test_feed_stream(benchmark, num_frames):
+    """Parse a stream of frames passed at once."""
+    data = synthetic.force_gauge_stream(num_frames)
+    gauge = ForceGauge(port=None)
+    benchmark(gauge.feed, data, 0)
+    assert gauge.force_unit == "Newton"
+
+
+@pytest.mark.parametrize("num_frames", FRAME_COUNTS)
+def test_feed_frames(benchmark, num_frames):
+    """Parse a stream frame by frame, as it arrives at 9600 baud."""
+    frames = synthetic.chunks(synthetic.force_gauge_stream(num_frames), 16)
+    gauge = ForceGauge(port=None)
+
+    def feed_all():
+        for frame in frames:
+            gauge.feed(frame, 0)
+
+    benchmark(feed_all)
+
+
+@pytest.mark.parametrize("num_frames", FRAME_COUNTS)
+def test_detectors(benchmark, num_frames):
+    """Threshold, hysteresis and derivative detectors on one batch."""
+    records = ForceGauge(port=None).feed(
+        synthetic.force_gauge_stream(num_frames), 0
+    )
+    records["timestamp"] = np.arange(num_frames) * 20000000
+    detectors = [
+        ThresholdDetector("threshold", 0.0),
+        HysteresisDetector("contact", 100.0, -100.0),
+        DerivativeDetector("spike", 1e5),
+    ]
+
+    def detect():
+        for detector in detectors:
+            detector.process(records)
+
+    benchmark(detect)
@@ -0,0 +1,90 @@
+"""Benchmarks of the geometry utilities from 10 to 10^6 points."""
+
+import numpy as np
+import pytest
+import synthetic
+
+from geometry import (
+    camera_project_3d_to_pixel,
+    camera_project_points,
+    camera_unproject_pixel_to_world,
+    project_points_to_plane,
+    triangulate_points,
+)
+
+POINT_COUNTS = [10, 1000, 100000, 1000000]
+# camera_unproject_pixel_to_world appends point by point, which is quadratic
+# in the number of points.
+MAX_UNPROJECT_POINTS = 10000
+
+
+@pytest.mark.parametrize("num_points", POINT_COUNTS)
+def test_project_3d_to_pixel(benchmark, num_points):
+    """Pinhole projection of a 3xN array."""
+    points = np.ascontiguousarray(synthetic.points_3d(num_points).T)
+    benchmark(camera_project_3d_to_pixel, points, synthetic.CAMERA_MATRIX)
+
+
+@pytest.mark.parametrize("jacobian", [False, True])
+@pytest.mark.parametrize("num_points", POINT_COUNTS)
+def test_project_points(benchmark, num_points, jacobian):
+    """Projection of (N, 3) points with distortion, optionally Jacobians."""
+    benchmark(
+        camera_project_points,
+        synthetic.points_3d(num_points),
+        synthetic.CAMERA_MATRIX,
+        synthetic.DISTORTION,
+        jacobian,
+    )
+
+
+@pytest.mark.parametrize("num_points", POINT_COUNTS)
+def test_unproject_pixel_to_world(benchmark, num_points):
+    """Undistortion and unprojection at a known depth."""
+    if num_points > MAX_UNPROJECT_POINTS:
+        pytest.skip("quadratic in the number of points")
+    benchmark(
+        camera_unproject_pixel_to_world,
+        synthetic.pixels(num_points),
+        np.array([1.0]),
+        synthetic.CAMERA_MATRIX,
+        synthetic.DISTORTION,
+    )
+
+
+@pytest.mark.parametrize("num_points", POINT_COUNTS)
+def test_project_points_to_plane(benchmark, num_points):
+    """Central projection of a 3xN array onto the plane z = 1."""
+    points = np.ascontiguousarray(synthetic.points_3d(num_points).T)
+    benchmark(
+        project_points_to_plane,
+        points,
+        np.zeros((3, 1)),
+        np.array([0.0, 0.0, 1.0, -1.0]),
+    )
+
+
+@pytest.mark.parametrize("num_points", POINT_COUNTS)
+def test_triangulate_points(benchmark, num_points):
+    """DLT triangulation from three distorted views."""
+    points = synthetic.points_3d(num_points)
+    extrinsics = np.zeros((3, 3, 4))
+    extrinsics[:, :, :3] = np.eye(3)
+    extrinsics[:, 0, 3] = (0.0, -0.3, 0.3)
+    pixels = np.stack(
+        [
+            camera_project_points(
+                points + extrinsics[idx, :, 3],
+                synthetic.CAMERA_MATRIX,
+                synthetic.DISTORTION,
+            )
+            for idx in range(3)
+        ]
+    )
+    benchmark(
+        triangulate_points,
+        pixels,
+        np.stack([synthetic.CAMERA_MATRIX] * 3),
+        extrinsics,
+        np.stack([synthetic.DISTORTION] * 3),
+    )
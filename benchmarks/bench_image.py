@@ -0,0 +1,17 @@
+"""Benchmarks of image inversion at several sizes and modes."""
+
+import pytest
+import synthetic
+from inversion import invert_image
+
+SIZES = [256, 1024, 4096]
+MODES = ["L", "RGB", "RGBA", "P", "I;16", "F"]
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("size", SIZES)
+def test_invert_image(benchmark, size, mode):
+    """Invert a size x size noise image."""
+    image = synthetic.image(size, mode)
+    inverted = benchmark(invert_image, image)
+    assert inverted.mode == image.mode
@@ -0,0 +1,45 @@
+"""Benchmarks of IMU packet decoding."""
+
+import pytest
+import synthetic
+from imu_protocol import BINARY, CSV, PacketDecoder
+
+SAMPLE_COUNTS = [100, 10000, 100000]
+# Payload of one BLE notification.
+BLE_CHUNK_SIZE = 244
+
+
+def _decode_all(protocol, chunks):
+    """Decode all chunks with a new decoder and return the sample count."""
+    decoder = PacketDecoder(protocol)
+    return sum(len(decoder.feed(chunk)) for chunk in chunks)
+
+
+@pytest.mark.parametrize("num_samples", SAMPLE_COUNTS)
+def test_decode_binary(benchmark, num_samples):
+    """Decode a clean binary stream received at once."""
+    data = synthetic.imu_binary_stream(num_samples)
+    assert benchmark(_decode_all, BINARY, [data]) == num_samples
+
+
+@pytest.mark.parametrize("num_samples", SAMPLE_COUNTS)
+def test_decode_binary_resync(benchmark, num_samples):
+    """Decode a binary stream with a garbage byte every 10 packets."""
+    data = synthetic.imu_binary_stream(num_samples, garbage_every=10)
+    assert benchmark(_decode_all, BINARY, [data]) == num_samples
+
+
+@pytest.mark.parametrize("num_samples", SAMPLE_COUNTS)
+def test_decode_binary_ble_chunks(benchmark, num_samples):
+    """Decode a binary stream split into BLE notifications."""
+    data = synthetic.chunks(
+        synthetic.imu_binary_stream(num_samples), BLE_CHUNK_SIZE
+    )
+    assert benchmark(_decode_all, BINARY, data) == num_samples
+
+
+@pytest.mark.parametrize("num_samples", SAMPLE_COUNTS)
+def test_decode_csv(benchmark, num_samples):
+    """Decode CSV lines received at once."""
+    data = synthetic.imu_csv_stream(num_samples)
+    assert benchmark(_decode_all, CSV, [data]) == num_samples
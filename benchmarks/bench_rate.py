@@ -0,0 +1,17 @@
+"""Benchmark of the timing jitter of common.Rate.
+
+The statistics of one round are the periods of the loop, so stddev is the
+jitter and max the worst overshoot.
+"""
+
+import pytest
+
+from common import Rate
+
+
+@pytest.mark.parametrize("period_sec", [0.001, 0.01])
+def test_rate_jitter(benchmark, period_sec):
+    """Sleep for 100 periods."""
+    rate = Rate(period_sec)
+    benchmark.extra_info["period_sec"] = period_sec
+    benchmark.pedantic(rate.sleep, rounds=100, warmup_rounds=5)
@@ -0,0 +1,103 @@
+"""Benchmarks of the frame loops of scripts/video on a generated clip."""
+
+import shutil
+
+import cv2
+import numpy as np
+import pytest
+import synthetic
+from frame_reader import FrameReader
+from trackers import FlowTracker
+from video_writer import VideoWriter
+
+NUM_FRAMES = 150
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    """Return the path of a generated 320x240 clip."""
+    path = tmp_path_factory.mktemp("video") / "clip.mp4"
+    return synthetic.video(str(path), num_frames=NUM_FRAMES)
+
+
+def _read_all(path):
+    """Decode all frames with cv2.VideoCapture and return their count."""
+    cap = cv2.VideoCapture(path)
+    count = 0
+    while cap.read()[0]:
+        count += 1
+    cap.release()
+    return count
+
+
+def test_decode(benchmark, clip):
+    """Sequential decoding, the loop of track_markers."""
+    assert benchmark(_read_all, clip) == NUM_FRAMES
+
+
+@pytest.mark.parametrize("backend", ["cv2", "ffmpeg"])
+def test_invert(benchmark, clip, tmp_path, backend):
+    """Decode, invert and encode every frame, the loop of invert_video."""
+    if backend == "ffmpeg" and shutil.which("ffmpeg") is None:
+        pytest.skip("ffmpeg is not installed")
+    output = str(tmp_path / "inverted.mp4")
+
+    def invert_all():
+        cap = cv2.VideoCapture(clip)
+        writer = VideoWriter(
+            output,
+            cap.get(cv2.CAP_PROP_FPS),
+            (
+                int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            ),
+            backend=backend,
+        )
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            writer.write(cv2.bitwise_not(frame))
+        cap.release()
+        writer.release()
+
+    benchmark(invert_all)
+
+
+@pytest.mark.parametrize("step", [1, -1])
+def test_frame_reader_scrub(benchmark, clip, step):
+    """Scrub through the clip forwards or backwards, as scroll_thru_video."""
+    frame_numbers = range(NUM_FRAMES)[::step]
+
+    def setup():
+        return (FrameReader(clip, prefetch=0, use_keyframe_index=False),), {}
+
+    def scrub(reader):
+        with reader:
+            for frame_number in frame_numbers:
+                reader.get(frame_number)
+
+    benchmark.pedantic(scrub, setup=setup, rounds=3)
+
+
+def test_flow_tracker(benchmark, clip):
+    """Optical flow of 50 markers through the clip, as --tracker flow."""
+    cap = cv2.VideoCapture(clip)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    rng = np.random.default_rng(synthetic.SEED)
+    height, width = frames[0].shape[:2]
+    corners = rng.uniform((0, 0), (width - 16, height - 16), (50, 2))
+    bboxes = np.hstack((corners, np.full((50, 2), 16.0)))
+
+    def track():
+        tracker = FlowTracker(frames[0], bboxes, redetect=False)
+        for frame in frames[1:]:
+            tracker.update(frame)
+
+    benchmark(track)
@@ -0,0 +1,15 @@
+"""Make the modules of the repository importable from the benchmarks."""
+
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for directory in (
+    "src",
+    "src/force_gauge",
+    "scripts/image",
+    "scripts/video",
+    "Arduino/wireless_imu",
+):
+    sys.path.insert(0, os.path.join(REPO_DIR, directory))
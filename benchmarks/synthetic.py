@@ -0,0 +1,117 @@
+"""Generators of synthetic sensor data, images and videos for benchmarks.
+
+All generators are seeded, so every run benchmarks the same data.
+"""
+
+import cv2
+import numpy as np
+from imu_protocol import END_BYTES, PACKET_DTYPE, START_BYTES
+from PIL import Image
+
+SEED = 0
+
+# fx, fy, cx, cy of a 1280x720 camera and moderate barrel distortion.
+CAMERA_MATRIX = np.array(
+    [[900.0, 0.0, 640.0], [0.0, 900.0, 360.0], [0.0, 0.0, 1.0]]
+)
+DISTORTION = np.array([-0.1, 0.05, 0.001, -0.001, 0.0])
+
+
+def points_3d(num_points: int) -> np.array:
+    """Return (N, 3) points in front of the camera, 0.5 to 2 m away."""
+    rng = np.random.default_rng(SEED)
+    points = rng.uniform(-0.5, 0.5, (num_points, 3))
+    points[:, 2] = rng.uniform(0.5, 2.0, num_points)
+    return points
+
+
+def pixels(num_points: int) -> np.array:
+    """Return (N, 2) pixel coordinates inside the camera image."""
+    rng = np.random.default_rng(SEED)
+    return rng.uniform((0, 0), (1280, 720), (num_points, 2))
+
+
+def force_gauge_stream(num_frames: int) -> bytes:
+    """Return the bytes of num_frames RS-Pro gauge frames in Newton."""
+    rng = np.random.default_rng(SEED)
+    values = rng.integers(0, 10**8, num_frames)
+    signs = rng.integers(0, 2, num_frames)
+    return b"".join(
+        b"\x024159%d2%08d\r" % (sign, value)
+        for sign, value in zip(signs, values)
+    )
+
+
+def imu_samples(num_samples: int) -> np.array:
+    """Return (N, 7) float32 samples: unit quaternions and gyro rates."""
+    rng = np.random.default_rng(SEED)
+    values = rng.normal(size=(num_samples, 7)).astype(np.float32)
+    values[:, :4] /= np.linalg.norm(values[:, :4], axis=1, keepdims=True)
+    return values
+
+
+def imu_binary_stream(num_samples: int, garbage_every: int = 0) -> bytes:
+    """Return binary IMU packets, optionally with a garbage byte in between.
+
+    Args:
+        num_samples (int): Number of packets.
+        garbage_every (int): Insert one garbage byte after every this many
+            packets, 0 for a clean stream.
+    """
+    values = imu_samples(num_samples)
+    packets = np.empty(num_samples, dtype=PACKET_DTYPE)
+    packets["start"] = START_BYTES
+    packets["quat"] = values[:, :4]
+    packets["gyro"] = values[:, 4:]
+    packets["end"] = END_BYTES
+    if not garbage_every:
+        return packets.tobytes()
+    return b"\x00".join(
+        packets[start : start + garbage_every].tobytes()
+        for start in range(0, num_samples, garbage_every)
+    )
+
+
+def imu_csv_stream(num_samples: int) -> bytes:
+    """Return IMU samples as CSV lines."""
+    return "".join(
+        ",".join(f"{value:.6f}" for value in row) + "\n"
+        for row in imu_samples(num_samples)
+    ).encode()
+
+
+def chunks(data: bytes, size: int) -> list:
+    """Split data into chunks of size bytes, e.g. BLE notifications."""
+    return [data[start : start + size] for start in range(0, len(data), size)]
+
+
+def image(size: int, mode: str) -> Image.Image:
+    """Return a size x size noise image in mode."""
+    rng = np.random.default_rng(SEED)
+    if mode == "I;16":
+        pixels_u16 = rng.integers(0, 65536, (size, size), dtype=np.uint16)
+        return Image.frombytes("I;16", (size, size), pixels_u16.tobytes())
+    if mode == "F":
+        return Image.fromarray(rng.random((size, size), dtype=np.float32))
+    rgba = rng.integers(0, 256, (size, size, 4), dtype=np.uint8)
+    base = Image.fromarray(rgba, "RGBA")
+    if mode == "P":
+        return base.convert("RGB").quantize(256)
+    return base.convert(mode)
+
+
+def video(path: str, num_frames: int = 150, width: int = 320, fps=30.0):
+    """Write a clip of a moving dot over noise and return its path."""
+    rng = np.random.default_rng(SEED)
+    height = width * 3 // 4
+    writer = cv2.VideoWriter(
+        path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height)
+    )
+    background = rng.integers(0, 64, (height, width, 3), dtype=np.uint8)
+    for idx in range(num_frames):
+        frame = background.copy()
+        center = (idx * 3 % width, height // 2)
+        cv2.circle(frame, center, 6, (255, 255, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return path
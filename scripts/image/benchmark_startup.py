@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+"""Benchmark the startup time of the terminal image inverter.
+
+Usage: python3 benchmark_startup.py [--runs <runs>] [--size <pixels>]
+
+Example: python3 benchmark_startup.py --runs 50 --size 256
+
+Runs invert_image_terminal.py on a generated image the given number of
+times, the same way shell pipelines call it, and compares the wall-clock
+time per call against a bare interpreter start. The modules that are
+imported at startup are listed as well, so GUI or clipboard dependencies
+that sneak back into the startup path are easy to spot.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from PIL import Image
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+INVERTER = os.path.join(SCRIPT_DIR, "invert_image_terminal.py")
+# Modules that must not be imported when inverting a single file.
+LAZY_MODULES = ("tkinter", "numpy", "multiprocessing", "PIL.ImageGrab")
+
+
+def time_command(command, runs):
+    """Return the wall-clock times in ms of running command repeatedly."""
+    times = []
+    for _ in range(runs):
+        time_start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        times.append((time.perf_counter() - time_start) * 1000)
+    return times
+
+
+def imported_modules(command):
+    """Return the top-level modules imported by a python command."""
+    result = subprocess.run(
+        [command[0], "-X", "importtime"] + command[1:],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            modules.add(line.rsplit("|", 1)[1].strip())
+    return modules
+
+
+def main():
+    """Run the benchmark and print a summary."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the startup of invert_image_terminal.py."
+    )
+    parser.add_argument("--runs", type=int, default=20, help="Repetitions.")
+    parser.add_argument(
+        "--size", type=int, default=256, help="Edge length of the image."
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path = os.path.join(tmp_dir, "image.png")
+        output_path = os.path.join(tmp_dir, "image-inverted.png")
+        Image.new("RGBA", (args.size, args.size), (10, 20, 30, 255)).save(
+            input_path
+        )
+        command = [
+            sys.executable,
+            INVERTER,
+            "-i",
+            input_path,
+            "-o",
+            output_path,
+        ]
+
+        baseline = time_command([sys.executable, "-c", "pass"], args.runs)
+        inverter = time_command(command, args.runs)
+        modules = imported_modules(command)
+
+    print(f"{'':24}{'median':>10}{'min':>10}{'max':>10}  [ms]")
+    for name, times in (("python -c pass", baseline), ("inverter", inverter)):
+        print(
+            f"{name:24}{statistics.median(times):10.1f}"
+            f"{min(times):10.1f}{max(times):10.1f}"
+        )
+    overhead = statistics.median(inverter) - statistics.median(baseline)
+    print(f"Inverter overhead over interpreter start: {overhead:.1f} ms")
+
+    eager = [module for module in LAZY_MODULES if module in modules]
+    if eager:
+        print(f"WARNING: imported at startup: {', '.join(eager)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Color inversion of PIL images, shared by the image inverter tools.
+
+Only the color channels are inverted, alpha and padding channels are kept:
+
+- 8-bit modes (1, L, LA, RGB, RGBA, RGBX, CMYK, ...) are inverted with a
+  single lookup-table pass over all bands, without splitting and merging
+  channels.
+- Palette modes (P, PA) only invert the palette, which is a few hundred
+  bytes regardless of the image size.
+- 16-bit (I;16*), 32-bit integer (I) and float (F) modes are inverted in
+  place on a writable NumPy copy of the image, against a fixed range per
+  mode, so that a value inverts the same way in every image: I;16* and I
+  (how 16-bit files are usually loaded) against [0, 65535], F against
+  [0, 255] (x becomes 255 - x, as 8-bit images converted to F). I images
+  with values outside [0, 65535] have no known range and are rejected with
+  a ValueError.
+
+NumPy is only imported for the palette and array paths, which keeps the
+startup of the command line tools short for the common 8-bit images.
+"""
+
+from PIL import Image
+
+# Value ranges of the array modes, for the help of the command line tools.
+RANGES_HELP = (
+    "16-bit and 32-bit integer images are inverted against [0, 65535], "
+    "float images against [0, 255]."
+)
+# Bands that are not inverted.
+PASSTHROUGH_BANDS = ("A", "a", "X")
+
+_INVERTED_LUT = list(range(255, -1, -1))
+_IDENTITY_LUT = list(range(256))
+
+
+def _invert_lut(image: Image.Image) -> Image.Image:
+    """Invert all color bands of an 8-bit image with one lookup table."""
+    lut = []
+    for band in image.getbands():
+        lut += _IDENTITY_LUT if band in PASSTHROUGH_BANDS else _INVERTED_LUT
+    return image.point(lut)
+
+
+def _invert_palette(image: Image.Image) -> Image.Image:
+    """Invert the palette colors of a P or PA image."""
+    import numpy as np  # pylint: disable=import-outside-toplevel
+
+    inverted_image = image.copy()
+    if image.palette is None:
+        return inverted_image
+    palette_mode = image.palette.mode
+    palette = np.array(image.getpalette(palette_mode), dtype=np.uint8)
+    colors = palette.reshape(-1, len(palette_mode))
+    for idx, band in enumerate(palette_mode):
+        if band not in PASSTHROUGH_BANDS:
+            np.subtract(255, colors[:, idx], out=colors[:, idx])
+    inverted_image.putpalette(palette.tobytes(), palette_mode)
+    return inverted_image
+
+
+def _invert_array(image: Image.Image) -> Image.Image:
+    """Invert a single band 16-bit, 32-bit integer or float image."""
+    import numpy as np  # pylint: disable=import-outside-toplevel
+
+    # np.array copies the pixel data once into a writable buffer, which is
+    # then inverted in place.
+    pixels = np.array(image)
+    if image.mode == "F":
+        np.subtract(255.0, pixels, out=pixels)
+        return Image.fromarray(pixels)
+    max_value = np.iinfo(np.uint16).max
+    if image.mode == "I" and pixels.size:
+        if pixels.min() < 0 or pixels.max() > max_value:
+            raise ValueError(
+                "Cannot invert a 32-bit integer image with values outside "
+                f"[0, {max_value}]"
+            )
+    np.subtract(max_value, pixels, out=pixels, casting="unsafe")
+    return Image.fromarray(pixels)
+
+
+def invert_image(image: Image.Image) -> Image.Image:
+    """Invert the colors of a PIL Image, keeping alpha channels.
+
+    Args:
+        image (PIL.Image.Image): Image in any mode supported by Pillow.
+
+    Returns:
+        PIL.Image.Image: Inverted image in the same mode.
+    """
+    if image.mode in ("P", "PA"):
+        return _invert_palette(image)
+    if image.mode.startswith("I") or image.mode == "F":
+        return _invert_array(image)
+    return _invert_lut(image)
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+
+"""Invert the colors of all images in one or more folders.
+
+Usage: python3 invert_batch.py <folder or image> [...] [-o <output folder>]
+
+Example: python3 invert_batch.py ~/Pictures/screenshots -o ~/inverted -j 8
+
+Inverted images are saved next to the originals with an "-inverted" suffix,
+or with their original name into the output folder if one is given. Images
+found in subfolders keep their path relative to the searched folder there,
+so images with the same name in different subfolders do not overwrite each
+other. The output folder must not be or lie inside a searched folder. Images
+that already carry the suffix are skipped, as are images whose inverted
+version is newer than the original, so the script can be run repeatedly on
+the same folder.
+
+Folders are walked lazily and images are inverted in a pool of worker
+processes. Every output is written to a temporary file first and then
+renamed, so an interrupted run never leaves truncated images behind.
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import multiprocessing
+import os
+import sys
+
+from inversion import RANGES_HELP, invert_image
+from PIL import Image
+
+# Shared utilities of the repository (profiling) are in src/.
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../src")
+)
+import profiling  # noqa: E402 pylint: disable=wrong-import-position
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff")
+SUFFIX = "-inverted"
+
+InversionResult = collections.namedtuple(
+    "InversionResult", ["input_path", "output_path", "status", "error"]
+)
+INVERTED = "inverted"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+
+def is_image_path(path):
+    """Return whether path is an image that has not been inverted yet."""
+    name, ext = os.path.splitext(path)
+    return ext.lower() in IMAGE_EXTENSIONS and not name.endswith(SUFFIX)
+
+
+def _scan_folder(folder, recursive, prefix=""):
+    """Yield the image files in a folder one directory entry at a time."""
+    with os.scandir(folder) as entries:
+        subfolders = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subfolders.append(entry)
+            elif entry.is_file() and is_image_path(entry.name):
+                yield entry.path, os.path.join(prefix, entry.name)
+    if recursive:
+        for subfolder in subfolders:
+            yield from _scan_folder(
+                subfolder.path, recursive, os.path.join(prefix, subfolder.name)
+            )
+
+
+def find_images(paths, recursive=False):
+    """Yield the image files in the given files and folders.
+
+    Args:
+        paths (list): Image files and folders.
+        recursive (bool): Also search subfolders.
+
+    Yields:
+        tuple: Path of the image and its path relative to the searched
+            folder (its file name if it was given directly).
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            yield from _scan_folder(path, recursive)
+        else:
+            yield path, os.path.basename(path)
+
+
+def check_output_dir(paths, output_dir):
+    """Raise a ValueError if output_dir would overwrite or re-scan inputs.
+
+    The output folder must not be or lie inside a searched folder, or be
+    the folder of an image given directly. The inverted images would
+    otherwise overwrite the originals or be found and inverted again while
+    the folder is searched.
+    """
+    if not output_dir:
+        return
+    output_dir = os.path.realpath(output_dir)
+    for path in paths:
+        if os.path.isdir(path):
+            folder = os.path.realpath(path)
+            inside = os.path.commonpath([folder, output_dir]) == folder
+        else:
+            folder = os.path.dirname(os.path.realpath(path))
+            inside = folder == output_dir
+        if inside:
+            raise ValueError(
+                f"The output folder {output_dir} would mix the inverted "
+                f"images with the input {path}, choose another one"
+            )
+
+
+def output_path_for(input_path, output_dir=None, relative_path=None):
+    """Return the path the inverted version of input_path is saved to.
+
+    Args:
+        input_path (str): Path of the image.
+        output_dir (str): Folder to save the inverted image to. If None, it
+            is saved next to the original.
+        relative_path (str): Path of the inverted image inside output_dir,
+            by default the file name of the image.
+    """
+    if output_dir:
+        return os.path.join(
+            output_dir, relative_path or os.path.basename(input_path)
+        )
+    root, ext = os.path.splitext(input_path)
+    return f"{root}{SUFFIX}{ext}"
+
+
+def is_up_to_date(input_path, output_path):
+    """Return whether output_path exists and is newer than input_path."""
+    try:
+        return os.stat(output_path).st_mtime >= os.stat(input_path).st_mtime
+    except FileNotFoundError:
+        return False
+
+
+def invert_file(input_path, output_path):
+    """Invert a single image file and save the result atomically.
+
+    Returns:
+        str: output_path.
+    """
+    directory, filename = os.path.split(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    name, ext = os.path.splitext(filename)
+    # Keep the extension so that PIL picks the same format.
+    tmp_path = os.path.join(directory, f".{name}.{os.getpid()}.tmp{ext}")
+    try:
+        with Image.open(input_path) as image:
+            invert_image(image).save(tmp_path)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return output_path
+
+
+def create_executor(max_workers=None):
+    """Return a process pool for invert_files.
+
+    Worker processes are spawned instead of forked, so the pool can also be
+    used from a GUI application that runs threads.
+    """
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def invert_files(
+    images, output_dir=None, executor=None, force=False, max_workers=None
+):  # pylint: disable=too-many-arguments
+    # Justification: all arguments configure the batch.
+    """Invert images in parallel and yield a result for each of them.
+
+    images is consumed lazily, only a few images per worker are queued at
+    any time. Results are yielded in completion order.
+
+    Args:
+        images (iterable): Path and relative output path of every image to
+            invert, as yielded by find_images.
+        output_dir (str): Folder to save the inverted images to, under their
+            relative paths. If None, they are saved next to the originals.
+        executor (concurrent.futures.Executor): Pool to run the inversions
+            in. If None, a process pool is created for this batch.
+        force (bool): Also invert images whose output is up to date.
+        max_workers (int): Number of worker processes if executor is None.
+
+    Yields:
+        InversionResult: input and output path, status and error message.
+    """
+    own_executor = executor is None
+    if own_executor:
+        executor = create_executor(max_workers)
+    max_pending = 2 * (max_workers or os.cpu_count() or 1)
+    pending = {}
+    try:
+        for input_path, relative_path in images:
+            output_path = output_path_for(
+                input_path, output_dir, relative_path
+            )
+            if not force and is_up_to_date(input_path, output_path):
+                yield InversionResult(input_path, output_path, SKIPPED, None)
+                continue
+            future = executor.submit(invert_file, input_path, output_path)
+            pending[future] = (input_path, output_path)
+            if len(pending) >= max_pending:
+                done, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                yield from _collect(done, pending)
+        while pending:
+            done, _ = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            yield from _collect(done, pending)
+    finally:
+        if own_executor:
+            executor.shutdown(cancel_futures=True)
+
+
+def _collect(done, pending):
+    """Yield the results of finished futures and remove them from pending."""
+    for future in done:
+        input_path, output_path = pending.pop(future)
+        error = future.exception()
+        if error is None:
+            yield InversionResult(input_path, output_path, INVERTED, None)
+        else:
+            yield InversionResult(input_path, output_path, FAILED, str(error))
+
+
+def main():
+    """Parse the command line and invert all images."""
+    parser = argparse.ArgumentParser(
+        description="Invert colors of all images in folders.",
+        epilog=RANGES_HELP,
+    )
+    parser.add_argument(
+        "paths", nargs="+", help="Image files or folders with images."
+    )
+    parser.add_argument(
+        "-o",
+        "--output_dir",
+        help="Folder to save the inverted images to. If not provided, they "
+        f"are saved next to the originals with a '{SUFFIX}' suffix.",
+    )
+    parser.add_argument(
+        "-r", "--recursive", action="store_true", help="Search subfolders."
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: number of CPUs).",
+    )
+    parser.add_argument(
+        "-f",
+        "--force",
+        action="store_true",
+        help="Also invert images whose inverted version is up to date.",
+    )
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
+    try:
+        check_output_dir(args.paths, args.output_dir)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    counts = collections.Counter()
+    with profiling.session(args.profile, "invert_batch"):
+        results = invert_files(
+            find_images(args.paths, args.recursive),
+            output_dir=args.output_dir,
+            force=args.force,
+            max_workers=args.jobs,
+        )
+        while True:
+            # The images are inverted in worker processes, the main process
+            # only sees how long it waits for the next result.
+            with profiling.timer("wait_result"):
+                result = next(results, None)
+            if result is None:
+                break
+            counts[result.status] += 1
+            if result.status == INVERTED:
+                print(f"Inverted image saved to {result.output_path}")
+            elif result.status == FAILED:
+                print(f"Failed to process {result.input_path}: {result.error}")
+    print(
+        f"{counts[INVERTED]} inverted, {counts[SKIPPED]} up to date, "
+        f"{counts[FAILED]} failed"
+    )
+    sys.exit(1 if counts[FAILED] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,40 @@
 #!/Users/gavin/opt/miniforge3/bin/python3
 
+import collections
 import os
+import queue
 import sys
+import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 
-from PIL import Image, ImageGrab, ImageTk
-from tkinterdnd2 import DND_FILES, TkinterDnD
+import invert_batch
+from inversion import invert_image
+from PIL import Image
+
+# tkinterdnd2 and ImageGrab are imported where they are used: the worker
+# processes of the batch pool re-import this module and never need them.
+
+# Failed files listed in the summary dialog of a batch.
+MAX_LISTED_FAILURES = 20
 
 
 class ImageInverter:
     def __init__(self):
+        # Dropped files are inverted by a process pool that is created on the
+        # first drop, a background thread reports the results through a queue
+        # so that the window stays responsive.
+        self.executor = None
+        self.results = queue.Queue()
+        self.batch_counts = collections.Counter()
+        self.batch_failures = []
+        self.batch_running = False
         self.setup_window()
 
     def setup_window(self):
+        # pylint: disable-next=import-outside-toplevel
+        from tkinterdnd2 import DND_FILES, TkinterDnD
+
         self.root = TkinterDnD.Tk()
         self.root.title("Image Inverter")
         self.root.geometry("400x250")
@@ -28,7 +49,7 @@ class ImageInverter:
 
         self.chk_save_as = ttk.Checkbutton(
             self.root,
-            text="Choose save location for inverted image",
+            text="Choose save location for inverted images",
             variable=self.save_var,
         )
         self.chk_save_as.pack(pady=10)
@@ -40,19 +61,18 @@ class ImageInverter:
         )
         self.get_from_clipboard.pack(pady=10)
 
+        self.progress = ttk.Label(self.root, text="")
+        self.progress.pack(pady=10)
+
         self.root.drop_target_register(DND_FILES)
         self.root.dnd_bind("<<Drop>>", self.handle_drop)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
 
-    def invert_image(self, image):
-        if image.mode == "RGBA":
-            r, g, b, a = image.split()
-            rgb_image = Image.merge("RGB", (r, g, b))
-            inverted_image = Image.eval(rgb_image, lambda x: 255 - x)
-            r, g, b = inverted_image.split()
-            inverted_image = Image.merge("RGBA", (r, g, b, a))
-        else:
-            inverted_image = Image.eval(image, lambda x: 255 - x)
-        return inverted_image
+    def close(self):
+        """Stop the worker processes and close the window."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
 
     def save_image(self, image, output_path):
         image.save(output_path)
@@ -71,28 +91,101 @@ class ImageInverter:
 
     def handle_image_from_clipboard(self):
         """Attempts to invert an image from the clipboard and save it."""
+        from PIL import ImageGrab  # pylint: disable=import-outside-toplevel
+
         image = ImageGrab.grabclipboard()
         if image:
-            inverted_image = self.invert_image(image)
+            inverted_image = invert_image(image)
             output_path = self.ensure_valid_output_path()
             self.save_image(inverted_image, output_path)
         else:
             messagebox.showerror("Error", f"No image found in clipboard.")
 
     def handle_drop(self, event):
-        """Handle the drop event for image files."""
-        for filename in self.root.tk.splitlist(event.data):
+        """Invert dropped image files and folders in the background."""
+        if self.batch_running:
+            messagebox.showerror(
+                "Error", "Still inverting the previously dropped images."
+            )
+            return
+        paths = self.root.tk.splitlist(event.data)
+        output_dir = None
+        if self.save_var.get():
+            output_dir = filedialog.askdirectory(
+                title="Folder for the inverted images"
+            )
+            if not output_dir:
+                return
             try:
-                image = Image.open(filename)
-                inverted_image = self.invert_image(image)
-                output_path = self.ensure_valid_output_path(
-                    input_path=filename
-                )
-                self.save_image(inverted_image, output_path)
-            except Exception as e:
-                messagebox.showerror(
-                    "Error", f"Failed to process {filename}\n{e}"
+                invert_batch.check_output_dir(paths, output_dir)
+            except ValueError as error:
+                messagebox.showerror("Error", str(error))
+                return
+        if self.executor is None:
+            self.executor = invert_batch.create_executor()
+
+        self.batch_running = True
+        self.batch_counts.clear()
+        self.batch_failures.clear()
+        self.progress.config(text="Inverting...")
+        threading.Thread(
+            target=self.run_batch, args=(paths, output_dir), daemon=True
+        ).start()
+        self.root.after(100, self.poll_batch)
+
+    def run_batch(self, paths, output_dir):
+        """Invert all images on a background thread (no Tk calls here)."""
+        try:
+            for result in invert_batch.invert_files(
+                invert_batch.find_images(paths, recursive=True),
+                output_dir=output_dir,
+                executor=self.executor,
+            ):
+                self.results.put(result)
+        finally:
+            self.results.put(None)
+
+    def poll_batch(self):
+        """Show the progress of the running batch and a summary at its end.
+
+        Failures are collected while the batch runs and listed once in the
+        summary.
+        """
+        finished = False
+        while True:
+            try:
+                result = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if result is None:
+                finished = True
+                break
+            self.batch_counts[result.status] += 1
+            if result.status == invert_batch.FAILED:
+                self.batch_failures.append(
+                    f"{result.input_path}: {result.error}"
                 )
+        counts = self.batch_counts
+        summary = (
+            f"{counts[invert_batch.INVERTED]} inverted, "
+            f"{counts[invert_batch.SKIPPED]} up to date, "
+            f"{counts[invert_batch.FAILED]} failed"
+        )
+        self.progress.config(text=summary)
+        if not finished:
+            self.root.after(100, self.poll_batch)
+            return
+        self.batch_running = False
+        if not self.batch_failures:
+            messagebox.showinfo("Done", summary)
+            return
+        failures = self.batch_failures[:MAX_LISTED_FAILURES]
+        num_unlisted = len(self.batch_failures) - len(failures)
+        if num_unlisted:
+            failures.append(f"... and {num_unlisted} more")
+        messagebox.showerror(
+            "Done", f"{summary}\n\nFailed to process\n" + "\n".join(failures)
+        )
 
     def ensure_valid_output_path(self, output_path=None, input_path=None):
         if not output_path:
@@ -3,24 +3,19 @@
 import argparse
 import os
 import sys
-from tkinter import Tk, simpledialog
 
-from PIL import Image, ImageGrab
+from inversion import RANGES_HELP, invert_image
+from PIL import Image
 
+# Shared utilities of the repository (profiling) are in src/.
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../src")
+)
+import profiling  # noqa: E402 pylint: disable=wrong-import-position
 
-def invert_image(image):
-    """
-    Inverts the colors of a PIL Image object, handling RGBA images as well.
-    """
-    if image.mode == "RGBA":
-        r, g, b, a = image.split()
-        rgb_image = Image.merge("RGB", (r, g, b))
-        inverted_image = Image.eval(rgb_image, lambda x: 255 - x)
-        r, g, b = inverted_image.split()
-        inverted_image = Image.merge("RGBA", (r, g, b, a))
-    else:
-        inverted_image = Image.eval(image, lambda x: 255 - x)
-    return inverted_image
+# This tool is called many times from shell pipelines, so everything that is
+# only needed for the clipboard, dialog or folder paths (tkinter, ImageGrab,
+# the process pool) is imported where that path is taken.
 
 
 def append_to_filename(filepath, suffix):
@@ -36,16 +31,47 @@ def save_image(image, output_path):
 
 def handle_image_from_file(image_path, output_path=None):
     """Inverts an image from a file and saves it."""
-    image = Image.open(image_path)
+    with profiling.timer("open"):
+        image = Image.open(image_path)
+        image.load()
     if not output_path:
         root, ext = os.path.splitext(image_path)
         output_path = f"{root}-inverted{ext}"
-    inverted_image = invert_image(image)
-    save_image(inverted_image, output_path)
+    with profiling.timer("invert"):
+        inverted_image = invert_image(image)
+    with profiling.timer("save"):
+        save_image(inverted_image, output_path)
+
+
+def handle_images_from_folder(folder, output_dir=None, jobs=None):
+    """Inverts all images in a folder and its subfolders in parallel.
+
+    Returns the number of images that could not be inverted. Raises a
+    ValueError if output_dir is or lies inside the folder.
+    """
+    import invert_batch  # pylint: disable=import-outside-toplevel
+
+    invert_batch.check_output_dir([folder], output_dir)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    num_failed = 0
+    for result in invert_batch.invert_files(
+        invert_batch.find_images([folder], recursive=True),
+        output_dir=output_dir,
+        max_workers=jobs,
+    ):
+        if result.status == invert_batch.INVERTED:
+            print(f"Inverted image saved to {result.output_path}")
+        elif result.status == invert_batch.FAILED:
+            print(f"Failed to process {result.input_path}: {result.error}")
+            num_failed += 1
+    return num_failed
 
 
 def handle_image_from_clipboard(output_path):
     """Attempts to invert an image from the clipboard and save it."""
+    from PIL import ImageGrab  # pylint: disable=import-outside-toplevel
+
     image = ImageGrab.grabclipboard()
     if image:
         inverted_image = invert_image(image)
@@ -54,13 +80,28 @@ def handle_image_from_clipboard(output_path):
         print("No image found in clipboard.")
 
 
+def ask_output_filename():
+    """Asks for the output filename in a dialog, returns None if cancelled."""
+    # pylint: disable-next=import-outside-toplevel
+    from tkinter import Tk, simpledialog
+
+    Tk().withdraw()  # Hide the main tkinter window
+    # GUI dialog to ask for the filename directly
+    return simpledialog.askstring(
+        "Save As", "Enter filename for the inverted image:"
+    )
+
+
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Invert colors of an image.")
+    parser = argparse.ArgumentParser(
+        description="Invert colors of an image.", epilog=RANGES_HELP
+    )
     parser.add_argument(
         "-i",
         "--input",
         type=str,
-        help="Path to the image file to be inverted.",
+        help="Path to the image file to be inverted, or a folder whose "
+        "images are all inverted.",
     )
     parser.add_argument(
         "-o",
@@ -68,21 +109,36 @@ if __name__ == "__main__":
         type=str,
         help="Path to save the inverted image. If not provided, prompts for input or saves with a default name.",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of worker processes when --input is a folder.",
+    )
+    profiling.add_argument(parser)
 
     args = parser.parse_args()
-    if not args.output and args.input:
-        args.output = append_to_filename(args.input, "-inverted")
-    else:
-        Tk().withdraw()  # Hide the main tkinter window
-        # GUI dialog to ask for the filename directly
-        args.output = simpledialog.askstring(
-            "Save As", "Enter filename for the inverted image:"
-        )
-        if not args.output:
-            print("No filename provided. Exiting.")
-            sys.exit(1)
-
-    if args.input:
-        handle_image_from_file(args.input, args.output)
-    else:
-        handle_image_from_clipboard(args.output)
+    with profiling.session(args.profile, "invert_image_terminal"):
+        if args.input and os.path.isdir(args.input):
+            # Batch mode: --output is the folder for the inverted images, by
+            # default they are saved next to the originals.
+            try:
+                num_failed = handle_images_from_folder(
+                    args.input, args.output, args.jobs
+                )
+            except ValueError as error:
+                parser.error(str(error))
+            sys.exit(1 if num_failed else 0)
+        if args.input and not args.output:
+            args.output = append_to_filename(args.input, "-inverted")
+        elif not args.output:
+            args.output = ask_output_filename()
+            if not args.output:
+                print("No filename provided. Exiting.")
+                sys.exit(1)
+
+        if args.input:
+            handle_image_from_file(args.input, args.output)
+        else:
+            handle_image_from_clipboard(args.output)
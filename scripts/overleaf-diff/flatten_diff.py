@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+
+"""Create "tracked changes" LaTeX files between revisions of a git repository.
+
+Usage: python3 flatten_diff.py -o <old label> [<old label> ...]
+    -n <new label> -r <root name> [--repo <folder> | -i <overleaf id>]
+
+Example: python3 flatten_diff.py -i 614c49f383c9092a37543117 -o "18:50"
+    -n "current" -r Main
+
+Python version of get_diff.sh (see README.txt) that works on any local git
+repository, e.g. a thesis, and leaves its working tree alone. Revisions are
+given as any git revision (hash, tag, branch, HEAD~3) or as labels (the
+newest commit whose message contains the label, as Overleaf labels them).
+Git revisions take precedence, a label is only searched for if the text is
+no revision.
+
+Every revision is exported with ``git archive`` into a temporary folder
+instead of being checked out, and all revisions are flattened with
+``latexpand`` in parallel. The flattened files are cached by commit hash
+and root file, so a commit is only flattened once and repeated diffs
+against the same or other labels only run ``latexdiff``:
+
+    <cache_dir>/<commit hash>-<root>.tex
+
+With several old labels, one diff per label is written, all of them against
+the same new revision.
+
+Requires latexpand and latexdiff on the PATH, see README.txt.
+"""
+
+import argparse
+import concurrent.futures
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "srl_utils", "latexpand"
+)
+OVERLEAF_URL = "https://git.overleaf.com/"
+# Refuse absolute paths and links out of the folder where supported.
+EXTRACT_KWARGS = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+# Characters of labels that are replaced in file names.
+UNSAFE_CHARACTERS = re.compile(r"[^\w.-]+")
+
+
+def _git(repo: str, *args) -> str:
+    """Run a git command in a repository and return its output."""
+    result = subprocess.run(
+        ["git", "-C", repo, *args],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return result.stdout.strip()
+
+
+def update_overleaf(overleaf_id: str) -> str:
+    """Clone an Overleaf project into the current folder or pull it.
+
+    Returns:
+        str: Folder of the repository.
+    """
+    if os.path.isdir(overleaf_id):
+        subprocess.run(["git", "-C", overleaf_id, "pull"], check=True)
+    else:
+        subprocess.run(
+            ["git", "clone", OVERLEAF_URL + overleaf_id], check=True
+        )
+    return overleaf_id
+
+
+def resolve_revision(repo: str, revision: str) -> str:
+    """Return the commit hash of a git revision or label.
+
+    Refs, hashes and revision expressions are resolved with git rev-parse
+    first, so e.g. HEAD or a tag is never mistaken for a commit message
+    that mentions it. Otherwise the text is a label, and the newest commit
+    whose message contains it is used. Texts with a colon are always labels
+    (e.g. the "18:50" of Overleaf), for git they would name a file.
+    """
+    if ":" not in revision:
+        try:
+            return _git(
+                repo,
+                "rev-parse",
+                "--verify",
+                "--quiet",
+                f"{revision}^{{commit}}",
+            )
+        except subprocess.CalledProcessError:
+            pass
+    commit = _git(
+        repo,
+        "log",
+        "-n",
+        "1",
+        "--fixed-strings",
+        f"--grep={revision}",
+        "--pretty=format:%H",
+    )
+    if not commit:
+        raise ValueError(
+            f"[{revision}] is neither a revision nor a label in the git log"
+        )
+    return commit
+
+
+def export_revision(repo: str, commit: str, folder: str):
+    """Write the files of a commit into a folder without a checkout."""
+    with subprocess.Popen(
+        ["git", "-C", repo, "archive", "--format=tar", commit],
+        stdout=subprocess.PIPE,
+    ) as process:
+        with tarfile.open(fileobj=process.stdout, mode="r|") as archive:
+            archive.extractall(folder, **EXTRACT_KWARGS)
+    if process.returncode != 0:
+        raise IOError(f"git archive failed for commit {commit}")
+
+
+def flatten_revision(
+    repo: str, commit: str, root: str, cache_dir: str, force: bool = False
+) -> str:
+    """Return the cached, flattened root file of a commit.
+
+    The commit is exported to a temporary folder and flattened with
+    latexpand if it is not in the cache yet (or force is set). The result is
+    written to a temporary file that is only renamed into the cache once it
+    is complete, so an interrupted run is never used.
+
+    Args:
+        repo (str): Folder of the git repository.
+        commit (str): Full commit hash.
+        root (str): Root .tex file, relative to the repository.
+        cache_dir (str): Folder of the flattened files.
+        force (bool): Flatten again even if the commit is cached.
+
+    Returns:
+        str: Filepath of the flattened file.
+    """
+    name = root[: -len(".tex")].replace("/", "_")
+    flat_path = os.path.join(cache_dir, f"{commit}-{name}.tex")
+    if os.path.exists(flat_path) and not force:
+        return flat_path
+
+    with tempfile.TemporaryDirectory(prefix="flatten_diff-") as tree:
+        export_revision(repo, commit, tree)
+        if not os.path.exists(os.path.join(tree, root)):
+            raise IOError(f"{root} does not exist in commit {commit}")
+        tmp_path = f"{flat_path}.partial-{os.getpid()}-{commit[:8]}"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            subprocess.run(
+                ["latexpand", os.path.basename(root)],
+                cwd=os.path.join(tree, os.path.dirname(root)),
+                stdout=file,
+                check=True,
+            )
+    os.replace(tmp_path, flat_path)
+    return flat_path
+
+
+def diff_files(old_path: str, new_path: str, output_path: str):
+    """Write the latexdiff of two flattened files."""
+    tmp_path = f"{output_path}.partial-{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        subprocess.run(
+            ["latexdiff", old_path, new_path], stdout=file, check=True
+        )
+    os.replace(tmp_path, output_path)
+
+
+def output_name(root: str, label: str, multiple: bool) -> str:
+    """Return the file name of the diff against an old label."""
+    name = os.path.basename(root)[: -len(".tex")]
+    if not multiple:
+        return f"{name}_diff.tex"
+    return f"{name}_diff_{UNSAFE_CHARACTERS.sub('_', label)}.tex"
+
+
+def flatten_diff(
+    repo: str,
+    old_labels: list,
+    new_label: str,
+    root: str,
+    output_dir: str = ".",
+    cache_dir: str = DEFAULT_CACHE_DIR,
+    jobs: int = None,
+    force: bool = False,
+) -> list:  # pylint: disable=too-many-arguments, too-many-locals
+    # Justification: all arguments configure the diff.
+    """Diff the new revision against every old one.
+
+    Args:
+        repo (str): Folder of the git repository.
+        old_labels (list): Labels or revisions of the old versions.
+        new_label (str): Label or revision of the new version.
+        root (str): Root file name, with or without .tex.
+        output_dir (str): Folder to write the diffs to.
+        cache_dir (str): Folder of the flattened files.
+        jobs (int): Parallel latexpand and latexdiff runs, default CPUs.
+        force (bool): Flatten all revisions again.
+
+    Returns:
+        list: Filepaths of the diffs, in the order of old_labels.
+    """
+    for tool in ("latexpand", "latexdiff"):
+        if shutil.which(tool) is None:
+            raise IOError(f"{tool} was not found on the PATH, see README.txt")
+    root = root if root.endswith(".tex") else f"{root}.tex"
+    os.makedirs(cache_dir, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+
+    commits = {
+        label: resolve_revision(repo, label)
+        for label in [*old_labels, new_label]
+    }
+    for label, commit in commits.items():
+        print(f"[{label}] is commit {commit}")
+
+    # latexpand and latexdiff run in their own processes, threads only wait.
+    with concurrent.futures.ThreadPoolExecutor(jobs) as executor:
+        unique_commits = sorted(set(commits.values()))
+        flat_paths = dict(
+            zip(
+                unique_commits,
+                executor.map(
+                    lambda commit: flatten_revision(
+                        repo, commit, root, cache_dir, force
+                    ),
+                    unique_commits,
+                ),
+            )
+        )
+        output_paths = [
+            os.path.join(
+                output_dir, output_name(root, label, len(old_labels) > 1)
+            )
+            for label in old_labels
+        ]
+        list(
+            executor.map(
+                lambda label, output_path: diff_files(
+                    flat_paths[commits[label]],
+                    flat_paths[commits[new_label]],
+                    output_path,
+                ),
+                old_labels,
+                output_paths,
+            )
+        )
+    return output_paths
+
+
+def main():
+    """Parse the command line and write the diffs."""
+    parser = argparse.ArgumentParser(
+        description="Create latexdiff files between labeled revisions of a "
+        "LaTeX project in git."
+    )
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument(
+        "--repo", default=".", help="Folder of a local git repository."
+    )
+    source.add_argument(
+        "-i",
+        "--overleaf_id",
+        help="Overleaf project ID, cloned into or pulled in the current "
+        "folder.",
+    )
+    parser.add_argument(
+        "-o",
+        "--old",
+        nargs="+",
+        required=True,
+        help="Labels or git revisions of the old versions.",
+    )
+    parser.add_argument(
+        "-n",
+        "--new",
+        required=True,
+        help="Label or git revision of the new version.",
+    )
+    parser.add_argument(
+        "-r", "--root", required=True, help="Root .tex file of the project."
+    )
+    parser.add_argument(
+        "--output_dir", default=".", help="Folder to write the diffs to."
+    )
+    parser.add_argument(
+        "--cache_dir",
+        default=DEFAULT_CACHE_DIR,
+        help="Folder of the flattened revisions.",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Parallel latexpand and latexdiff runs (default: number of "
+        "CPUs).",
+    )
+    parser.add_argument(
+        "-f",
+        "--force",
+        action="store_true",
+        help="Flatten the revisions again even if they are cached.",
+    )
+    args = parser.parse_args()
+
+    repo = update_overleaf(args.overleaf_id) if args.overleaf_id else args.repo
+    try:
+        output_paths = flatten_diff(
+            repo,
+            args.old,
+            args.new,
+            args.root,
+            args.output_dir,
+            args.cache_dir,
+            args.jobs,
+            args.force,
+        )
+    except (IOError, ValueError, subprocess.CalledProcessError) as error:
+        print(f"ERROR: {error}")
+        sys.exit(1)
+    for output_path in output_paths:
+        print(f"Diff saved to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
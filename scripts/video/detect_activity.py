@@ -0,0 +1,393 @@
+# !/usr/bin/env python3
+
+"""Find the frame ranges of a video in which something moves.
+
+Usage: python3 detect_activity.py <video> [<video> ...] [options]
+
+Example: python3 detect_activity.py ~/Downloads/tracking/*.mp4 --step 5
+
+Replaces scrubbing through every video with scroll_thru_video.py to note
+down start and end frames for track_markers.py. The video is decoded once,
+only every step-th frame is converted and downscaled (the others are only
+grabbed), and the motion energy of each sampled frame is computed in
+vectorized batches: the mean absolute difference to the sample at least
+span frames earlier above a per-pixel noise level, so that codec and sensor
+noise of the whole frame does not drown small moving parts and slow motion
+adds up the same way for every step. Samples above a threshold (by default
+estimated from the noise of the static parts of the video) form the active
+ranges. Their edges are then refined frame by frame around them, for every
+step: a range starts at the first frame that differs from the still frame
+before the motion and ends at the first frame that no longer differs from
+the still frame after it, i.e. the last frame that changes.
+
+The frame numbers are positions in the video starting at 0, as shown by
+scroll_thru_video.py. track_markers.py counts frames from 1, the printed
+commands are converted accordingly.
+"""
+
+import os
+import sys
+
+import click
+import cv2
+import numpy as np
+from frame_reader import FrameReader
+
+# Shared utilities of the repository (profiling) are in src/.
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../src")
+)
+import profiling  # noqa: E402 pylint: disable=wrong-import-position
+
+# Gray value differences up to this level are treated as noise.
+DEFAULT_NOISE_LEVEL = 8.0
+# Lower bound of the automatic threshold, for perfectly static videos.
+MIN_THRESHOLD = 0.01
+# Minimum number of frames between two compared samples.
+DEFAULT_SPAN = 5
+
+
+def _preprocess(frame: np.array, size: tuple) -> np.array:
+    """Return the downscaled grayscale frame as float32."""
+    small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.float32)
+
+
+def _energy(frames: np.array, reference: np.array, noise_level: float):
+    """Return the motion energy of each frame relative to the reference."""
+    difference = np.abs(frames - reference) - noise_level
+    return np.maximum(difference, 0.0, out=difference).mean(axis=(1, 2))
+
+
+def motion_energy(
+    filepath: str,
+    width: int = 160,
+    step: int = 5,
+    noise_level: float = DEFAULT_NOISE_LEVEL,
+    lag: int = 1,
+    batch: int = 256,
+):  # pylint: disable=too-many-arguments, too-many-locals
+    # Justification: decoder and batch state of the streaming pass.
+    """Compute the motion energy of every step-th frame of a video.
+
+    Args:
+        filepath (str): Video filepath.
+        width (int): Width the frames are downscaled to in pixels.
+        step (int): Sample every step-th frame.
+        noise_level (float): Gray value differences treated as noise.
+        lag (int): Compare every sample with the one lag samples earlier.
+        batch (int): Number of samples whose differences are computed at once.
+
+    Returns:
+        tuple: fps, frame numbers of the samples (array(N,)) and the motion
+            energy between sample i and sample i + lag (array(N - lag,)).
+    """
+    cap = cv2.VideoCapture(filepath)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video {filepath}")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    src_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    src_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    width = min(width, src_width)
+    size = (width, max(1, round(src_height * width / src_width)))
+
+    # The first lag slots hold the last samples of the previous batch.
+    samples = np.empty((batch + lag, size[1], size[0]), dtype=np.float32)
+    num_samples = 0
+    frame_numbers = []
+    scores = []
+
+    def flush():
+        scores.append(
+            _energy(
+                samples[lag:num_samples],
+                samples[: num_samples - lag],
+                noise_level,
+            )
+        )
+        samples[:lag] = samples[num_samples - lag : num_samples]
+
+    frame_number = 0
+    while True:
+        if frame_number % step == 0:
+            with profiling.timer("decode"):
+                ret, frame = cap.read()
+            if not ret:
+                break
+            with profiling.timer("preprocess"):
+                samples[num_samples] = _preprocess(frame, size)
+            frame_numbers.append(frame_number)
+            num_samples += 1
+            if num_samples == len(samples):
+                with profiling.timer("energy"):
+                    flush()
+                num_samples = lag
+        else:
+            with profiling.timer("grab"):
+                if not cap.grab():
+                    break
+        frame_number += 1
+    cap.release()
+    if num_samples > lag:
+        flush()
+    return (
+        fps,
+        np.array(frame_numbers, dtype=np.int64),
+        np.concatenate(scores) if scores else np.empty(0, dtype=np.float32),
+    )
+
+
+def auto_threshold(scores: np.array, sensitivity: float = 5.0) -> float:
+    """Estimate the motion threshold from the noise of the scores.
+
+    Assumes that the video is static most of the time, the threshold is the
+    median plus sensitivity robust standard deviations (from the median
+    absolute deviation).
+    """
+    if len(scores) == 0:
+        return MIN_THRESHOLD
+    median = np.median(scores)
+    sigma = 1.4826 * np.median(np.abs(scores - median))
+    return max(float(median + sensitivity * sigma), MIN_THRESHOLD)
+
+
+def find_active_ranges(
+    frame_numbers: np.array,
+    scores: np.array,
+    threshold: float,
+    min_gap: int,
+    min_length: int,
+    lag: int = 1,
+) -> list:  # pylint: disable=too-many-arguments
+    # Justification: the scores and all settings of the grouping.
+    """Group samples above the threshold into ranges of sample indices.
+
+    Score i is the motion between samples i and i + lag, a run of active
+    scores i to j is the range of samples i to j + lag.
+
+    Args:
+        frame_numbers (array(N,)): Frame numbers of the samples.
+        scores (array(N - lag,)): Motion energy between the samples.
+        threshold (float): Minimum motion energy of an active sample.
+        min_gap (int): Ranges less than this many frames apart are merged.
+        min_length (int): Ranges shorter than this many frames are dropped.
+        lag (int): Distance of the compared samples.
+
+    Returns:
+        list: (first sample, last sample) of every range.
+    """
+    active = np.concatenate(([False], scores > threshold, [False]))
+    edges = np.flatnonzero(np.diff(active.astype(np.int8)))
+    ranges = []
+    for first, end in zip(edges[::2], edges[1::2]):
+        # Active scores first to end - 1, samples first to end - 1 + lag.
+        last = end - 1 + lag
+        if (
+            ranges
+            and frame_numbers[first] - frame_numbers[ranges[-1][1]] < min_gap
+        ):
+            ranges[-1] = (ranges[-1][0], last)
+        else:
+            ranges.append((first, last))
+    return [
+        (first, last)
+        for first, last in ranges
+        if frame_numbers[last] - frame_numbers[first] >= min_length
+    ]
+
+
+def _energy_to(reader, frames: range, reference: int, settings: tuple):
+    """Return the motion energy of frames relative to a reference frame."""
+    size, noise_level = settings
+    ref = _preprocess(reader.get(reference), size)
+    stack = np.stack([_preprocess(reader.get(idx), size) for idx in frames])
+    return _energy(stack, ref, noise_level)
+
+
+def refine_range(
+    reader,
+    frame_numbers: np.array,
+    sample_range: tuple,
+    threshold: float,
+    settings: tuple,
+):
+    """Refine a range of samples to the first and last moving frame.
+
+    The start is the first frame after the still sample before the range
+    that differs from it by more than the threshold. The end is the frame
+    after the last one that differs from the still sample after the range,
+    i.e. the last frame that changes, at which the motion has come to rest.
+    If the range reaches the last sample, the end is that sample.
+
+    Args:
+        reader (FrameReader): Reader of the video.
+        frame_numbers (array(N,)): Frame numbers of the samples.
+        sample_range (tuple): First and last sample of the range.
+        threshold (float): Motion threshold of the samples.
+        settings (tuple): Size the frames were downscaled to, noise level of
+            the motion energy and lag of the compared samples.
+
+    Returns:
+        tuple: First and last frame number.
+    """
+    size, noise_level, lag = settings
+    first, last = sample_range
+    still_before = frame_numbers[first]
+    candidates = range(still_before + 1, frame_numbers[first + lag] + 1)
+    moved = (
+        _energy_to(reader, candidates, still_before, (size, noise_level))
+        > threshold
+    )
+    start = candidates[int(np.argmax(moved))] if moved.any() else still_before
+
+    still_after = frame_numbers[last]
+    candidates = range(frame_numbers[last - lag], still_after)
+    moved = (
+        _energy_to(reader, candidates, still_after, (size, noise_level))
+        > threshold
+    )
+    if not moved.any():
+        return start, max(start, candidates[0])
+    return start, candidates[np.flatnonzero(moved)[-1]] + 1
+
+
+def detect_activity(
+    filepath: str,
+    width: int = 160,
+    step: int = 5,
+    threshold: float = None,
+    sensitivity: float = 5.0,
+    noise_level: float = DEFAULT_NOISE_LEVEL,
+    span: int = DEFAULT_SPAN,
+    min_gap_sec: float = 1.0,
+    min_length_sec: float = 0.5,
+    refine: bool = True,
+):  # pylint: disable=too-many-arguments, too-many-locals
+    # Justification: all arguments configure the detection.
+    """Return the (start, end) frame numbers of the active ranges of a video.
+
+    Args:
+        filepath (str): Video filepath.
+        width (int): Width the frames are downscaled to in pixels.
+        step (int): Sample every step-th frame in the first pass.
+        threshold (float): Motion threshold, None to estimate it.
+        sensitivity (float): Noise deviations of the estimated threshold.
+        noise_level (float): Gray value differences treated as noise.
+        span (int): Minimum number of frames between compared samples.
+        min_gap_sec (float): Merge ranges that are closer in time.
+        min_length_sec (float): Drop ranges that are shorter.
+        refine (bool): Refine the edges to single frames.
+    """
+    step = max(1, step)
+    lag = max(1, -(-span // step))
+    fps, frame_numbers, scores = motion_energy(
+        filepath, width, step, noise_level, lag
+    )
+    if threshold is None:
+        threshold = auto_threshold(scores, sensitivity)
+    fps = fps if fps > 0 else 30.0
+    sample_ranges = find_active_ranges(
+        frame_numbers,
+        scores,
+        threshold,
+        round(min_gap_sec * fps),
+        round(min_length_sec * fps),
+        lag,
+    )
+    if not refine or not sample_ranges:
+        return [
+            (int(frame_numbers[first]), int(frame_numbers[last]))
+            for first, last in sample_ranges
+        ]
+
+    with FrameReader(filepath, cache_mb=256, prefetch=0) as reader:
+        frame = reader.get(0)
+        width = min(width, frame.shape[1])
+        size = (width, max(1, round(frame.shape[0] * width / frame.shape[1])))
+        with profiling.timer("refine"):
+            return [
+                refine_range(
+                    reader,
+                    frame_numbers,
+                    sample_range,
+                    threshold,
+                    (size, noise_level, lag),
+                )
+                for sample_range in sample_ranges
+            ]
+
+
+@click.command()
+@click.argument("filepaths", nargs=-1, required=True)
+@click.option("--width", default=160, help="Width of the analyzed frames.")
+@click.option("--step", default=5, help="Sample every N-th frame.")
+@click.option(
+    "--threshold",
+    type=float,
+    default=None,
+    help="Motion threshold (mean gray value difference above the noise "
+    "level), estimated from the video by default.",
+)
+@click.option(
+    "--sensitivity",
+    default=5.0,
+    help="Noise deviations above the median of the estimated threshold.",
+)
+@click.option(
+    "--noise_level",
+    default=DEFAULT_NOISE_LEVEL,
+    help="Gray value differences treated as noise.",
+)
+@click.option(
+    "--span",
+    default=DEFAULT_SPAN,
+    help="Minimum number of frames between compared samples.",
+)
+@click.option("--min_gap", default=1.0, help="Merge ranges closer than [s].")
+@click.option("--min_length", default=0.5, help="Drop ranges shorter [s].")
+@click.option(
+    "--refine/--no-refine",
+    default=True,
+    help="Refine the range edges to single frames.",
+)
+@click.option("--profile", is_flag=True, help=profiling.PROFILE_HELP)
+def main(
+    filepaths: tuple,
+    width: int,
+    step: int,
+    threshold: float,
+    sensitivity: float,
+    noise_level: float,
+    span: int,
+    min_gap: float,
+    min_length: float,
+    refine: bool,
+    profile: bool,
+):  # pylint: disable=too-many-arguments
+    # Justification: one argument per command line option.
+    """Print the active frame ranges of videos."""
+    with profiling.session(profile, "detect_activity"):
+        for filepath in filepaths:
+            ranges = detect_activity(
+                filepath,
+                width,
+                step,
+                threshold,
+                sensitivity,
+                noise_level,
+                span,
+                min_gap,
+                min_length,
+                refine,
+            )
+            print(f"{filepath}: {len(ranges)} active range(s)")
+            for start, end in ranges:
+                # track_markers.py counts frames from 1.
+                print(
+                    f"  frames {start} to {end}: python3 track_markers.py "
+                    f"-f {filepath} -s {start + 1} -e {end + 1}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""Persistent cache of decoded frame ranges of videos.
+
+Running track_markers.py again on the same range of a clip (with other
+boxes or tracker settings) pays the full decode every time. ``FrameCache``
+decodes a range once into a raw memory-mapped ``.npy`` stack
+(frames x height x width x 3, uint8) and later runs, or any other script,
+read the frames straight from the page cache without touching the codec.
+
+Every cached range is a folder in the cache directory, named after the
+content fingerprint of the video (see video_proxy.video_fingerprint) and the
+range, so edited videos are never served stale frames:
+
+    <cache_dir>/<fingerprint>-<first>-<last>/
+        frames.npy          uint8 (frames x height x width x 3)
+        timestamps_ms.npy   float64 (frames,), video timestamp of the frame
+        meta.json           fps and range, its mtime marks the last use
+
+When the cache grows above its size limit, the least recently used ranges
+are deleted. Frame indices are 0-based positions in the decoded stream.
+
+Example:
+    >>> with FrameCache().open("vid.mp4", 100, 499) as cached:
+    ...     frame = cached.get(250)
+"""
+
+import json
+import os
+import shutil
+
+import cv2
+import numpy as np
+from video_proxy import video_fingerprint
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "srl_utils", "frames"
+)
+DEFAULT_MAX_GB = 20.0
+META_FILE = "meta.json"
+
+
+def _folder_size(path: str) -> int:
+    """Return the total size of the files in a folder in bytes."""
+    return sum(entry.stat().st_size for entry in os.scandir(path))
+
+
+def build_range(filepath: str, output_dir: str, first: int, last: int):
+    """Decode frames first to last (inclusive) of a video into output_dir.
+
+    The range is written to a temporary folder that is only renamed to
+    output_dir once it is complete, so an interrupted build is never used.
+
+    Args:
+        filepath (str): Video filepath.
+        output_dir (str): Folder of the cached range.
+        first (int): Index of the first frame.
+        last (int): Index of the last frame, clipped to the video length.
+    """
+    cap = cv2.VideoCapture(filepath)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video {filepath}")
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+
+    tmp_dir = f"{output_dir}.partial-{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    frames_path = os.path.join(tmp_dir, "frames.npy")
+    frames = np.lib.format.open_memmap(
+        frames_path,
+        mode="w+",
+        dtype=np.uint8,
+        shape=(last - first + 1, height, width, 3),
+    )
+    timestamps_ms = np.zeros(last - first + 1)
+    # Frames before the range are grabbed, which skips their conversion.
+    frame_index = 0
+    while frame_index < first and cap.grab():
+        frame_index += 1
+    count = 0
+    if frame_index == first:
+        while count < len(frames):
+            row = frames[count]
+            ret, frame = cap.read(row)
+            if not ret:
+                break
+            if frame is not row:
+                # OpenCV allocates a new array if the decoded frame does not
+                # fit the row, e.g. when the container reports another size.
+                if frame.shape != row.shape:
+                    cap.release()
+                    del row, frames
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+                    raise IOError(
+                        f"Frame {first + count} of {filepath} has shape "
+                        f"{frame.shape}, expected {(height, width, 3)}"
+                    )
+                row[...] = frame
+            timestamps_ms[count] = cap.get(cv2.CAP_PROP_POS_MSEC)
+            count += 1
+    cap.release()
+
+    if count < len(frames):
+        # CAP_PROP_FRAME_COUNT is only an estimate for some containers.
+        trimmed = np.array(frames[:count])
+        del frames
+        np.save(frames_path, trimmed)
+    else:
+        frames.flush()
+        del frames
+    np.save(os.path.join(tmp_dir, "timestamps_ms.npy"), timestamps_ms[:count])
+    with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "video": os.path.abspath(filepath),
+                "fps": fps,
+                "first": first,
+                "last": first + count - 1,
+            },
+            file,
+        )
+    try:
+        os.replace(tmp_dir, output_dir)
+    except OSError:
+        # Another process cached the same range in the meantime.
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+class CachedRange:
+    """Read-only, memory-mapped frames of one cached range."""
+
+    def __init__(self, folder: str):
+        """Map the frames of a cached range folder."""
+        self.folder = folder
+        with open(os.path.join(folder, META_FILE), encoding="utf-8") as file:
+            meta = json.load(file)
+        self.fps = meta["fps"]
+        self.first = meta["first"]
+        self.last = meta["last"]
+        self.frames = np.load(
+            os.path.join(folder, "frames.npy"), mmap_mode="r"
+        )
+        self.timestamps_ms = np.load(os.path.join(folder, "timestamps_ms.npy"))
+
+    def __len__(self) -> int:
+        """Return the number of cached frames."""
+        return len(self.timestamps_ms)
+
+    def get(self, frame_index: int):
+        """Return a read-only view of a frame, None outside the range."""
+        if not self.first <= frame_index <= self.last:
+            return None
+        return self.frames[frame_index - self.first]
+
+    def __iter__(self):
+        """Yield frame index, timestamp in ms and read-only frame in order."""
+        for offset, timestamp_ms in enumerate(self.timestamps_ms):
+            yield self.first + offset, timestamp_ms, self.frames[offset]
+
+    def close(self):
+        """Release the memory map."""
+        self.frames = None
+
+    def __enter__(self):
+        """Return the range itself."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Release the memory map."""
+        self.close()
+
+
+class FrameCache:
+    """Directory of cached frame ranges with a total size limit."""
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_gb: float = DEFAULT_MAX_GB,
+    ):
+        """Use a cache directory, created if it does not exist.
+
+        Args:
+            cache_dir (str): Directory of the cached ranges.
+            max_gb (float): Total size of the cache in GB, the least recently
+                used ranges are deleted above it.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_gb * 1024**3)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def range_dir(self, filepath: str, first: int, last: int) -> str:
+        """Return the folder of a range of a video in the cache."""
+        return os.path.join(
+            self.cache_dir, f"{video_fingerprint(filepath)}-{first}-{last}"
+        )
+
+    def open(self, filepath: str, first: int, last: int) -> CachedRange:
+        """Return frames first to last of a video, decoding them if needed.
+
+        Args:
+            filepath (str): Video filepath.
+            first (int): Index of the first frame.
+            last (int): Index of the last frame (inclusive).
+        """
+        folder = self.range_dir(filepath, first, last)
+        if os.path.exists(os.path.join(folder, META_FILE)):
+            os.utime(os.path.join(folder, META_FILE))
+        else:
+            print(f"Caching frames {first} to {last} in {folder} ...")
+            build_range(filepath, folder, first, last)
+            self.evict(keep=folder)
+        return CachedRange(folder)
+
+    def entries(self) -> list:
+        """Return (last use, size in bytes, folder) of all cached ranges."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            meta_path = os.path.join(entry.path, META_FILE)
+            if entry.is_dir() and os.path.exists(meta_path):
+                entries.append(
+                    (
+                        os.path.getmtime(meta_path),
+                        _folder_size(entry.path),
+                        entry.path,
+                    )
+                )
+        return entries
+
+    def evict(self, keep: str = None):
+        """Delete least recently used ranges until the size limit is met.
+
+        Args:
+            keep (str): Folder that is never deleted, e.g. the range in use.
+        """
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, folder in entries:
+            if total <= self.max_bytes:
+                break
+            if folder == keep:
+                continue
+            shutil.rmtree(folder, ignore_errors=True)
+            total -= size
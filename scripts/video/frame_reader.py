@@ -0,0 +1,257 @@
+"""Random-access frame reader for interactive scrubbing through videos.
+
+``cv2.VideoCapture.set(cv2.CAP_PROP_POS_FRAMES, n)`` followed by ``read()``
+decodes every frame from the previous keyframe up to n and throws all but
+the last one away. In long-GOP MP4 files this makes every trackbar move
+re-decode up to several hundred frames. ``FrameReader`` avoids this by
+
+- building a keyframe index once (with ``ffprobe`` if it is installed), so
+  it knows when continuing to decode from the current position is cheaper
+  than seeking,
+- keeping every decoded frame in a bounded LRU cache, and
+- prefetching frames in the direction the user is scrubbing on a background
+  thread.
+"""
+
+import bisect
+import collections
+import shutil
+import subprocess
+import threading
+
+import cv2
+
+# Without a keyframe index, continue decoding instead of seeking if the
+# requested frame is at most this many frames ahead of the decoder.
+DEFAULT_MAX_FORWARD_DECODE = 30
+
+
+def build_keyframe_index(filepath: str, fps: float) -> list:
+    """Return the sorted frame numbers of all keyframes in a video.
+
+    Only the container is demuxed, no frame is decoded, so this takes a few
+    seconds even for multi-gigabyte files.
+
+    Args:
+        filepath (str): Video filepath.
+        fps (float): Frame rate used to convert timestamps to frame numbers.
+
+    Returns:
+        list: Keyframe numbers, empty if ffprobe is not available.
+    """
+    if shutil.which("ffprobe") is None or fps <= 0:
+        return []
+    result = subprocess.run(
+        [
+            "ffprobe",
+            "-v",
+            "error",
+            "-select_streams",
+            "v:0",
+            "-show_entries",
+            "packet=pts_time,flags",
+            "-of",
+            "csv=p=0",
+            filepath,
+        ],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        return []
+    times = []
+    for line in result.stdout.splitlines():
+        pts_time, _, flags = line.partition(",")
+        if "K" in flags and pts_time not in ("", "N/A"):
+            times.append(float(pts_time))
+    if not times:
+        return []
+    first = min(times)
+    return sorted({round((t - first) * fps) for t in times})
+
+
+class FrameReader:  # pylint: disable=too-many-instance-attributes
+    # Justification: decoder, cache and prefetch state belong together.
+    """Random-access video frame reader with LRU cache and prefetching."""
+
+    def __init__(
+        self,
+        filepath: str,
+        cache_mb: float = 1024,
+        prefetch: int = 16,
+        use_keyframe_index: bool = True,
+    ):
+        """Open the video and start the prefetch thread.
+
+        Args:
+            filepath (str): Video filepath.
+            cache_mb (float): Upper bound of the decoded frame cache in MB.
+            prefetch (int): Number of frames to prefetch in the scrubbing
+                direction, 0 disables prefetching.
+            use_keyframe_index (bool): Build a keyframe index with ffprobe.
+        """
+        self._cap = cv2.VideoCapture(filepath)
+        if not self._cap.isOpened():
+            raise IOError(f"Could not open video {filepath}")
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS)
+        self.length = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.keyframes = (
+            build_keyframe_index(filepath, self.fps)
+            if use_keyframe_index
+            else []
+        )
+
+        # Frame number that the next cap.read() returns.
+        self._next_pos = 0
+        self._decode_lock = threading.Lock()
+
+        self._cache = collections.OrderedDict()
+        self._cache_bytes = 0
+        self._cache_limit = int(cache_mb * 1024 * 1024)
+        self._cache_lock = threading.Lock()
+
+        self._prefetch = prefetch
+        self._last_request = 0
+        self._direction = 1
+        self._wakeup = threading.Condition()
+        self._generation = 0
+        self._closed = False
+        self._prefetch_thread = None
+        if prefetch > 0:
+            self._prefetch_thread = threading.Thread(
+                target=self._prefetch_loop, daemon=True
+            )
+            self._prefetch_thread.start()
+
+    def get(self, frame_number: int):
+        """Return the decoded frame, or None if it cannot be read.
+
+        Args:
+            frame_number (int): Frame number, clipped to the video length.
+        """
+        frame_number = min(self.length - 1, max(0, frame_number))
+        with self._wakeup:
+            if frame_number != self._last_request:
+                self._direction = (
+                    1 if frame_number > self._last_request else -1
+                )
+            self._last_request = frame_number
+            self._generation += 1
+            self._wakeup.notify()
+
+        frame = self._cache_get(frame_number)
+        if frame is None:
+            with self._decode_lock:
+                frame = self._decode(frame_number)
+        return frame
+
+    def close(self):
+        """Stop the prefetch thread and release the video."""
+        with self._wakeup:
+            self._closed = True
+            self._wakeup.notify()
+        if self._prefetch_thread is not None:
+            self._prefetch_thread.join()
+        with self._decode_lock:
+            self._cap.release()
+
+    def __enter__(self):
+        """Return the reader itself."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Release the video."""
+        self.close()
+
+    def _seek_target(self, frame_number: int) -> int:
+        """Return the frame to start decoding from to reach frame_number."""
+        if self.keyframes:
+            idx = bisect.bisect_right(self.keyframes, frame_number) - 1
+            keyframe = self.keyframes[idx] if idx >= 0 else 0
+            if keyframe <= self._next_pos <= frame_number:
+                return self._next_pos
+            return keyframe
+        if (
+            0
+            <= self._next_pos
+            <= frame_number
+            <= self._next_pos + DEFAULT_MAX_FORWARD_DECODE
+        ):
+            return self._next_pos
+        return frame_number
+
+    def _decode(self, frame_number: int):
+        """Decode up to frame_number, caching every frame on the way.
+
+        Must be called with the decode lock held.
+        """
+        cached = self._cache_get(frame_number)
+        if cached is not None:
+            return cached
+        start = self._seek_target(frame_number)
+        if start != self._next_pos:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+            self._next_pos = start
+        frame = None
+        while self._next_pos <= frame_number:
+            ret, frame = self._cap.read()
+            if not ret:
+                # Force a seek on the next request.
+                self._next_pos = -1
+                return None
+            self._cache_put(self._next_pos, frame)
+            self._next_pos += 1
+        return frame
+
+    def _cache_get(self, frame_number: int):
+        """Return a cached frame and mark it as recently used."""
+        with self._cache_lock:
+            frame = self._cache.get(frame_number)
+            if frame is not None:
+                self._cache.move_to_end(frame_number)
+            return frame
+
+    def _cache_put(self, frame_number: int, frame):
+        """Insert a frame and evict the least recently used ones."""
+        with self._cache_lock:
+            if frame_number in self._cache:
+                self._cache.move_to_end(frame_number)
+                return
+            self._cache[frame_number] = frame
+            self._cache_bytes += frame.nbytes
+            while self._cache_bytes > self._cache_limit and len(self._cache):
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_bytes -= evicted.nbytes
+
+    def _prefetch_loop(self):
+        """Decode frames ahead of the last request in scrubbing direction."""
+        handled_generation = 0
+        while True:
+            with self._wakeup:
+                while (
+                    not self._closed and self._generation == handled_generation
+                ):
+                    self._wakeup.wait()
+                if self._closed:
+                    return
+                handled_generation = self._generation
+                center = self._last_request
+                direction = self._direction
+
+            if direction > 0:
+                targets = range(center + 1, center + self._prefetch + 1)
+            else:
+                # Decoding runs forward only, so prefetch backwards by
+                # decoding the whole window preceding the request at once.
+                targets = range(max(0, center - self._prefetch), center)
+            for target in targets:
+                if target >= self.length:
+                    break
+                if self._cache_get(target) is not None:
+                    continue
+                with self._decode_lock:
+                    # Leave the decoder to newer requests.
+                    if self._generation != handled_generation:
+                        break
+                    self._decode(target)
@@ -1,17 +1,25 @@
 #!/Users/gavin/opt/miniforge3/bin/python3
 
+import argparse
 import os
 import sys
 
 import cv2
+from video_writer import VideoWriter, add_arguments, writer_kwargs
 
-if len(sys.argv) < 2:
-    print(
-        "Please provide the path to the MP4 video as a command-line argument."
-    )
-    sys.exit(1)
+# Shared utilities of the repository (profiling) are in src/.
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../src")
+)
+import profiling  # noqa: E402 pylint: disable=wrong-import-position
 
-video_path = sys.argv[1]
+parser = argparse.ArgumentParser(description="Invert the colors of a video.")
+parser.add_argument("video_path", help="Path to the MP4 video.")
+add_arguments(parser)
+profiling.add_argument(parser)
+args = parser.parse_args()
+
+video_path = args.video_path
 
 # Get the directory and filename
 directory, filename = os.path.split(video_path)
@@ -29,20 +37,23 @@ width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
 height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
 # Create the video writer
-fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-out = cv2.VideoWriter(output_filename, fourcc, fps, (width, height))
+out = VideoWriter(output_filename, fps, (width, height), **writer_kwargs(args))
 
 # Process each frame and write the inverted frame to the output video
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    # Invert the colors of the frame
-    inverted_frame = cv2.bitwise_not(frame)
-
-    # Write the inverted frame to the output video
-    out.write(inverted_frame)
+with profiling.session(args.profile, "invert_video", directory):
+    while True:
+        with profiling.timer("read"):
+            ret, frame = cap.read()
+        if not ret:
+            break
+
+        # Invert the colors of the frame
+        with profiling.timer("invert"):
+            inverted_frame = cv2.bitwise_not(frame)
+
+        # Write the inverted frame to the output video
+        with profiling.timer("write"):
+            out.write(inverted_frame)
 
 # Release the video capture and writer
 cap.release()
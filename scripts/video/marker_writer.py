@@ -0,0 +1,157 @@
+"""Incremental binary storage of tracked marker positions.
+
+The tracked marker centers are written frame by frame into memory-mapped
+``.npy`` files that are preallocated for the whole frame range, so the data
+that has been tracked so far survives if the tracking process dies. The
+output folder contains:
+
+- ``positions.npy``: float64 array (frames x markers x 2), x then y pixel
+  coordinate of every marker center.
+- ``valid.npy``: bool array (frames x markers), whether the tracker found
+  the marker in that frame.
+- ``frames.npy``: int64 array (frames,), frame number within the video.
+  Rows that were never written are marked with -1.
+- ``timestamps_ms.npy``: float64 array (frames,), video timestamp of the
+  frame in milliseconds.
+
+Use ``load_markers`` to read the output back, also from an interrupted run.
+"""
+
+import os
+
+import numpy as np
+
+UNWRITTEN_FRAME = -1
+
+
+class MarkerWriter:  # pylint: disable=too-many-instance-attributes
+    # Justification: one attribute per stored column plus the writer state.
+    """Write marker centers incrementally into preallocated .npy files."""
+
+    def __init__(
+        self,
+        folder: str,
+        num_frames: int,
+        num_markers: int,
+        flush_every: int = 100,
+        csv_path: str = None,
+    ):  # pylint: disable=too-many-arguments
+        # Justification: all arguments configure the output files.
+        """Preallocate the output files.
+
+        Args:
+            folder (str): Output folder, created if it does not exist.
+            num_frames (int): Maximum number of frames that will be written.
+            num_markers (int): Number of tracked markers per frame.
+            flush_every (int): Flush the files to disk every N frames.
+            csv_path (str): Also export the positions to this CSV file (one
+                row per frame, x then y coordinate of each marker) on close.
+        """
+        self.folder = folder
+        self.num_frames = max(int(num_frames), 0)
+        self.num_markers = num_markers
+        self.flush_every = max(int(flush_every), 1)
+        self.csv_path = csv_path
+        self.count = 0
+        os.makedirs(folder, exist_ok=True)
+
+        self.positions = self._open("positions", (num_markers, 2), np.float64)
+        self.valid = self._open("valid", (num_markers,), np.bool_)
+        self.frames = self._open("frames", (), np.int64)
+        self.timestamps_ms = self._open("timestamps_ms", (), np.float64)
+        self.frames[:] = UNWRITTEN_FRAME
+        self.flush()
+
+    def _open(self, name: str, row_shape: tuple, dtype) -> np.memmap:
+        """Create a memory-mapped .npy file with one row per frame."""
+        return np.lib.format.open_memmap(
+            os.path.join(self.folder, f"{name}.npy"),
+            mode="w+",
+            dtype=dtype,
+            shape=(self.num_frames,) + row_shape,
+        )
+
+    def append(
+        self,
+        frame_number: int,
+        timestamp_ms: float,
+        centers: np.array,
+        valid: np.array,
+    ):
+        """Store the marker centers of one frame.
+
+        Args:
+            frame_number (int): Frame number within the video.
+            timestamp_ms (float): Video timestamp of the frame.
+            centers (array(M, 2)): Marker centers in pixel coordinates.
+            valid (array(M,)): Whether each marker was found.
+        """
+        if self.count >= self.num_frames:
+            raise IndexError(
+                f"MarkerWriter was allocated for {self.num_frames} frames"
+            )
+        self.positions[self.count] = centers
+        self.valid[self.count] = valid
+        self.frames[self.count] = frame_number
+        self.timestamps_ms[self.count] = timestamp_ms
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self.flush()
+
+    def flush(self):
+        """Flush all written rows to disk."""
+        for array in (
+            self.positions,
+            self.valid,
+            self.frames,
+            self.timestamps_ms,
+        ):
+            array.flush()
+
+    def close(self):
+        """Flush, trim the unused rows and optionally export a CSV file."""
+        self.flush()
+        if self.count < self.num_frames:
+            # Rewrite the files without the preallocated rows that were never
+            # filled, e.g. because tracking was stopped early.
+            for name in ("positions", "valid", "frames", "timestamps_ms"):
+                written = np.array(getattr(self, name)[: self.count])
+                setattr(self, name, None)
+                np.save(os.path.join(self.folder, f"{name}.npy"), written)
+                setattr(self, name, written)
+        if self.csv_path:
+            np.savetxt(
+                self.csv_path,
+                np.asarray(self.positions).reshape(
+                    self.count, self.num_markers * 2
+                ),
+                delimiter=",",
+            )
+
+    def __enter__(self):
+        """Return the writer itself."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close the writer, also when tracking raised an exception."""
+        self.close()
+
+
+def load_markers(folder: str) -> dict:
+    """Load the marker data written by MarkerWriter.
+
+    Rows that were preallocated but never written (e.g. after a crash) are
+    dropped.
+
+    Args:
+        folder (str): Folder the MarkerWriter wrote to.
+
+    Returns:
+        dict: "positions", "valid", "frames" and "timestamps_ms" arrays.
+    """
+    data = {
+        name: np.load(os.path.join(folder, f"{name}.npy"), mmap_mode="r")
+        for name in ("positions", "valid", "frames", "timestamps_ms")
+    }
+    written = data["frames"] != UNWRITTEN_FRAME
+    return {name: np.asarray(array[written]) for name, array in data.items()}
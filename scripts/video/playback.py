@@ -0,0 +1,130 @@
+"""Deadline-based video playback at the true frame rate.
+
+Waiting a fixed ``1000 / fps`` milliseconds between frames adds the decode
+and display time on top of every frame period, so playback always runs
+slower than requested. ``play_range`` instead schedules every frame at an
+absolute deadline, decodes on a separate thread into a small queue and drops
+frames whose deadline has already passed when decoding or displaying falls
+behind.
+"""
+
+import collections
+import queue
+import threading
+import time
+
+import cv2
+
+KEY_ESC = 27  # ASCII code for ESC
+
+PlaybackStats = collections.namedtuple(
+    "PlaybackStats", ["shown", "dropped", "elapsed_sec", "achieved_fps"]
+)
+
+
+def _decode_loop(reader, start, end, frame_queue, stop_event, clock):
+    """Decode frames [start, end) into frame_queue, skipping late frames.
+
+    Args:
+        reader: Object with a get(frame_number) method, e.g. FrameReader.
+        start (int): First frame number.
+        end (int): Frame number after the last frame.
+        frame_queue (queue.Queue): Queue of (frame_number, frame) tuples,
+            terminated with None.
+        stop_event (threading.Event): Set to stop decoding early.
+        clock: Callable returning the frame number that is due now.
+    """
+    frame_number = start
+    while frame_number < end and not stop_event.is_set():
+        # Skip frames that are already late before spending time on them.
+        frame_number = max(frame_number, min(clock(), end - 1))
+        frame = reader.get(frame_number)
+        if frame is None:
+            break
+        while not stop_event.is_set():
+            try:
+                frame_queue.put((frame_number, frame), timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        frame_number += 1
+    frame_queue.put(None)
+
+
+def play_range(
+    reader, start: int, end: int, fps: float, win_title: str, queue_size=4
+) -> PlaybackStats:  # pylint: disable=too-many-arguments
+    # Justification: all arguments describe what and how to play.
+    """Play frames [start, end) of a video at fps in an OpenCV window.
+
+    Press ESC to stop playback early.
+
+    Args:
+        reader: Object with a get(frame_number) method, e.g. FrameReader.
+        start (int): First frame number.
+        end (int): Frame number after the last frame.
+        fps (float): Playback rate in frames per second.
+        win_title (str): Title of the OpenCV window.
+        queue_size (int): Number of decoded frames buffered ahead.
+
+    Returns:
+        PlaybackStats: number of shown and dropped frames, elapsed time and
+            achieved frame rate.
+    """
+    period = 1.0 / fps
+    frame_queue = queue.Queue(maxsize=queue_size)
+    stop_event = threading.Event()
+    time_start = time.monotonic()
+
+    def due_frame():
+        """Return the frame number whose deadline is now."""
+        return start + int((time.monotonic() - time_start) / period)
+
+    decoder = threading.Thread(
+        target=_decode_loop,
+        args=(reader, start, end, frame_queue, stop_event, due_frame),
+        daemon=True,
+    )
+    decoder.start()
+
+    shown = 0
+    dropped = 0
+    previous = start - 1
+    while True:
+        item = frame_queue.get()
+        if item is None:
+            break
+        frame_number, frame = item
+        dropped += frame_number - previous - 1
+        previous = frame_number
+
+        deadline = time_start + (frame_number - start) * period
+        if time.monotonic() > deadline + period and not frame_queue.empty():
+            # A later frame is already decoded and due, showing this one
+            # would only delay it further.
+            dropped += 1
+            continue
+
+        # waitKey also services the window, so wait for the deadline in it.
+        wait_msec = int((deadline - time.monotonic()) * 1000)
+        if wait_msec > 0 and cv2.waitKey(wait_msec) & 0xFF == KEY_ESC:
+            break
+        cv2.imshow(win_title, frame)
+        shown += 1
+        if cv2.waitKey(1) & 0xFF == KEY_ESC:
+            break
+
+    elapsed_sec = time.monotonic() - time_start
+    stop_event.set()
+    # Unblock the decoder if it is waiting on a full queue.
+    while decoder.is_alive():
+        try:
+            frame_queue.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    return PlaybackStats(
+        shown=shown,
+        dropped=dropped,
+        elapsed_sec=elapsed_sec,
+        achieved_fps=shown / elapsed_sec if elapsed_sec > 0 else 0.0,
+    )
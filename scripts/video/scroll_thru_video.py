@@ -7,7 +7,15 @@ Usage: python3 scroll_thru_video.py -f <filepath> --fps <fps>
 Example: python3 scroll_thru_video.py -f ~/Downloads/vid.mp4 --fps 30
 
 Note: The video will play at the specified fps, but the trackbars
-will not update at that rate.
+will not update at that rate. Frames are dropped during review if decoding
+cannot keep up, the achieved frame rate is printed afterwards.
+
+Frames are read through frame_reader.FrameReader, which keeps recently
+decoded frames in memory (--cache_mb) and prefetches frames in the scrubbing
+direction (--prefetch), so scrubbing stays responsive on long-GOP files.
+With --proxy, a downscaled copy of the video is built once next to the
+source (see video_proxy.py) and all scrubbing and playback runs on it. The
+trackbars always show frame numbers of the original video.
 
 Script for finding relevant frames for motion extraction. Use the trackbars
 to find the relevant start and end frame (note down the numbers) so they
@@ -19,9 +27,20 @@ Based on the following StackOverflow answer by Berak
 https://stackoverflow.com/a/21983879
 """
 
+import os
+import sys
 
 import click
 import cv2
+from frame_reader import FrameReader
+from playback import play_range
+from video_proxy import ProxyReader
+
+# Shared utilities of the repository (profiling) are in src/.
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../src")
+)
+import profiling  # noqa: E402 pylint: disable=wrong-import-position
 
 
 @click.command()
@@ -32,26 +51,71 @@ import cv2
     required=True,
 )
 @click.option("--fps", default=30, help="Frames per second.")
-def scroll_thru_video(filepath: str, fps: int):
+@click.option(
+    "--cache_mb", default=1024, help="Size of the decoded frame cache in MB."
+)
+@click.option(
+    "--prefetch",
+    default=16,
+    help="Number of frames to prefetch in scrubbing direction.",
+)
+@click.option(
+    "--proxy/--no-proxy",
+    default=False,
+    help="Scrub on a downscaled proxy that is cached next to the video.",
+)
+@click.option(
+    "--proxy_width", default=640, help="Width of the proxy frames in pixels."
+)
+@click.option(
+    "--proxy_step", default=1, help="Keep every N-th frame in the proxy."
+)
+@click.option("--profile", is_flag=True, help=profiling.PROFILE_HELP)
+def scroll_thru_video(
+    filepath: str,
+    fps: int,
+    cache_mb: int,
+    prefetch: int,
+    proxy: bool,
+    proxy_width: int,
+    proxy_step: int,
+    profile: bool,
+):  # pylint: disable=too-many-arguments, too-many-locals
+    # Justification: one argument per command line option.
     """Scroll through a video using trackbars.
 
     Args:
         filepath (str): Video filepath.
         fps (int): Frames per second.
+        cache_mb (int): Size of the decoded frame cache in MB.
+        prefetch (int): Number of frames to prefetch while scrubbing.
+        proxy (bool): Scrub on a downscaled proxy of the video.
+        proxy_width (int): Width of the proxy frames in pixels.
+        proxy_step (int): Keep every N-th frame in the proxy.
+        profile (bool): Print stage timings and write a Chrome trace.
     """
-    cap = cv2.VideoCapture(filepath)
-    length = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if proxy:
+        reader = ProxyReader(filepath, width=proxy_width, step=proxy_step)
+    else:
+        reader = FrameReader(filepath, cache_mb=cache_mb, prefetch=prefetch)
+    with profiling.session(profile, "scroll_thru_video"):
+        _scroll(filepath, fps, reader)
+
+
+def _scroll(filepath: str, fps: int, reader):
+    """Select a range with trackbars and play it back."""
+    length = reader.length
     win_title = f"Video - {filepath} @ {fps} fps"
 
     clip_to_range = lambda val: min(length - 1, max(0, val))
 
     def on_change(trackbar_value: int):
         """Callback for trackbar changes."""
-        trackbar_value = clip_to_range(trackbar_value)
-        cap.set(cv2.CAP_PROP_POS_FRAMES, trackbar_value)
-        # Read the frame at the current position
-        err, img = cap.read()  # pylint: disable=unused-variable
-        cv2.imshow(win_title, img)
+        with profiling.timer("get"):
+            img = reader.get(clip_to_range(trackbar_value))
+        if img is not None:
+            with profiling.timer("display"):
+                cv2.imshow(win_title, img)
 
     cv2.namedWindow(win_title, cv2.WINDOW_NORMAL)
     cv2.createTrackbar("start", win_title, 0, length, on_change)
@@ -63,21 +127,17 @@ def scroll_thru_video(filepath: str, fps: int):
     start = clip_to_range(cv2.getTrackbarPos("start", win_title))
     end = clip_to_range(cv2.getTrackbarPos("end", win_title))
 
-    wait_time_msec = int(1000.0 / fps)
     if start >= end:
         raise Exception(f"start: {start} must be less than end: {end}")
 
-    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
-    while cap.isOpened():
-        err, img = cap.read()
-        if cap.get(cv2.CAP_PROP_POS_FRAMES) >= end:
-            break
-        cv2.imshow(win_title, img)
-        key_ESC = 27  # ASCII code for ESC
-        key_pressed = cv2.waitKey(wait_time_msec) & 0xFF
-        if key_pressed == key_ESC:
-            break
+    stats = play_range(reader, start, end, fps, win_title)
+    print(
+        f"Played {stats.shown} frames in {stats.elapsed_sec:.2f} s "
+        f"({stats.achieved_fps:.1f} fps, target {fps} fps), "
+        f"dropped {stats.dropped} frames"
+    )
 
+    reader.close()
     cv2.destroyAllWindows()
 
 
@@ -6,18 +6,30 @@ Usage: python3 track_markers.py -f <filepath> -n <num_boxes> -s <start_frame> -e
 
 Example: python3 track_markers.py -f ~/Downloads/tracking/vid.mp4 -n 2 -s 10 -e 50
 
-Script for tracking N manually chosen bounding boxes within video. Point this script to the video file you would like to track and choose how many N bounding boxes are desired. These bounding box centers (markers) are stored in a CSV file afterwards. Two videos are created as well, one is the original video cut to [start_frame, end_frame], and the other is with the tracking bounding boxes displayed. If you for some reason desire to quite the tracking earlier than end_frame, you can press q to exit out.
+Script for tracking N manually chosen bounding boxes within video. Point this script to the video file you would like to track and choose how many N bounding boxes are desired. These bounding box centers (markers) are written frame by frame into the markers/ folder next to the video (see marker_writer.py), together with frame numbers, video timestamps and per-marker tracking flags. Pass --csv to additionally export them to markers.csv next to the video, as before. With --cache the decoded frame range is stored in a frame cache (see frame_cache.py), so later runs on the same range skip decoding. Two videos are created as well, one is the original video cut to [start_frame, end_frame], and the other is with the tracking bounding boxes displayed. If you for some reason desire to quite the tracking earlier than end_frame, you can press q to exit out.
+
+Markers are tracked with one CSRT tracker each by default. With --tracker flow all marker centers are followed at once by pyramidal optical flow and only lost markers fall back to CSRT, which keeps up with the frame rate also for 50+ markers (see trackers.py).
 
 Note: OpenCV installation can sometimes have trouble with cv2.legacy.MultiTracker_create(), the version that worked is:
 opencv-contrib-python 4.5.2.52
 """
 
+import itertools
 import os
-import time
+import sys
 
 import click
 import cv2
-import numpy as np
+from frame_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_GB, FrameCache
+from marker_writer import MarkerWriter
+from trackers import TRACKERS, create_tracker
+from video_writer import VideoWriter, click_options, writer_kwargs
+
+# Shared utilities of the repository (profiling) are in src/.
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../src")
+)
+import profiling  # noqa: E402 pylint: disable=wrong-import-position
 
 
 @click.command()
@@ -34,124 +46,201 @@ import numpy as np
 @click.option(
     "--end_frame", "-e", default=100, help="Relevant ending frame of video."
 )
+@click.option(
+    "--csv/--no-csv",
+    default=False,
+    help="Also export the marker positions to markers.csv next to the video.",
+)
+@click.option(
+    "--tracker",
+    type=click.Choice(TRACKERS),
+    default="csrt",
+    help="Tracker backend: CSRT per marker, or optical flow with CSRT "
+    "re-detection of lost markers.",
+)
+@click_options
+@click.option(
+    "--cache/--no-cache",
+    default=False,
+    help="Decode the frame range once into a frame cache and read it from "
+    "there in later runs.",
+)
+@click.option(
+    "--cache_dir", default=DEFAULT_CACHE_DIR, help="Frame cache directory."
+)
+@click.option(
+    "--cache_gb",
+    default=DEFAULT_MAX_GB,
+    help="Size limit of the frame cache in GB.",
+)
+@click.option("--profile", is_flag=True, help=profiling.PROFILE_HELP)
 def track_markers(
-    filepath: str, num_boxes: int, start_frame: int, end_frame: int
-):
+    filepath: str,
+    num_boxes: int,
+    start_frame: int,
+    end_frame: int,
+    csv: bool,
+    tracker: str,
+    cache: bool,
+    cache_dir: str,
+    cache_gb: float,
+    profile: bool,
+    **encoder_options,
+):  # pylint: disable=too-many-arguments, too-many-locals
+    # Justification: one argument per command line option.
     """Track bounding boxes within video.
-    Script for tracking N manually chosen bounding boxes within video. Point this script to the video file you would like to track and choose how many N bounding boxes are desired. These bounding box centers (markers) are stored in a CSV file afterwards. Two videos are created as well, one is the original video cut to [start_frame, end_frame], and the other is with the tracking bounding boxes displayed
+    Script for tracking N manually chosen bounding boxes within video. Point this script to the video file you would like to track and choose how many N bounding boxes are desired. These bounding box centers (markers) are written incrementally to the markers/ folder. Two videos are created as well, one is the original video cut to [start_frame, end_frame], and the other is with the tracking bounding boxes displayed
 
     Args:
         filepath (str): Video filepath.
         num_boxes (int): Number of bounding boxes.
         start_frame (int): Starting frame of video at which tracking should start.
         end_frame (int): Last frame of video that should be considered (inclusive) during tracking.
+        csv (bool): Also export the marker positions as CSV file.
+        tracker (str): Tracker backend, one of trackers.TRACKERS.
+        cache (bool): Read the frames through the frame cache.
+        cache_dir (str): Frame cache directory.
+        cache_gb (float): Size limit of the frame cache in GB.
+        profile (bool): Print stage timings and write a Chrome trace.
+        **encoder_options: Encoder settings of the output videos (codec,
+            crf, preset, threads, writer), see video_writer.click_options.
     """
     folder = os.path.dirname(filepath)
-    cap = cv2.VideoCapture(filepath)
-
-    framenum = 0
-    while cap.isOpened():
-        ret, frame = cap.read()
-        framenum += 1
-        # print(framenum)
-        if framenum < start_frame:
-            continue
-
-        # Find bounding boxes
-        bboxes = []
-        for i in range(num_boxes):
-            bboxes.append(cv2.selectROI(f"Select {i+1}-th Marker", frame))
-        break
-    else:
+    frame_cache = FrameCache(cache_dir, cache_gb) if cache else None
+    fps, frames = _open_frames(filepath, start_frame, end_frame, frame_cache)
+    first = next(frames, None)
+    if first is None:
         print("ERROR loading file")
-    cap.release()
-    cv2.destroyAllWindows()
+        return
+    frame = first[2]
 
-    # Create multiple trackers
-    trackers = cv2.legacy.MultiTracker_create()
+    # Find bounding boxes
+    bboxes = []
     for i in range(num_boxes):
-        trackers.add(cv2.legacy.TrackerCSRT_create(), frame, bboxes[i])
+        bboxes.append(cv2.selectROI(f"Select {i+1}-th Marker", frame))
+    cv2.destroyAllWindows()
 
-    # Tracking
-    cap = cv2.VideoCapture(filepath)
-    fps = cap.get(cv2.CAP_PROP_FPS)
+    # Create the trackers of all markers
+    marker_tracker = create_tracker(tracker, frame, bboxes)
 
-    # Store keypoint tracked video, using MP4 format.
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-    cut_movie = cv2.VideoWriter(
+    # Store keypoint tracked video, using MP4 format. Each video is encoded
+    # by its own ffmpeg process while tracking continues.
+    encoder = writer_kwargs(encoder_options)
+    cut_movie = VideoWriter(
         f"{folder}/cut_video.mp4",
-        fourcc,
         fps,
         (frame.shape[1], frame.shape[0]),
+        **encoder,
     )
-    tracked_movie = cv2.VideoWriter(
+    tracked_movie = VideoWriter(
         f"{folder}/tracked_video.mp4",
-        fourcc,
         fps,
         (frame.shape[1], frame.shape[0]),
+        **encoder,
     )
 
-    markers = []
-    framenum = 0
-    while cap.isOpened():
-        ret, frame = cap.read()
-        framenum += 1
-        # print(framenum)
-        if framenum < start_frame:
-            continue
-        if not ret or framenum > end_frame:
-            break
-
-        cut_movie.write(frame)
-        # Give tracker new frame with minimal movement
-        found, bboxes_new = trackers.update(frame)
-
-        if not found:
-            cv2.putText(
-                frame,
-                text="One of the objects not found",
-                org=(20, 70),
-                fontFace=cv2.FONT_HERSHEY_SIMPLEX,
-                fontScale=0.75,
-                color=(0, 0, 255),
-                thickness=2,
-            )
-
-        for box in bboxes_new:
-            topleft = (int(box[0]), int(box[1]))
-            botright = (int(box[0] + box[2]), int(box[1] + box[3]))
-            cv2.rectangle(
-                frame, topleft, botright, color=(0, 0, 255), thickness=2
-            )
-
-        curr_markers = []
-        # Compute relevant values of motion marker positions
-        for i in range(num_boxes):
-            # Compute centers of found bounding boxes
-            curr_center = np.array(
-                [
-                    bboxes_new[i][0] + bboxes_new[i][2] / 2,
-                    bboxes_new[i][1] + bboxes_new[i][3] / 2,
-                ]
-            )
-            curr_markers.append(curr_center)
+    num_frames = end_frame - max(start_frame, 1) + 1
+    marker_writer = MarkerWriter(
+        os.path.join(folder, "markers"),
+        num_frames,
+        num_boxes,
+        csv_path=os.path.join(folder, "markers.csv") if csv else None,
+    )
+    # The selection frame is tracked first, then the rest of the range.
+    pending = itertools.chain([first], frames)
+    with marker_writer, profiling.session(profile, "track_markers", folder):
+        while True:
+            with profiling.timer("read"):
+                framenum, timestamp_ms, frame = next(pending, (None,) * 3)
+            if frame is None:
+                break
+
+            with profiling.timer("write_cut"):
+                cut_movie.write(frame)
+            # Give tracker new frame with minimal movement
+            with profiling.timer("track"):
+                bboxes_new, valid = marker_tracker.update(frame)
+
+            if not frame.flags.writeable:
+                # Cached frames are read-only views of the cache file.
+                frame = frame.copy()
+            if not valid.all():
+                cv2.putText(
+                    frame,
+                    text="One of the objects not found",
+                    org=(20, 70),
+                    fontFace=cv2.FONT_HERSHEY_SIMPLEX,
+                    fontScale=0.75,
+                    color=(0, 0, 255),
+                    thickness=2,
+                )
+
+            for box in bboxes_new:
+                topleft = (int(box[0]), int(box[1]))
+                botright = (int(box[0] + box[2]), int(box[1] + box[3]))
+                cv2.rectangle(
+                    frame, topleft, botright, color=(0, 0, 255), thickness=2
+                )
 
-        # Markers are stored as a flattened array, x then y coordinate of each point.
-        markers.append(np.array(curr_markers).flatten())
+            # Compute centers of found bounding boxes
+            centers = bboxes_new[:, :2] + bboxes_new[:, 2:] / 2
+            with profiling.timer("markers"):
+                marker_writer.append(framenum, timestamp_ms, centers, valid)
 
-        cv2.imshow("Tracker (press Q to exit early)", frame)
-        tracked_movie.write(frame)
+            with profiling.timer("display"):
+                cv2.imshow("Tracker (press Q to exit early)", frame)
+                key = cv2.waitKey(1)
+            with profiling.timer("write_tracked"):
+                tracked_movie.write(frame)
 
-        if cv2.waitKey(1) & 0xFF == ord("q"):
-            print("Exited early!")
-            break
+            if key & 0xFF == ord("q"):
+                print("Exited early!")
+                break
 
+    frames.close()
     cut_movie.release()
     tracked_movie.release()
-    cap.release()
     cv2.destroyAllWindows()
 
-    np.savetxt(f"{folder}/markers.csv", markers, delimiter=",")
+
+def _open_frames(
+    filepath: str, start_frame: int, end_frame: int, frame_cache: FrameCache
+):
+    """Return the frame rate and an iterator over the frames to track.
+
+    The iterator yields frame number (counted from 1), video timestamp in ms
+    and frame for frames start_frame to end_frame, decoded from the video or
+    read from frame_cache if it is not None.
+    """
+    if frame_cache is not None:
+        cached = frame_cache.open(
+            filepath, max(start_frame, 1) - 1, end_frame - 1
+        )
+
+        def read_cached():
+            with cached:
+                for frame_index, timestamp_ms, frame in cached:
+                    yield frame_index + 1, timestamp_ms, frame
+
+        return cached.fps, read_cached()
+
+    cap = cv2.VideoCapture(filepath)
+
+    def read_video():
+        framenum = 0
+        try:
+            while cap.isOpened():
+                ret, frame = cap.read()
+                framenum += 1
+                if framenum < start_frame:
+                    continue
+                if not ret or framenum > end_frame:
+                    break
+                yield framenum, cap.get(cv2.CAP_PROP_POS_MSEC), frame
+        finally:
+            cap.release()
+
+    return cap.get(cv2.CAP_PROP_FPS), read_video()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,185 @@
+"""Marker tracker backends for track_markers.py.
+
+All backends are created from the first frame and the selected bounding
+boxes and return the boxes and a per-marker valid flag for every new frame:
+
+    tracker = create_tracker("flow", frame, bboxes)
+    bboxes, valid = tracker.update(next_frame)
+
+- ``csrt``: one CSRT correlation tracker per marker (cv2.legacy.MultiTracker).
+  Robust, but costs tens of milliseconds per marker and frame.
+- ``flow``: pyramidal Lucas-Kanade optical flow of all marker centers in a
+  single call. A marker is lost if the flow fails or if tracking its new
+  position back to the previous frame misses the old position by more than
+  fb_threshold pixels (forward-backward check). Only lost markers get a CSRT
+  tracker, which re-detects them until flow can take over again. The box
+  sizes are kept from the selection, which suits small markers.
+
+CSRT needs opencv-contrib-python (see the note in track_markers.py).
+"""
+
+import cv2
+import numpy as np
+
+TRACKERS = ("csrt", "flow")
+
+
+def _create_csrt():
+    """Return a new CSRT tracker of the legacy contrib API."""
+    return cv2.legacy.TrackerCSRT_create()
+
+
+class CsrtTracker:
+    """Track every marker with its own CSRT tracker."""
+
+    def __init__(self, frame: np.array, bboxes: list):
+        """Initialize one CSRT tracker per bounding box.
+
+        Args:
+            frame (array(H, W, 3)): First frame.
+            bboxes (list): (x, y, w, h) of every marker in frame.
+        """
+        self._trackers = cv2.legacy.MultiTracker_create()
+        for bbox in bboxes:
+            self._trackers.add(_create_csrt(), frame, tuple(bbox))
+
+    def update(self, frame: np.array):
+        """Track the markers into frame.
+
+        Returns:
+            tuple: bboxes (array(N, 4)) and valid (array(N,) of bool).
+        """
+        found, bboxes = self._trackers.update(frame)
+        bboxes = np.asarray(bboxes, dtype=np.float64)
+        # MultiTracker only reports whether all markers were found, so a
+        # marker is only flagged as valid if the update succeeded and its box
+        # did not collapse.
+        return bboxes, found & np.all(bboxes[:, 2:] > 0, axis=1)
+
+
+class FlowTracker:  # pylint: disable=too-many-instance-attributes
+    # Justification: flow parameters plus the state of every marker.
+    """Track marker centers with optical flow, re-detect lost ones by CSRT."""
+
+    def __init__(
+        self,
+        frame: np.array,
+        bboxes: list,
+        win_size: int = 21,
+        max_level: int = 3,
+        fb_threshold: float = 1.0,
+        redetect: bool = True,
+    ):  # pylint: disable=too-many-arguments
+        # Justification: all arguments configure the flow.
+        """Initialize the tracker.
+
+        Args:
+            frame (array(H, W, 3)): First frame.
+            bboxes (list): (x, y, w, h) of every marker in frame.
+            win_size (int): Size of the flow search window in pixels.
+            max_level (int): Number of pyramid levels above the frame.
+            fb_threshold (float): Maximum forward-backward error in pixels.
+            redetect (bool): Re-detect lost markers with CSRT.
+        """
+        bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+        self.sizes = bboxes[:, 2:].copy()
+        self.centers = (bboxes[:, :2] + self.sizes / 2).astype(np.float32)
+        self.valid = np.ones(len(bboxes), dtype=bool)
+        self.fb_threshold = fb_threshold
+        self._flow_params = {
+            "winSize": (win_size, win_size),
+            "maxLevel": max_level,
+            "criteria": (
+                cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT,
+                30,
+                0.01,
+            ),
+        }
+        if redetect and not hasattr(cv2, "legacy"):
+            print(
+                "WARNING: cv2.legacy is missing (opencv-contrib-python), "
+                "lost markers are not re-detected."
+            )
+            redetect = False
+        self.redetect = redetect
+        self._redetectors = {}
+        self._prev_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        # The caller may draw into its frames, CSRT is started on a copy.
+        self._prev_frame = frame.copy() if redetect else None
+
+    def _boxes(self) -> np.array:
+        """Return the (N, 4) boxes around the current centers."""
+        return np.hstack((self.centers - self.sizes / 2, self.sizes))
+
+    def _track_flow(self, gray: np.array) -> np.array:
+        """Move the valid markers by optical flow, return the lost indices."""
+        active = np.flatnonzero(self.valid)
+        if active.size == 0:
+            return active
+        points = self.centers[active].reshape(-1, 1, 2)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(
+            self._prev_gray, gray, points, None, **self._flow_params
+        )
+        back, status_back, _ = cv2.calcOpticalFlowPyrLK(
+            gray, self._prev_gray, moved, None, **self._flow_params
+        )
+        moved = moved.reshape(-1, 2)
+        fb_error = np.linalg.norm(
+            points.reshape(-1, 2) - back.reshape(-1, 2), axis=1
+        )
+        height, width = gray.shape
+        tracked = (
+            status.ravel().astype(bool)
+            & status_back.ravel().astype(bool)
+            & (fb_error < self.fb_threshold)
+            & np.all(moved >= 0, axis=1)
+            & (moved[:, 0] < width)
+            & (moved[:, 1] < height)
+        )
+        self.centers[active[tracked]] = moved[tracked]
+        lost = active[~tracked]
+        self.valid[lost] = False
+        return lost
+
+    def _redetect(self, frame: np.array, lost: np.array):
+        """Start CSRT on newly lost markers and update all lost markers."""
+        boxes = self._boxes()
+        for idx in lost:
+            tracker = _create_csrt()
+            tracker.init(self._prev_frame, tuple(boxes[idx]))
+            self._redetectors[idx] = tracker
+        for idx, tracker in list(self._redetectors.items()):
+            found, box = tracker.update(frame)
+            if found and box[2] > 0 and box[3] > 0:
+                # Flow takes over again from the re-detected center.
+                self.centers[idx] = (
+                    box[0] + box[2] / 2,
+                    box[1] + box[3] / 2,
+                )
+                self.valid[idx] = True
+                del self._redetectors[idx]
+
+    def update(self, frame: np.array):
+        """Track the markers into frame.
+
+        Returns:
+            tuple: bboxes (array(N, 4)) and valid (array(N,) of bool). Lost
+                markers keep their last box.
+        """
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        lost = self._track_flow(gray)
+        if self.redetect:
+            if lost.size or self._redetectors:
+                self._redetect(frame, lost)
+            self._prev_frame = frame.copy()
+        self._prev_gray = gray
+        return self._boxes(), self.valid.copy()
+
+
+def create_tracker(name: str, frame: np.array, bboxes: list, **kwargs):
+    """Create the tracker backend name, one of TRACKERS."""
+    if name == "csrt":
+        return CsrtTracker(frame, bboxes, **kwargs)
+    if name == "flow":
+        return FlowTracker(frame, bboxes, **kwargs)
+    raise ValueError(f"Unknown tracker {name}, expected one of {TRACKERS}")
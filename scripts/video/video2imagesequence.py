@@ -1,9 +1,17 @@
 import argparse
+import os
+import sys
 
 import cv2
 import numpy as np
 from PIL import Image
 
+# Shared utilities of the repository (profiling) are in src/.
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../src")
+)
+import profiling  # noqa: E402 pylint: disable=wrong-import-position
+
 
 def video2imagesequence(
     video_path, interval_seconds, top_left_corner, crop_size
@@ -37,26 +45,29 @@ def video2imagesequence(
     images = []
 
     while cap.isOpened():
-        ret, frame = cap.read()
+        with profiling.timer("read"):
+            ret, frame = cap.read()
         if not ret:
             break
 
         # Extract and save the image at the defined interval
         if current_frame % frame_interval == 0:
-            # Convert the frame from BGR to RGB color space
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            pil_image = Image.fromarray(frame_rgb)
-
-            # Crop the image
-            left, top = top_left_corner
-            right = left + crop_size[0]
-            bottom = top + crop_size[1]
-            pil_image_cropped = pil_image.crop((left, top, right, bottom))
-            images.append(pil_image_cropped)
+            with profiling.timer("crop"):
+                # Convert the frame from BGR to RGB color space
+                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                pil_image = Image.fromarray(frame_rgb)
+
+                # Crop the image
+                left, top = top_left_corner
+                right = left + crop_size[0]
+                bottom = top + crop_size[1]
+                pil_image_cropped = pil_image.crop((left, top, right, bottom))
+                images.append(pil_image_cropped)
 
             # Save the cropped image
             output_path = f"image_{image_count:04d}.jpg"
-            pil_image_cropped.save(output_path)
+            with profiling.timer("save"):
+                pil_image_cropped.save(output_path)
             print(f"Saved {output_path}")
             image_count += 1
 
@@ -97,12 +108,14 @@ if __name__ == "__main__":
     parser.add_argument(
         "crop_height", type=int, help="Height of the crop area"
     )
+    profiling.add_argument(parser)
 
     args = parser.parse_args()
 
     top_left_corner = (args.top_left_x, args.top_left_y)
     crop_size = (args.crop_width, args.crop_height)
 
-    video2imagesequence(
-        args.video_path, args.interval_seconds, top_left_corner, crop_size
-    )
+    with profiling.session(args.profile, "video2imagesequence"):
+        video2imagesequence(
+            args.video_path, args.interval_seconds, top_left_corner, crop_size
+        )
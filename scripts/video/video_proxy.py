@@ -0,0 +1,175 @@
+"""Downscaled proxy of a video for instant scrubbing.
+
+The proxy is a memory-mapped ``.npy`` stack of downscaled frames
+(frames x height x width x 3, uint8) that is built once by decoding the
+video sequentially and stored next to the source as
+``.<video name>.proxy-<fingerprint>-<width>w-<step>s.npy``. The fingerprint
+is computed from the video content, so the proxy is rebuilt automatically
+when the video changes. Reading a proxy frame is a plain memory access,
+independent of the codec and GOP structure of the source.
+
+Proxy frame i corresponds to frame i * step of the original video.
+"""
+
+import hashlib
+import os
+
+import cv2
+import numpy as np
+
+# Bytes hashed at the start and end of the video, hashing whole multi-gigabyte
+# files would take longer than building the proxy.
+FINGERPRINT_CHUNK_BYTES = 16 * 1024 * 1024
+
+
+def video_fingerprint(filepath: str) -> str:
+    """Return a short content hash of a video file.
+
+    The hash covers the file size and the first and last 16 MB, which
+    contain the container headers and index of common video formats.
+
+    Args:
+        filepath (str): Video filepath.
+
+    Returns:
+        str: Hex digest of 16 characters.
+    """
+    size = os.path.getsize(filepath)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=8)
+    with open(filepath, "rb") as file:
+        digest.update(file.read(FINGERPRINT_CHUNK_BYTES))
+        if size > FINGERPRINT_CHUNK_BYTES:
+            file.seek(
+                max(FINGERPRINT_CHUNK_BYTES, size - FINGERPRINT_CHUNK_BYTES)
+            )
+            digest.update(file.read(FINGERPRINT_CHUNK_BYTES))
+    return digest.hexdigest()
+
+
+def proxy_path(filepath: str, width: int, step: int) -> str:
+    """Return the path of the proxy file for a video."""
+    directory, filename = os.path.split(filepath)
+    fingerprint = video_fingerprint(filepath)
+    return os.path.join(
+        directory, f".{filename}.proxy-{fingerprint}-{width}w-{step}s.npy"
+    )
+
+
+def build_proxy(filepath: str, output_path: str, width: int, step: int):
+    """Decode a video once and store every step-th frame downscaled.
+
+    The proxy is written to a temporary file that is only renamed to
+    output_path once it is complete, so an interrupted build is never used.
+
+    Args:
+        filepath (str): Video filepath.
+        output_path (str): Path of the proxy .npy file.
+        width (int): Width of the proxy frames in pixels.
+        step (int): Keep every step-th frame.
+    """
+    cap = cv2.VideoCapture(filepath)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video {filepath}")
+    length = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    src_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    src_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    width = min(width, src_width)
+    height = max(1, round(src_height * width / src_width))
+
+    tmp_path = output_path[: -len(".npy")] + ".partial.npy"
+    stack = np.lib.format.open_memmap(
+        tmp_path,
+        mode="w+",
+        dtype=np.uint8,
+        shape=((length + step - 1) // step, height, width, 3),
+    )
+    count = 0
+    frame_number = 0
+    while count < stack.shape[0]:
+        if frame_number % step == 0:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            cv2.resize(
+                frame,
+                (width, height),
+                dst=stack[count],
+                interpolation=cv2.INTER_AREA,
+            )
+            count += 1
+        elif not cap.grab():
+            break
+        frame_number += 1
+    cap.release()
+
+    if count < stack.shape[0]:
+        # CAP_PROP_FRAME_COUNT is only an estimate for some containers.
+        trimmed = np.array(stack[:count])
+        del stack
+        np.save(tmp_path, trimmed)
+    else:
+        stack.flush()
+        del stack
+    os.replace(tmp_path, output_path)
+
+
+class ProxyReader:
+    """Read frames of a video from its downscaled proxy.
+
+    Has the same interface as frame_reader.FrameReader, frame numbers always
+    refer to the original video.
+    """
+
+    def __init__(self, filepath: str, width: int = 640, step: int = 1):
+        """Open the proxy of a video, building it first if necessary.
+
+        Args:
+            filepath (str): Video filepath.
+            width (int): Width of the proxy frames in pixels.
+            step (int): Keep every step-th frame in the proxy.
+
+        Raises:
+            IOError: If no frame of the video could be decoded.
+        """
+        self.step = max(1, step)
+        path = proxy_path(filepath, width, self.step)
+        if not os.path.exists(path):
+            print(f"Building proxy {path} ...")
+            build_proxy(filepath, path, width, self.step)
+        self._stack = np.load(path, mmap_mode="r")
+        if self._stack.shape[0] == 0:
+            # Nothing to map frame numbers to, and nothing worth caching.
+            self._stack = None
+            os.remove(path)
+            raise IOError(f"Could not decode any frame of video {filepath}")
+        cap = cv2.VideoCapture(filepath)
+        self.fps = cap.get(cv2.CAP_PROP_FPS)
+        self.length = min(
+            self._stack.shape[0] * self.step,
+            int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+        )
+        cap.release()
+
+    def to_proxy_index(self, frame_number: int) -> int:
+        """Map a frame number of the original video to a proxy index."""
+        return min(self._stack.shape[0] - 1, max(0, frame_number // self.step))
+
+    def to_frame_number(self, proxy_index: int) -> int:
+        """Map a proxy index to the frame number in the original video."""
+        return proxy_index * self.step
+
+    def get(self, frame_number: int):
+        """Return the proxy frame showing the given original frame number."""
+        return self._stack[self.to_proxy_index(frame_number)]
+
+    def close(self):
+        """Release the memory map."""
+        self._stack = None
+
+    def __enter__(self):
+        """Return the reader itself."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Release the memory map."""
+        self.close()
@@ -0,0 +1,279 @@
+"""Video writer that encodes with an ffmpeg subprocess.
+
+cv2.VideoWriter with the mp4v fourcc is slow, produces large files and has
+no encoder settings. ``VideoWriter`` streams the raw BGR frame buffers
+through a pipe into ``ffmpeg``, which encodes them in its own process (and
+threads) with the chosen codec, CRF and preset, while the caller already
+works on the next frame. Frames are written from their own memory, the only
+copy is the one into the pipe.
+
+If ffmpeg is not installed, the writer falls back to cv2.VideoWriter with
+the mp4v fourcc and ignores the encoder settings.
+
+Example:
+    >>> with VideoWriter("out.mp4", fps, (width, height), crf=18) as writer:
+    ...     writer.write(frame)
+"""
+
+import shutil
+import subprocess
+
+import cv2
+import numpy as np
+
+DEFAULT_CODEC = "libx264"
+DEFAULT_CRF = 23
+DEFAULT_PRESET = "veryfast"
+PRESETS = (
+    "ultrafast",
+    "superfast",
+    "veryfast",
+    "faster",
+    "fast",
+    "medium",
+    "slow",
+    "slower",
+    "veryslow",
+)
+BACKENDS = ("auto", "ffmpeg", "cv2")
+
+# Command line options of the encoder settings, shared by the argparse
+# (add_arguments) and click (click_options) scripts.
+ENCODER_OPTIONS = (
+    (
+        "codec",
+        {
+            "type": str,
+            "default": DEFAULT_CODEC,
+            "help": "ffmpeg video encoder.",
+        },
+    ),
+    (
+        "crf",
+        {
+            "type": int,
+            "default": DEFAULT_CRF,
+            "help": "Constant rate factor, lower is better quality.",
+        },
+    ),
+    (
+        "preset",
+        {
+            "type": str,
+            "choices": PRESETS,
+            "default": DEFAULT_PRESET,
+            "help": "Encoder speed preset.",
+        },
+    ),
+    (
+        "threads",
+        {
+            "type": int,
+            "default": 0,
+            "help": "Encoder threads, 0 to let ffmpeg decide.",
+        },
+    ),
+    (
+        "writer",
+        {
+            "type": str,
+            "choices": BACKENDS,
+            "default": "auto",
+            "help": "Encode with ffmpeg or OpenCV, auto uses ffmpeg if "
+            "installed.",
+        },
+    ),
+)
+
+
+class VideoWriter:  # pylint: disable=too-many-instance-attributes
+    # Justification: encoder settings plus the state of the backend.
+    """Write BGR frames to a video file, through ffmpeg if available."""
+
+    def __init__(
+        self,
+        path: str,
+        fps: float,
+        frame_size: tuple,
+        codec: str = DEFAULT_CODEC,
+        crf: int = DEFAULT_CRF,
+        preset: str = DEFAULT_PRESET,
+        threads: int = 0,
+        backend: str = "auto",
+    ):  # pylint: disable=too-many-arguments
+        # Justification: all arguments configure the encoder.
+        """Start the encoder.
+
+        Args:
+            path (str): Output video filepath.
+            fps (float): Frames per second.
+            frame_size (tuple): (width, height) of the frames in pixels.
+            codec (str): ffmpeg video encoder, e.g. libx264 or libx265.
+            crf (int): Constant rate factor, lower is better quality.
+            preset (str): Encoder speed preset, one of PRESETS.
+            threads (int): Encoder threads, 0 to let ffmpeg decide.
+            backend (str): One of BACKENDS, auto uses ffmpeg if installed.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(
+                f"Unknown backend {backend}, use one of {BACKENDS}"
+            )
+        self.path = path
+        self.fps = fps
+        self.frame_size = (int(frame_size[0]), int(frame_size[1]))
+        self._frame_shape = (self.frame_size[1], self.frame_size[0], 3)
+        self._process = None
+        self._writer = None
+
+        ffmpeg = shutil.which("ffmpeg")
+        if backend == "ffmpeg" and ffmpeg is None:
+            raise IOError("ffmpeg was not found on the PATH")
+        if backend == "cv2" or ffmpeg is None:
+            if backend == "auto":
+                print("WARNING: ffmpeg not found, writing with OpenCV (mp4v).")
+            self.backend = "cv2"
+            self._writer = cv2.VideoWriter(
+                path, cv2.VideoWriter_fourcc(*"mp4v"), fps, self.frame_size
+            )
+            if not self._writer.isOpened():
+                raise IOError(f"Could not open video writer for {path}")
+            return
+
+        self.backend = "ffmpeg"
+        command = [
+            ffmpeg,
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-y",
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            "bgr24",
+            "-s",
+            f"{self.frame_size[0]}x{self.frame_size[1]}",
+            "-r",
+            str(fps),
+            "-i",
+            "-",
+            "-an",
+            "-c:v",
+            codec,
+            "-preset",
+            preset,
+            "-crf",
+            str(crf),
+            "-threads",
+            str(threads),
+            # 4:2:0 chroma plays everywhere but needs even frame sizes.
+            "-vf",
+            "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            "-pix_fmt",
+            "yuv420p",
+            "-movflags",
+            "+faststart",
+            path,
+        ]
+        # The process lives until release() is called.
+        # pylint: disable-next=consider-using-with
+        self._process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+
+    def write(self, frame: np.array):
+        """Append a frame.
+
+        The frame is copied into the pipe (or by OpenCV) before this method
+        returns, so the caller may modify it afterwards.
+
+        Args:
+            frame (array(H, W, 3)): BGR uint8 frame of the writer's size.
+        """
+        if self._writer is not None:
+            self._writer.write(frame)
+            return
+        if frame.shape != self._frame_shape or frame.dtype != np.uint8:
+            raise ValueError(
+                f"Expected a uint8 frame of shape {self._frame_shape}, "
+                f"got {frame.dtype} {frame.shape}"
+            )
+        try:
+            # The buffered pipe passes large buffers on without copying.
+            self._process.stdin.write(
+                memoryview(np.ascontiguousarray(frame)).cast("B")
+            )
+        except BrokenPipeError as error:
+            raise IOError(
+                f"ffmpeg stopped encoding {self.path}: {self._stop()}"
+            ) from error
+
+    def _stop(self) -> str:
+        """Close the pipe, wait for ffmpeg and return its error output."""
+        process, self._process = self._process, None
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        errors = process.stderr.read().decode(errors="replace").strip()
+        process.stderr.close()
+        if process.wait() != 0:
+            return errors or f"exit code {process.returncode}"
+        return ""
+
+    def release(self):
+        """Finish the video file."""
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+        elif self._process is not None:
+            errors = self._stop()
+            if errors:
+                raise IOError(f"ffmpeg failed to encode {self.path}: {errors}")
+
+    def __enter__(self):
+        """Return the writer itself."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Finish the video file."""
+        self.release()
+
+
+def add_arguments(parser):
+    """Add the encoder options to an argparse parser."""
+    group = parser.add_argument_group("video encoding")
+    for name, option in ENCODER_OPTIONS:
+        group.add_argument(f"--{name}", **option)
+
+
+def click_options(command):
+    """Add the encoder options to a click command, as a decorator."""
+    import click  # pylint: disable=import-outside-toplevel
+
+    # click lists the options in the reverse order of their decorators.
+    for name, option in reversed(ENCODER_OPTIONS):
+        option = dict(option)
+        if "choices" in option:
+            option["type"] = click.Choice(option.pop("choices"))
+        command = click.option(f"--{name}", **option)(command)
+    return command
+
+
+def writer_kwargs(options) -> dict:
+    """Return the VideoWriter arguments of the parsed encoder options.
+
+    Args:
+        options: argparse namespace of add_arguments, or dict of the
+            keyword arguments of click_options.
+    """
+    if not isinstance(options, dict):
+        options = vars(options)
+    return {
+        "codec": options["codec"],
+        "crf": options["crf"],
+        "preset": options["preset"],
+        "threads": options["threads"],
+        "backend": options["writer"],
+    }
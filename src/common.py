@@ -28,12 +28,71 @@ class Rate:  # pylint: disable=too-few-public-methods
         self._last_time = time.monotonic()
 
 
-def get_datetime_str(
-    time_start: datetime.datetime = datetime.datetime.now(),
-) -> str:
+def get_datetime_str(time_start: datetime.datetime = None) -> str:
     """Return a string of the current date and time.
 
-    :param time_start: The start time.(Optional)
+    :param time_start: The start time, defaults to now.(Optional)
     :return: The string of the current date and time.
     """
+    if time_start is None:
+        time_start = datetime.datetime.now()
     return time_start.strftime("%Y%m%d%H%M%S")
+
+
+class Clock:
+    """Monotonic nanosecond timestamps with a wall-clock anchor.
+
+    Samples are stamped with time.monotonic_ns(): an integer that is cheap to
+    read, has the best resolution of the system and is never stepped by NTP,
+    so differences between timestamps are always valid. The anchor pairs one
+    monotonic reading with the wall-clock time at the same moment, to convert
+    timestamps to wall-clock time for file names, logs or ROS headers.
+    """
+
+    def __init__(self):
+        """Create a clock and measure its anchor."""
+        self.anchor_monotonic_ns = 0
+        self.anchor_wall_ns = 0
+        self.reanchor()
+
+    @staticmethod
+    def now_ns() -> int:
+        """Return the current monotonic time in integer nanoseconds."""
+        return time.monotonic_ns()
+
+    def reanchor(self, num_tries: int = 5):
+        """Measure the anchor again, e.g. after the wall clock was stepped.
+
+        The wall clock is read between two monotonic readings and the
+        tightest of num_tries brackets is kept.
+        """
+        best_width = None
+        for _ in range(num_tries):
+            before = time.monotonic_ns()
+            wall = time.time_ns()
+            after = time.monotonic_ns()
+            if best_width is None or after - before < best_width:
+                best_width = after - before
+                self.anchor_monotonic_ns = (before + after) // 2
+                self.anchor_wall_ns = wall
+
+    def to_wall_ns(self, monotonic_ns):
+        """Convert monotonic nanoseconds (int or array) to wall-clock ns."""
+        return monotonic_ns - self.anchor_monotonic_ns + self.anchor_wall_ns
+
+    def to_wall(self, monotonic_ns):
+        """Convert monotonic nanoseconds (int or array) to wall-clock s."""
+        return self.to_wall_ns(monotonic_ns) * 1e-9
+
+    def to_datetime(self, monotonic_ns: int) -> datetime.datetime:
+        """Convert a monotonic timestamp to a local datetime."""
+        return datetime.datetime.fromtimestamp(self.to_wall(monotonic_ns))
+
+
+def ns_to_sec(timestamps_ns):
+    """Convert integer nanoseconds (int or array) to float seconds."""
+    return timestamps_ns * 1e-9
+
+
+# Clock shared by all acquisition classes of a process.
+CLOCK = Clock()
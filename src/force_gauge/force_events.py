@@ -0,0 +1,263 @@
+"""Event detection on the force gauge stream.
+
+Detectors are attached to a ForceGauge (or AsyncForceGauge) and run inside
+its acquisition path: every batch of readings that one serial read
+completes is checked at once with NumPy, and the registered callbacks are
+called and threading.Events set right after the triggering frame was
+decoded, instead of up to a polling period later. Short events between two
+polls are not missed either.
+
+    contact = HysteresisDetector("contact", high=0.5, low=0.2)
+    contact.on_event(lambda event: print(event))
+    gauge = ForceGauge("/dev/ttyUSB0", detectors=[contact])
+    contact.event.wait()
+
+Forces are in the unit set on the gauge. Every event carries the arrival
+time of its triggering frame and the time it was detected, both in
+time.monotonic_ns() (see common.Clock), so the detection latency can be
+measured. Callbacks run in the acquisition thread (or event loop) and
+should return quickly. An exception raised by a callback is printed and
+counted in num_errors, the acquisition and the other callbacks go on.
+"""
+
+import collections
+import threading
+import time
+import traceback
+
+import numpy as np
+
+RISING = "rising"
+FALLING = "falling"
+BOTH = "both"
+# Transmission time of one 16 byte frame at the 9600 baud of the gauge (8N1,
+# 10 bits per byte), no two frames arrive closer together.
+DEFAULT_FRAME_PERIOD_NS = 16 * 10 * 10**9 // 9600
+
+# kind is RISING or FALLING, timestamp_ns the arrival time of the triggering
+# frame, detected_ns the time the event was fired, force the force of the
+# triggering frame and value the quantity that triggered the event (force or
+# rate of change).
+ForceEvent = collections.namedtuple(
+    "ForceEvent",
+    ["name", "kind", "timestamp_ns", "detected_ns", "force", "value"],
+)
+
+
+class EventDetector:
+    """Base class of detectors, fires the events found in each batch."""
+
+    def __init__(self, name: str):
+        """Create a detector without callbacks.
+
+        Args:
+            name (str): Name of the detector, passed on in its events.
+        """
+        self.name = name
+        self.event = threading.Event()
+        self.last_event = None
+        self.num_events = 0
+        self.num_errors = 0
+        self._targets = []
+
+    def on_event(self, target):
+        """Call a function with every ForceEvent, or set a threading.Event."""
+        self._targets.append(target)
+
+    def _detect(self, timestamps_ns: np.array, forces: np.array):
+        """Return indices, kinds (True for rising) and values of events."""
+        raise NotImplementedError
+
+    def process(self, records: np.array) -> list:
+        """Check a batch of force_gauge.FORCE_RECORD_DTYPE records.
+
+        Returns:
+            list: ForceEvents fired for the batch, in order.
+        """
+        if len(records) == 0:
+            return []
+        forces = records["force"].astype(np.float64)
+        indices, rising, values = self._detect(records["timestamp"], forces)
+        if len(indices) == 0:
+            return []
+        detected_ns = time.monotonic_ns()
+        events = [
+            ForceEvent(
+                self.name,
+                RISING if is_rising else FALLING,
+                int(records["timestamp"][idx]),
+                detected_ns,
+                float(forces[idx]),
+                float(value),
+            )
+            for idx, is_rising, value in zip(indices, rising, values)
+        ]
+        for event in events:
+            self._fire(event)
+        return events
+
+    def _fire(self, event: ForceEvent):
+        """Pass an event to all targets."""
+        self.last_event = event
+        self.num_events += 1
+        self.event.set()
+        for target in self._targets:
+            if isinstance(target, threading.Event):
+                target.set()
+                continue
+            try:
+                target(event)
+            except Exception:  # pylint: disable=broad-except
+                # Justification: a faulty callback must not stop acquisition.
+                self.num_errors += 1
+                print(f"ERROR: callback {target!r} of {self.name} failed:")
+                traceback.print_exc()
+
+
+class ThresholdDetector(EventDetector):
+    """Fire when the force crosses a level."""
+
+    def __init__(self, name: str, level: float, direction: str = RISING):
+        """Create the detector.
+
+        Args:
+            name (str): Name of the detector.
+            level (float): Force level.
+            direction (str): RISING, FALLING or BOTH crossings.
+        """
+        super().__init__(name)
+        if direction not in (RISING, FALLING, BOTH):
+            raise ValueError(f"Unknown direction {direction}")
+        self.level = level
+        self.direction = direction
+        self._previous = None
+
+    def _detect(self, timestamps_ns: np.array, forces: np.array):
+        """Return the crossings of the level."""
+        above = forces >= self.level
+        before = np.empty_like(above)
+        before[0] = above[0] if self._previous is None else self._previous
+        before[1:] = above[:-1]
+        self._previous = above[-1]
+        if self.direction == RISING:
+            changed = above & ~before
+        elif self.direction == FALLING:
+            changed = ~above & before
+        else:
+            changed = above != before
+        indices = np.flatnonzero(changed)
+        return indices, above[indices], forces[indices]
+
+
+class HysteresisDetector(EventDetector):
+    """Switch on above a high and off below a low level, e.g. contact.
+
+    Noise around a single level would fire a burst of threshold events,
+    the band between low and high suppresses them.
+    """
+
+    def __init__(self, name: str, high: float, low: float):
+        """Create the detector, initially off.
+
+        Args:
+            name (str): Name of the detector.
+            high (float): Level at or above which the state switches on.
+            low (float): Level at or below which the state switches off.
+        """
+        super().__init__(name)
+        if low >= high:
+            raise ValueError("low must be below high")
+        self.high = high
+        self.low = low
+        self.active = False
+
+    def _detect(self, timestamps_ns: np.array, forces: np.array):
+        """Return the on and off switches of the state."""
+        # Samples within the band keep the state of the last sample outside,
+        # found by carrying the last decisive index forward.
+        decisive = (forces >= self.high) | (forces <= self.low)
+        positions = np.where(decisive, np.arange(len(forces)), -1)
+        np.maximum.accumulate(positions, out=positions)
+        state = np.where(
+            positions >= 0,
+            forces[np.maximum(positions, 0)] >= self.high,
+            self.active,
+        )
+        before = np.empty_like(state)
+        before[0] = self.active
+        before[1:] = state[:-1]
+        self.active = bool(state[-1])
+        indices = np.flatnonzero(state != before)
+        return indices, state[indices], forces[indices]
+
+
+class DerivativeDetector(EventDetector):
+    """Fire when the rate of change of the force exceeds a limit, e.g. spikes.
+
+    The rate is computed between consecutive frames from their timestamps,
+    which are at least one frame period apart. Frames that share a
+    timestamp, e.g. when a recording is fed in chunks, are thus still
+    treated as consecutive frames. An event fires when the magnitude of the
+    rate reaches the limit after being below it, so a steep ramp fires once.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        direction: str = BOTH,
+        frame_period_ns: int = DEFAULT_FRAME_PERIOD_NS,
+    ):
+        """Create the detector.
+
+        Args:
+            name (str): Name of the detector.
+            rate (float): Limit of the rate of change in force unit per s.
+            direction (str): RISING (increasing force), FALLING or BOTH.
+            frame_period_ns (int): Minimum time between two frames.
+        """
+        super().__init__(name)
+        if direction not in (RISING, FALLING, BOTH):
+            raise ValueError(f"Unknown direction {direction}")
+        self.rate = rate
+        self.direction = direction
+        self.frame_period_ns = frame_period_ns
+        self._previous = None
+        self._previous_exceeded = False
+
+    def _detect(self, timestamps_ns: np.array, forces: np.array):
+        """Return the onsets of rates beyond the limit."""
+        timestamps_ns = timestamps_ns.astype(np.int64)
+        if self._previous is not None:
+            timestamps_ns = np.concatenate(
+                ([self._previous[0]], timestamps_ns)
+            )
+            forces = np.concatenate(([self._previous[1]], forces))
+            offset = 1
+        else:
+            offset = 0
+        self._previous = (timestamps_ns[-1], forces[-1])
+        if len(forces) < 2:
+            return np.empty(0, dtype=np.int64), [], []
+
+        # ForceGauge spreads the frames of one read over their transmission
+        # times. Timestamps that are closer (or equal, if the caller did not
+        # spread them) are one frame period apart, so that a jump is never
+        # missed or put on the interval to the next read.
+        elapsed_ns = np.maximum(
+            np.diff(timestamps_ns), self.frame_period_ns
+        ).astype(np.float64)
+        rates = np.diff(forces) / elapsed_ns * 1e9
+        if self.direction == RISING:
+            exceeded = rates >= self.rate
+        elif self.direction == FALLING:
+            exceeded = rates <= -self.rate
+        else:
+            exceeded = np.abs(rates) >= self.rate
+        before = np.empty_like(exceeded)
+        before[0] = self._previous_exceeded
+        before[1:] = exceeded[:-1]
+        self._previous_exceeded = bool(exceeded[-1])
+        onsets = np.flatnonzero(exceeded & ~before)
+        # Rate i ends at sample i + 1, which is record i + 1 - offset.
+        return onsets + 1 - offset, rates[onsets] > 0, rates[onsets]
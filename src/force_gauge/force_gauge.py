@@ -4,15 +4,48 @@ Works with the RS-Pro 111-3689 1-axis Force Gauge.
 The force gauge is connected to the computer via a 3.5mm single channel
 audio jack that is wired to a DB9 connector (see specification in
 docs/force_gauge-datasheet.pdf) through an RS-232 to USB converter.
+
+ForceGauge parses the serial stream in a background thread and is polled
+with read_gauge() / read_force(). AsyncForceGauge instead registers the
+serial port with an asyncio event loop and yields every reading as it
+arrives:
+
+    async with AsyncForceGauge("/dev/ttyUSB0") as gauge:
+        async for sample in gauge:
+            print(sample.timestamp_ns, sample.force, sample.unit)
 """
 
+import argparse
+import asyncio
+import collections
+import os
 import signal
 import sys
 import threading
 import time
+import traceback
 
+import numpy as np
 import serial
 
+# Shared utilities of the repository (profiling) are in src/.
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+)
+import profiling  # noqa: E402 pylint: disable=wrong-import-position
+
+# Record published to a sensor_bus.SensorBus: arrival time of the end word
+# of the frame in monotonic nanoseconds (see common.Clock) and force in the
+# unit of the gauge.
+FORCE_RECORD_DTYPE = np.dtype(
+    [("timestamp", "<i8"), ("force", "<f8"), ("unit", "S6")]
+)
+
+# Reading yielded by AsyncForceGauge, timestamp_ns as in FORCE_RECORD_DTYPE.
+ForceSample = collections.namedtuple(
+    "ForceSample", ["timestamp_ns", "force", "unit"]
+)
+
 
 class ForceGauge:  # pylint: disable=too-many-instance-attributes
     # Justification: these attributes are needed to handle the force sensor state machine.
@@ -22,9 +55,33 @@ class ForceGauge:  # pylint: disable=too-many-instance-attributes
     END_WORD = b"\r"
     CONSTANT_g = 9.810
 
-    def __init__(self, port: str = "/dev/ttyUSB0", baudrate: int = 9600):
-        """Initialize serial port to connect to force gauge."""
-        self.serial = serial.Serial(port=port, baudrate=baudrate)
+    def __init__(
+        self,
+        port: str = "/dev/ttyUSB0",
+        baudrate: int = 9600,
+        bus=None,
+        detectors=None,
+    ):
+        """Initialize serial port to connect to force gauge.
+
+        Args:
+            port (str): Serial port of the RS-232 to USB converter, None to
+                only parse bytes that are passed to feed (e.g. recordings).
+            baudrate (int): Baudrate of the gauge.
+            bus (sensor_bus.SensorBus): Optional bus with FORCE_RECORD_DTYPE
+                that every new reading is published to.
+            detectors (list): force_events detectors that check every new
+                batch of readings.
+        """
+        self.serial = None
+        if port is not None:
+            self.serial = serial.Serial(port=port, baudrate=baudrate)
+        # Transmission time of one byte, 8N1 frames take 10 bits.
+        self.byte_period_ns = 10 * 10**9 // baudrate
+        self.bus = bus
+        self.detectors = list(detectors or [])
+        # Readings completed by the current feed call.
+        self._completed = []
 
         self._byte_index = 0
 
@@ -34,6 +91,7 @@ class ForceGauge:  # pylint: disable=too-many-instance-attributes
         self.force_sign = 0
         self.force_decimal = 0
         self.force_raw = 0
+        # time.monotonic_ns() when the end word of the last frame arrived
         self.force_updated_time = 0
 
         self.exit_trigerred = threading.Event()
@@ -41,12 +99,16 @@ class ForceGauge:  # pylint: disable=too-many-instance-attributes
             target=self._update_state_loop
         )
         # self.update_state_freq = 50
-        self.update_state_thread.start()
+        if self.serial is not None:
+            self.update_state_thread.start()
+
+    def _read_chunk(self):
+        """Wait for data and return all bytes waiting with their arrival time.
 
-    def _read_next_byte(self):
-        """Read and return data from gauge and handle errors."""
-        new_byte = self.serial.read()
-        return new_byte
+        Returns: bytes, time.monotonic_ns() right after they were read.
+        """
+        data = self.serial.read(max(1, self.serial.in_waiting))
+        return data, time.monotonic_ns()
 
     def _update_state_loop(self):
         """Read force gauge data and update state machine based on received data.
@@ -54,18 +116,63 @@ class ForceGauge:  # pylint: disable=too-many-instance-attributes
         Called by a thread to continuously update the state machine.
         """
         while not self.exit_trigerred.is_set():
+            with profiling.timer("force_gauge.read"):
+                data, arrival_ns = self._read_chunk()
+            with profiling.timer("force_gauge.parse"):
+                self.feed(data, arrival_ns)
+
+    def feed(self, data: bytes, arrival_ns: int) -> np.array:
+        """Parse bytes received from the gauge.
+
+        A read can return several frames at once. Each byte is timestamped
+        with arrival_ns minus the transmission time of the bytes after it,
+        so the frames of one read get distinct, spread-out timestamps.
+
+        Args:
+            data (bytes): Next bytes of the stream.
+            arrival_ns (int): time.monotonic_ns() at which they were read,
+                i.e. the arrival time of the last byte.
+
+        Returns:
+            array(N,): FORCE_RECORD_DTYPE records of the readings that were
+                completed by data, also published to the bus if there is one
+                and checked by the detectors.
+        """
+        last_index = len(data) - 1
+        for index, value in enumerate(data):
             try:
-                self._update_gauge_state_machine()
+                self._update_gauge_state_machine(
+                    bytes((value,)),
+                    arrival_ns - (last_index - index) * self.byte_period_ns,
+                )
             except ValueError as error:
                 print(error)
+        if not self._completed:
+            return np.empty(0, dtype=FORCE_RECORD_DTYPE)
+        records = np.array(self._completed, dtype=FORCE_RECORD_DTYPE)
+        self._completed.clear()
+        if self.bus is not None:
+            self.bus.publish(records)
+        for detector in self.detectors:
+            with profiling.timer("force_gauge.detect"):
+                try:
+                    detector.process(records)
+                except Exception:  # pylint: disable=broad-except
+                    # Justification: the readings must still be returned and
+                    # the acquisition must go on.
+                    print(f"ERROR: detector {detector.name} failed:")
+                    traceback.print_exc()
+        return records
 
     def _update_gauge_state_machine(
-        self,
+        self, new_byte: bytes, arrival_ns: int
     ):  # pylint: disable=too-many-branches, disable=too-many-statements
         #  Justification: the branches are necessary to handle the state machine.
         #  Justification: doesn't make sense to break this up into smaller functions.
-        """Update state machine based on received data from force gauge."""
-        new_byte = self._read_next_byte()
+        """Update state machine with the next byte received from the gauge.
+
+        arrival_ns is the time.monotonic_ns() at which the byte arrived.
+        """
 
         # D15: Start Word
         if self._byte_index == 0:
@@ -175,10 +282,13 @@ class ForceGauge:  # pylint: disable=too-many-instance-attributes
                     self.force_val = (
                         self.force_raw * self.force_decimal * self.force_sign
                     )
-                    self.force_updated_time = time.time()
+                    self.force_updated_time = arrival_ns
                     self.force_raw = 0.0
                     self.force_decimal = 0
                     self.force_sign = 1
+                self._completed.append(
+                    (arrival_ns, self.force_val, self.force_unit)
+                )
                 # print(f"done reading bytes Force is: {self.force_val}")
             else:
                 print(
@@ -190,12 +300,14 @@ class ForceGauge:  # pylint: disable=too-many-instance-attributes
         """Thread-safe function to read force gauge data.
 
         Returns: force value, unit (as set on the force gauge), time since last update.
+        The age is measured on the monotonic clock, so it is not affected by
+        changes of the wall clock.
         """
         with self.gauge_lock:
             return (
                 self.force_val,
                 self.force_unit,
-                time.time() - self.force_updated_time,
+                (time.monotonic_ns() - self.force_updated_time) * 1e-9,
             )
 
     def read_force(self):
@@ -214,19 +326,162 @@ class ForceGauge:  # pylint: disable=too-many-instance-attributes
         #  Justification: arguments are required by signal.signal
         """Handle SIGINT signal."""
         self.exit_trigerred.set()
-        self.update_state_thread.join()
+        if self.update_state_thread.is_alive():
+            self.update_state_thread.join()
         sys.exit(0)
 
 
-if __name__ == "__main__":
-    fg = ForceGauge()
-    signal.signal(signal.SIGINT, fg.signal_handler)
+class AsyncForceGauge(ForceGauge):
+    """Force gauge that is read by an asyncio event loop instead of a thread.
+
+    The file descriptor of the serial port is registered with
+    loop.add_reader, so the bytes are parsed as soon as they arrive, in the
+    thread of the loop (e.g. together with a BLE IMU pipeline). Every reading
+    is yielded by async iteration, read_gauge() and the bus keep working.
+    Needs an event loop with add_reader, i.e. not the Proactor loop on
+    Windows.
+    """
+
+    def __init__(
+        self,
+        port: str = "/dev/ttyUSB0",
+        baudrate: int = 9600,
+        bus=None,
+        detectors=None,
+        max_queued: int = 1024,
+    ):
+        """Open the serial port and register it with the running loop.
 
-    while not fg.exit_trigerred.is_set():
+        Args:
+            port (str): Serial port of the RS-232 to USB converter.
+            baudrate (int): Baudrate of the gauge.
+            bus (sensor_bus.SensorBus): Optional bus with FORCE_RECORD_DTYPE
+                that every new reading is published to.
+            detectors (list): force_events detectors that check every new
+                batch of readings.
+            max_queued (int): Readings kept for a slow consumer, the oldest
+                are dropped and counted in num_dropped.
+        """
+        super().__init__(
+            port=None, baudrate=baudrate, bus=bus, detectors=detectors
+        )
+        # Non-blocking, a read returns the bytes that are already there.
+        self.serial = serial.Serial(port=port, baudrate=baudrate, timeout=0)
+        self.num_dropped = 0
+        self._samples = collections.deque(maxlen=max_queued)
+        self._error = None
+        self._closed = False
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self.serial.fileno(), self._on_readable)
+
+    def _on_readable(self):
+        """Parse the bytes that arrived, called by the event loop."""
         try:
-            print(f"Force gauge reading: {fg.read_gauge()}")
-            time.sleep(0.1)
-        except NotImplementedError:
-            print("Caught NotImplementedError")
-            fg.exit_trigerred.set()
-    fg.update_state_thread.join()
+            data = self.serial.read(max(1, self.serial.in_waiting))
+        except serial.SerialException as error:
+            self._error = error
+            self._stop_reading()
+            return
+        arrival_ns = time.monotonic_ns()
+        with profiling.timer("force_gauge.parse"):
+            records = self.feed(data, arrival_ns)
+        if len(records) == 0:
+            return
+        overflow = len(self._samples) + len(records) - self._samples.maxlen
+        if overflow > 0:
+            self.num_dropped += overflow
+        self._samples.extend(
+            ForceSample(
+                int(record["timestamp"]),
+                float(record["force"]),
+                record["unit"].decode(),
+            )
+            for record in records
+        )
+        self._wakeup.set()
+
+    def _stop_reading(self):
+        """Unregister the serial port and wake up the consumer."""
+        if not self._closed:
+            self._closed = True
+            self._loop.remove_reader(self.serial.fileno())
+            self._wakeup.set()
+
+    def __aiter__(self):
+        """Return the gauge itself, it iterates over its readings."""
+        return self
+
+    async def __anext__(self) -> ForceSample:
+        """Wait for the next reading.
+
+        Raises:
+            StopAsyncIteration: After aclose() once all readings are taken.
+            serial.SerialException: If reading the port failed.
+        """
+        while not self._samples:
+            if self._closed:
+                if self._error is not None:
+                    raise self._error
+                raise StopAsyncIteration
+            self._wakeup.clear()
+            await self._wakeup.wait()
+        return self._samples.popleft()
+
+    async def aclose(self):
+        """Stop reading and close the serial port.
+
+        Readings that were already received can still be iterated.
+        """
+        if self.serial is None:
+            return
+        self._stop_reading()
+        self.serial.close()
+        self.serial = None
+        self.exit_trigerred.set()
+
+    async def __aenter__(self):
+        """Return the gauge itself."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """Close the gauge."""
+        await self.aclose()
+
+
+async def _print_readings(port: str):
+    """Print every reading of the gauge as it arrives."""
+    async with AsyncForceGauge(port) as gauge:
+        async for sample in gauge:
+            print(f"Force gauge reading: {sample}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print force gauge data.")
+    parser.add_argument("--port", default="/dev/ttyUSB0", help="Serial port.")
+    parser.add_argument(
+        "--asyncio",
+        action="store_true",
+        help="Print every reading from an asyncio loop instead of polling.",
+    )
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
+    with profiling.session(args.profile, "force_gauge"):
+        if args.asyncio:
+            try:
+                asyncio.run(_print_readings(args.port))
+            except KeyboardInterrupt:
+                pass
+        else:
+            fg = ForceGauge(args.port)
+            signal.signal(signal.SIGINT, fg.signal_handler)
+
+            while not fg.exit_trigerred.is_set():
+                try:
+                    print(f"Force gauge reading: {fg.read_gauge()}")
+                    time.sleep(0.1)
+                except NotImplementedError:
+                    print("Caught NotImplementedError")
+                    fg.exit_trigerred.set()
+            fg.update_state_thread.join()
@@ -69,6 +69,162 @@ def camera_project_3d_to_pixel(point_3d: np.array, intrinsics: np.array):
     return point_2d[:2]
 
 
+def _split_distortion(distortion_coefficients: np.array):
+    """Return k1..k6, p1, p2 of OpenCV distortion coefficients."""
+    coeffs = np.zeros(8)
+    if distortion_coefficients is not None:
+        dist = np.asarray(distortion_coefficients, dtype=np.float64).ravel()
+        if dist.size not in (0, 4, 5, 8) and np.any(dist[8:]):
+            raise ValueError(
+                "Only the radial and tangential distortion coefficients "
+                "(k1, k2, p1, p2[, k3[, k4, k5, k6]]) are supported"
+            )
+        coeffs[: min(dist.size, 8)] = dist[:8]
+    k1, k2, p1, p2, k3, k4, k5, k6 = coeffs
+    return (k1, k2, k3, k4, k5, k6), (p1, p2)
+
+
+def camera_project_points(
+    points3d: np.array,
+    camera_intrinsic_matrix: np.array,
+    distortion_coefficients: np.array = None,
+    return_jacobian: bool = False,
+):  # pylint: disable=invalid-name too-many-locals
+    # Justification:
+    # the variable names follow the mathematical expressions
+    """Project 3d points in camera frame to pixel coordinates with distortion.
+
+    Vectorized counterpart of camera_unproject_pixel_to_world, with the same
+    (OpenCV) distortion model, so unprojecting the result at the depth of the
+    points returns the points. Gives the same pixels as cv2.projectPoints
+    with zero rotation and translation.
+
+    Args:
+        points3d (array(N*3)): array of 3d points in camera frame, in front
+            of the camera (z > 0)
+        camera_intrinsic_matrix (array(3*3)): camera intrinsic matrix
+        distortion_coefficients (array(4,), (5,) or (8,)): k1, k2, p1, p2,
+            k3, k4, k5, k6 as in OpenCV, None for no distortion
+        return_jacobian (bool): also return the derivatives of the pixel
+            coordinates with respect to the 3d points
+
+    Returns:
+        array(N*2): array of 2d pixel coordinates
+        array(N*2*3): d(u, v) / d(x, y, z) of every point, only if
+            return_jacobian is set
+    """
+    points3d = np.asarray(points3d, dtype=np.float64).reshape(-1, 3)
+    (k1, k2, k3, k4, k5, k6), (p1, p2) = _split_distortion(
+        distortion_coefficients
+    )
+    inv_z = 1.0 / points3d[:, 2]
+    x = points3d[:, 0] * inv_z
+    y = points3d[:, 1] * inv_z
+    x2 = x * x
+    y2 = y * y
+    xy = x * y
+    r2 = x2 + y2
+    numerator = 1.0 + r2 * (k1 + r2 * (k2 + r2 * k3))
+    denominator = 1.0 + r2 * (k4 + r2 * (k5 + r2 * k6))
+    radial = numerator / denominator
+    x_d = x * radial + 2.0 * p1 * xy + p2 * (r2 + 2.0 * x2)
+    y_d = y * radial + p1 * (r2 + 2.0 * y2) + 2.0 * p2 * xy
+
+    K2 = np.asarray(camera_intrinsic_matrix, dtype=np.float64)[:2]
+    points2d = np.empty((len(points3d), 2))
+    points2d[:, 0] = K2[0, 0] * x_d + K2[0, 1] * y_d + K2[0, 2]
+    points2d[:, 1] = K2[1, 0] * x_d + K2[1, 1] * y_d + K2[1, 2]
+    if not return_jacobian:
+        return points2d
+
+    # Chain rule: pixels <- distorted <- normalized <- 3d point coordinates.
+    d_numerator = k1 + r2 * (2.0 * k2 + r2 * 3.0 * k3)
+    d_denominator = k4 + r2 * (2.0 * k5 + r2 * 3.0 * k6)
+    d_radial = (d_numerator - radial * d_denominator) / denominator
+    J_d = np.empty((len(points3d), 2, 2))
+    J_d[:, 0, 0] = radial + 2.0 * x2 * d_radial + 2.0 * p1 * y + 6.0 * p2 * x
+    J_d[:, 0, 1] = 2.0 * xy * d_radial + 2.0 * p1 * x + 2.0 * p2 * y
+    J_d[:, 1, 0] = 2.0 * xy * d_radial + 2.0 * p1 * x + 2.0 * p2 * y
+    J_d[:, 1, 1] = radial + 2.0 * y2 * d_radial + 6.0 * p1 * y + 2.0 * p2 * x
+    J_n = np.zeros((len(points3d), 2, 3))
+    J_n[:, 0, 0] = inv_z
+    J_n[:, 1, 1] = inv_z
+    J_n[:, 0, 2] = -x * inv_z
+    J_n[:, 1, 2] = -y * inv_z
+    jacobian = K2[:, :2] @ J_d @ J_n
+    return points2d, jacobian
+
+
+def triangulate_points(
+    points2d: np.array,
+    camera_intrinsic_matrices: np.array,
+    extrinsics: np.array,
+    distortion_coefficients: np.array = None,
+    valid: np.array = None,
+):  # pylint: disable=invalid-name
+    # Justification:
+    # the variable names follow the mathematical expressions
+    """Triangulate points observed by K calibrated cameras (linear DLT).
+
+    All points are solved in one batch, e.g. the tracked markers of all
+    frames (see scripts/video/marker_writer.py). The pixels are undistorted
+    to normalized image coordinates first, which keeps the linear system
+    well conditioned.
+
+    Args:
+        points2d (array(K*...*2)): pixel coordinates of the same points in
+            every camera, e.g. (K, frames, markers, 2)
+        camera_intrinsic_matrices (array(K*3*3)): intrinsic matrix of every
+            camera
+        extrinsics (array(K*3*4)): [R|t] of every camera, transforming world
+            coordinates into its camera frame
+        distortion_coefficients (array(K*5)): distortion coefficients of
+            every camera, None if the pixels are undistorted already
+        valid (array(K*...)): whether a camera observed a point, observations
+            with False or NaN pixels are ignored
+
+    Returns:
+        array(...*3): 3d points in world frame, NaN for points that were
+            observed by fewer than two cameras
+    """
+    points2d = np.asarray(points2d, dtype=np.float64)
+    num_cameras = points2d.shape[0]
+    shape = points2d.shape[1:-1]
+    points2d = points2d.reshape(num_cameras, -1, 2)
+    num_points = points2d.shape[1]
+    weights = np.ones((num_cameras, num_points))
+    if valid is not None:
+        weights *= np.asarray(valid, dtype=bool).reshape(num_cameras, -1)
+    weights[np.isnan(points2d).any(axis=2)] = 0.0
+    points2d = np.where(weights[..., None] > 0, points2d, 0.0)
+
+    # A @ X = 0 with two rows per camera: x * P[2] - P[0], y * P[2] - P[1].
+    A = np.empty((num_points, 2 * num_cameras, 4))
+    for idx in range(num_cameras):
+        if distortion_coefficients is None:
+            K_inv = np.linalg.inv(camera_intrinsic_matrices[idx])
+            normalized = points2d[idx] @ K_inv[:2, :2].T + K_inv[:2, 2]
+        else:
+            normalized = cv2.undistortPoints(
+                points2d[idx][:, None, :],
+                np.asarray(camera_intrinsic_matrices[idx], dtype=np.float64),
+                np.asarray(distortion_coefficients[idx], dtype=np.float64),
+            )[:, 0, :]
+        P = np.asarray(extrinsics[idx], dtype=np.float64)
+        weight = weights[idx, :, None]
+        A[:, 2 * idx] = weight * (normalized[:, :1] * P[2] - P[0])
+        A[:, 2 * idx + 1] = weight * (normalized[:, 1:] * P[2] - P[1])
+
+    # With X = (x, y, z, 1) the least squares solution of A @ X = 0 solves
+    # the 3x3 normal equations, which is much faster than an SVD per point.
+    M = np.swapaxes(A, 1, 2) @ A
+    unobserved = np.count_nonzero(weights, axis=0) < 2
+    M[unobserved] = np.eye(4)
+    points3d = np.linalg.solve(M[:, :3, :3], -M[:, :3, 3:])[:, :, 0]
+    points3d[unobserved] = np.nan
+    return points3d.reshape(shape + (3,))
+
+
 def project_points_to_plane(
     points3d: np.array, center: np.array, S: np.array
 ):  # pylint: disable=invalid-name too-many-locals
@@ -0,0 +1,331 @@
+"""Lightweight stage timing for scripts and acquisition loops.
+
+Code is instrumented once with named stages and profiling is switched on
+when needed, e.g. with the ``--profile`` flag of the scripts:
+
+    with profiling.timer("decode"):
+        samples = decoder.feed(data)
+
+    @profiling.timed("poll")
+    def poll():
+        ...
+
+    with profiling.session(args.profile, "track_markers"):
+        main_loop()
+
+While profiling is disabled ``timer`` returns a shared no-op context manager
+and ``timed`` functions call through after a single flag check, so the
+instrumentation can stay in hot loops. While enabled, every stage keeps
+count, total, min, max and a histogram with logarithmic buckets (constant
+memory for any run length), and the individual intervals are kept for a
+Chrome trace (chrome://tracing or https://ui.perfetto.dev) up to a limit.
+``session`` prints a summary table and writes the trace when it ends.
+
+Times are time.monotonic_ns(), the clock of the sample timestamps (see
+common.Clock), so traces can be related to recorded data. This module only
+uses the standard library to keep the startup of the scripts short.
+"""
+
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+from common import get_datetime_str
+
+# Durations below 8 ns have one bucket each, every octave above is split
+# into 4 buckets, so quantiles are estimated within 25%.
+NUM_BUCKETS = 62 * 4
+MAX_TRACE_EVENTS = 1000000
+PROFILE_HELP = "Print stage timings and write a Chrome trace on exit."
+
+
+class _State:  # pylint: disable=too-few-public-methods
+    """Global on/off switch, an attribute lookup is the cheapest check."""
+
+    enabled = False
+
+
+_STATE = _State()
+
+
+def _bucket(duration_ns: int) -> int:
+    """Return the histogram bucket of a duration."""
+    bits = duration_ns.bit_length()
+    if bits <= 3:
+        return duration_ns
+    return min(
+        (bits - 2) * 4 + ((duration_ns >> (bits - 3)) & 3), NUM_BUCKETS - 1
+    )
+
+
+def _bucket_range(bucket: int):
+    """Return the lower and upper bound of a bucket in ns."""
+    if bucket < 8:
+        return bucket, bucket + 1
+    shift = bucket // 4 - 1
+    return (4 + bucket % 4) << shift, (5 + bucket % 4) << shift
+
+
+class StageStats:
+    """Statistics of the durations of one stage."""
+
+    __slots__ = ("count", "total_ns", "min_ns", "max_ns", "buckets")
+
+    def __init__(self):
+        """Create empty statistics."""
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+        self.buckets = [0] * NUM_BUCKETS
+
+    def add(self, duration_ns: int):
+        """Add one duration."""
+        self.count += 1
+        self.total_ns += duration_ns
+        if self.min_ns is None or duration_ns < self.min_ns:
+            self.min_ns = duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+        self.buckets[_bucket(duration_ns)] += 1
+
+    def quantile(self, fraction: float) -> float:
+        """Estimate a quantile in ns by interpolating within its bucket."""
+        if self.count == 0:
+            return 0.0
+        target = fraction * self.count
+        cumulative = 0
+        for bucket, count in enumerate(self.buckets):
+            if count and cumulative + count >= target:
+                lower, upper = _bucket_range(bucket)
+                value = lower + (upper - lower) * (target - cumulative) / count
+                return min(max(value, self.min_ns), self.max_ns)
+            cumulative += count
+        return float(self.max_ns)
+
+
+class Profiler:
+    """Collects the stage durations of all threads."""
+
+    def __init__(self, max_events: int = MAX_TRACE_EVENTS):
+        """Create an empty profiler.
+
+        Args:
+            max_events (int): Intervals kept for the Chrome trace, the
+                statistics include all intervals.
+        """
+        self.max_events = max_events
+        self.stages = {}
+        self.events = []
+        self.num_dropped_events = 0
+        self.time_start_ns = time.monotonic_ns()
+        self._lock = threading.Lock()
+
+    def record(self, name: str, start_ns: int, duration_ns: int):
+        """Record one interval of stage name."""
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = StageStats()
+            stats.add(duration_ns)
+            if len(self.events) < self.max_events:
+                self.events.append(
+                    (name, start_ns, duration_ns, threading.get_ident())
+                )
+            else:
+                self.num_dropped_events += 1
+
+    def reset(self):
+        """Drop all recorded intervals."""
+        with self._lock:
+            self.stages = {}
+            self.events = []
+            self.num_dropped_events = 0
+            self.time_start_ns = time.monotonic_ns()
+
+    def summary(self) -> str:
+        """Return a table with the statistics of all stages in ms."""
+        elapsed_ns = max(time.monotonic_ns() - self.time_start_ns, 1)
+        header = (
+            f"{'stage':<28} {'count':>8} {'total':>10} {'%':>6} "
+            f"{'mean':>9} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}"
+        )
+        lines = [header, "-" * len(header)]
+        with self._lock:
+            stages = sorted(
+                self.stages.items(), key=lambda item: -item[1].total_ns
+            )
+        for name, stats in stages:
+            lines.append(
+                f"{name:<28} {stats.count:>8} {stats.total_ns * 1e-6:>10.1f} "
+                f"{100 * stats.total_ns / elapsed_ns:>6.1f} "
+                f"{stats.total_ns / stats.count * 1e-6:>9.3f} "
+                f"{stats.quantile(0.5) * 1e-6:>9.3f} "
+                f"{stats.quantile(0.9) * 1e-6:>9.3f} "
+                f"{stats.quantile(0.99) * 1e-6:>9.3f} "
+                f"{stats.max_ns * 1e-6:>9.3f}"
+            )
+        if self.num_dropped_events:
+            lines.append(
+                f"{self.num_dropped_events} intervals were not kept for the "
+                "trace"
+            )
+        lines.append(
+            f"times in ms, % of {elapsed_ns * 1e-9:.2f} s wall time "
+            "(stages of several threads can add up to more than 100%)"
+        )
+        return "\n".join(lines)
+
+    def export_chrome_trace(self, path: str):
+        """Write the recorded intervals as Chrome trace event JSON."""
+        pid = os.getpid()
+        thread_names = {
+            thread.ident: thread.name for thread in threading.enumerate()
+        }
+        with self._lock:
+            events = list(self.events)
+        trace = [
+            {
+                "name": name,
+                "ph": "X",
+                "ts": (start_ns - self.time_start_ns) * 1e-3,
+                "dur": duration_ns * 1e-3,
+                "pid": pid,
+                "tid": tid,
+            }
+            for name, start_ns, duration_ns, tid in events
+        ]
+        trace += [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": thread_names.get(tid, str(tid))},
+            }
+            for tid in {event[3] for event in events}
+        ]
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, file)
+
+
+PROFILER = Profiler()
+
+
+def enable():
+    """Start recording stages."""
+    _STATE.enabled = True
+
+
+def disable():
+    """Stop recording stages."""
+    _STATE.enabled = False
+
+
+def is_enabled() -> bool:
+    """Return whether stages are recorded."""
+    return _STATE.enabled
+
+
+class _Timer:
+    """Context manager that records the duration of its block."""
+
+    __slots__ = ("name", "start_ns")
+
+    def __init__(self, name: str):
+        """Create a timer for stage name."""
+        self.name = name
+        self.start_ns = 0
+
+    def __enter__(self):
+        """Start timing."""
+        self.start_ns = time.monotonic_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Record the duration, also if the block raised."""
+        end_ns = time.monotonic_ns()
+        PROFILER.record(self.name, self.start_ns, end_ns - self.start_ns)
+
+
+class _NullTimer:
+    """Context manager that does nothing, used while disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        """Do nothing."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Do nothing."""
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name: str):
+    """Return a context manager that records its block as stage name."""
+    return _Timer(name) if _STATE.enabled else _NULL_TIMER
+
+
+def timed(name: str = None):
+    """Decorate a function to record its calls as a stage.
+
+    Args:
+        name (str): Name of the stage, defaults to the qualified name of the
+            function.
+    """
+
+    def decorator(func):
+        stage = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _STATE.enabled:
+                return func(*args, **kwargs)
+            start_ns = time.monotonic_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                PROFILER.record(
+                    stage, start_ns, time.monotonic_ns() - start_ns
+                )
+
+        return wrapper
+
+    return decorator
+
+
+@contextlib.contextmanager
+def session(enabled: bool, name: str, trace_dir: str = "."):
+    """Profile the block if enabled, then print a summary and write a trace.
+
+    Args:
+        enabled (bool): Typically the value of the --profile flag.
+        name (str): Prefix of the trace file name.
+        trace_dir (str): Folder to write <name>_profile_<datetime>.json to.
+    """
+    if not enabled:
+        yield
+        return
+    PROFILER.reset()
+    enable()
+    try:
+        yield
+    finally:
+        disable()
+        print(PROFILER.summary())
+        path = os.path.join(
+            trace_dir, f"{name}_profile_{get_datetime_str()}.json"
+        )
+        PROFILER.export_chrome_trace(path)
+        print(f"Chrome trace saved to {path}")
+
+
+def add_argument(parser):
+    """Add the --profile flag to an argparse parser."""
+    parser.add_argument("--profile", action="store_true", help=PROFILE_HELP)
@@ -0,0 +1,268 @@
+"""Shared-memory ring buffer to fan out sensor samples to other processes.
+
+A ``SensorBus`` owns a ``multiprocessing.shared_memory`` block that holds a
+ring buffer of NumPy records (any structured dtype, e.g. timestamp + force).
+One acquisition process publishes into it, any number of controller, logger
+or visualizer processes attach a ``BusReader`` by name and read the records
+straight from shared memory, without pipes, sockets or serialization.
+
+Consistency uses a seqlock per slot: before a slot is written its sequence
+number is set to an odd value, afterwards to ``2 * (index + 1)`` where index
+is the total index of the record. A reader copies the sequence numbers, the
+records and the sequence numbers again, and keeps only the records whose
+sequence number did not change and matches the index it expected, so torn or
+overwritten records are detected and reported as lost. The writer never
+waits for readers, every reader keeps its own cursor.
+
+Memory layout of the block:
+    header: uint64 [write_count, capacity, itemsize, descr_length]
+    dtype description (repr of the NumPy descr, HEADER_DESCR_BYTES bytes)
+    sequence numbers: uint64 [capacity]
+    records: dtype [capacity]
+
+Note: the ordering of the stores relies on the strong memory ordering of
+x86-64. The 8 byte counters are written with single aligned stores.
+
+Example:
+    >>> bus = SensorBus.create("force", np.dtype([("t", "f8"), ("f", "f8")]))
+    >>> reader = BusReader("force")  # in another process
+    >>> records, num_lost = reader.read()
+"""
+
+import ast
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+HEADER_FIELDS = 4
+HEADER_DESCR_BYTES = 1024
+ALIGNMENT = 64
+
+# Buses created by this process, which shares its resource tracker with them.
+_CREATED_NAMES = set()
+
+
+def _layout(capacity: int, itemsize: int):
+    """Return the offsets of descr, sequence numbers, records and the size."""
+    descr_offset = HEADER_FIELDS * 8
+    seq_offset = descr_offset + HEADER_DESCR_BYTES
+    data_offset = seq_offset + capacity * 8
+    data_offset += -data_offset % ALIGNMENT
+    return (
+        descr_offset,
+        seq_offset,
+        data_offset,
+        data_offset + capacity * itemsize,
+    )
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing block without taking over its cleanup."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, **{"track": False})
+    block = shared_memory.SharedMemory(name=name)
+    if name not in _CREATED_NAMES:
+        # Before Python 3.13 every attaching process registers the block with
+        # its resource tracker, which would unlink it when the reader exits.
+        # pylint: disable=import-outside-toplevel, protected-access
+        from multiprocessing import resource_tracker
+
+        resource_tracker.unregister(block._name, "shared_memory")
+    return block
+
+
+class _BusView:  # pylint: disable=too-few-public-methods
+    """NumPy views onto a shared-memory bus block."""
+
+    def __init__(self, block: shared_memory.SharedMemory):
+        """Map header, sequence numbers and records of block."""
+        self.block = block
+        self.header = np.ndarray(
+            (HEADER_FIELDS,), dtype=np.uint64, buffer=block.buf
+        )
+        capacity, itemsize, descr_length = (int(v) for v in self.header[1:])
+        descr_offset, seq_offset, data_offset, _ = _layout(capacity, itemsize)
+        descr = bytes(
+            block.buf[descr_offset : descr_offset + descr_length]
+        ).decode()
+        self.dtype = np.lib.format.descr_to_dtype(ast.literal_eval(descr))
+        self.capacity = capacity
+        self.seq = np.ndarray(
+            (capacity,), dtype=np.uint64, buffer=block.buf, offset=seq_offset
+        )
+        self.records = np.ndarray(
+            (capacity,), dtype=self.dtype, buffer=block.buf, offset=data_offset
+        )
+
+    def release(self):
+        """Drop the views so that the block can be closed."""
+        self.header = self.seq = self.records = None
+        self.block.close()
+
+
+class SensorBus:
+    """Writer side of a shared-memory ring buffer of sensor records."""
+
+    def __init__(self, view: _BusView, owner: bool):
+        """Use SensorBus.create to create a bus."""
+        self._view = view
+        self._owner = owner
+        self.name = view.block.name
+        self.dtype = view.dtype
+        self.capacity = view.capacity
+
+    @classmethod
+    def create(cls, name: str, dtype: np.dtype, capacity: int = 65536):
+        """Create a new bus.
+
+        Args:
+            name (str): Name readers use to attach, None for a random name.
+            dtype (np.dtype): Dtype of the records.
+            capacity (int): Number of records kept in the ring buffer.
+        """
+        dtype = np.dtype(dtype)
+        descr = repr(np.lib.format.dtype_to_descr(dtype)).encode()
+        if len(descr) > HEADER_DESCR_BYTES:
+            raise ValueError(f"dtype {dtype} is too complex for the header")
+        descr_offset, _, _, size = _layout(capacity, dtype.itemsize)
+        block = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray(
+            (HEADER_FIELDS,), dtype=np.uint64, buffer=block.buf
+        )
+        header[:] = (0, capacity, dtype.itemsize, len(descr))
+        block.buf[descr_offset : descr_offset + len(descr)] = descr
+        del header
+        _CREATED_NAMES.add(block.name)
+        view = _BusView(block)
+        view.seq[:] = 0
+        return cls(view, owner=True)
+
+    @property
+    def write_count(self) -> int:
+        """Total number of records published so far."""
+        return int(self._view.header[0])
+
+    def publish(self, records: np.array):
+        """Append records to the ring buffer.
+
+        Args:
+            records (array(N,)): Records with the dtype of the bus.
+        """
+        records = np.asarray(records, dtype=self.dtype).reshape(-1)
+        total = len(records)
+        if total == 0:
+            return
+        view = self._view
+        start = int(view.header[0])
+        # Records that would be overwritten within this call are skipped.
+        records = records[-self.capacity :]
+        first_index = start + total - len(records)
+        indices = np.arange(first_index, start + total, dtype=np.uint64)
+        slots = indices % np.uint64(self.capacity)
+        view.seq[slots] = 2 * indices + 1
+        view.records[slots] = records
+        view.seq[slots] = 2 * indices + 2
+        view.header[0] = start + total
+
+    def close(self):
+        """Unmap the bus and remove it if this process created it."""
+        block = self._view.block
+        self._view.release()
+        if self._owner:
+            block.unlink()
+            _CREATED_NAMES.discard(block.name)
+
+    def __enter__(self):
+        """Return the bus itself."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close the bus."""
+        self.close()
+
+
+class BusReader:
+    """Reader side of a SensorBus, with its own cursor."""
+
+    def __init__(self, name: str, from_start: bool = False):
+        """Attach to a bus by name.
+
+        Args:
+            name (str): Name of the bus.
+            from_start (bool): Also read the records that are already in the
+                ring buffer, otherwise only records published from now on.
+        """
+        self._view = _BusView(_attach(name))
+        self.dtype = self._view.dtype
+        self.capacity = self._view.capacity
+        self.cursor = 0 if from_start else int(self._view.header[0])
+
+    def read(self, max_records: int = None):
+        """Return the records published since the last read.
+
+        Args:
+            max_records (int): Return at most this many records, the oldest
+                unread ones first.
+
+        Returns:
+            tuple: records (array(N,)) and the number of records that were
+                overwritten by the writer before they could be read.
+        """
+        view = self._view
+        end = int(view.header[0])
+        start = max(self.cursor, end - self.capacity)
+        if max_records is not None:
+            end = min(end, start + max_records)
+        num_lost = start - self.cursor
+        if end <= start:
+            self.cursor = max(self.cursor, start)
+            return np.empty(0, dtype=self.dtype), num_lost
+
+        indices = np.arange(start, end, dtype=np.uint64)
+        slots = indices % np.uint64(self.capacity)
+        seq_before = view.seq[slots]
+        records = view.records[slots]
+        seq_after = view.seq[slots]
+        valid = (seq_before == seq_after) & (seq_before == 2 * indices + 2)
+        if not valid.all():
+            records = records[valid]
+            num_lost += int(np.count_nonzero(~valid))
+        self.cursor = end
+        return records, num_lost
+
+    def wait(self, timeout: float = None, poll_interval: float = 0.0005):
+        """Wait until new records are available and read them.
+
+        Returns:
+            tuple: Same as read, empty records if the timeout expired.
+        """
+        time_end = None if timeout is None else time.monotonic() + timeout
+        while int(self._view.header[0]) <= self.cursor:
+            if time_end is not None and time.monotonic() >= time_end:
+                break
+            time.sleep(poll_interval)
+        return self.read()
+
+    def close(self):
+        """Detach from the bus."""
+        self._view.release()
+
+    def __enter__(self):
+        """Return the reader itself."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Detach from the bus."""
+        self.close()
+
+
+if __name__ == "__main__":
+    # Print the record rate of a bus: python sensor_bus.py <name>
+    with BusReader(sys.argv[1]) as monitor:
+        print(f"Monitoring bus {sys.argv[1]} with dtype {monitor.dtype}")
+        while True:
+            time.sleep(1.0)
+            new_records, lost = monitor.read()
+            print(f"{len(new_records)} records/s, {lost} lost")
@@ -0,0 +1,442 @@
+"""Align timestamped sensor streams and resample them onto a common timeline.
+
+Force gauge readings, IMU samples and video frames are stamped by different
+clocks at different rates. This module provides:
+
+- ``ClockEstimator`` / ``fit_clock``: offset and drift of a source clock
+  (e.g. a sensor's own sample counter or the video position) relative to
+  the host clock, from pairs of source and host arrival timestamps.
+- ``estimate_lag``: constant offset between two streams without common
+  timestamps, by cross-correlating two signals of the same motion (e.g. the
+  marker speed from track_markers and the gyro magnitude of the IMU).
+- ``interpolate_linear`` / ``interpolate_slerp``: vectorized resampling of
+  values and of orientation quaternions.
+- ``StreamAligner``: resamples chunks of all streams onto one fixed-rate
+  timeline as they arrive, keeping only the samples needed to interpolate
+  the next chunk, so that sessions of any length are aligned in constant
+  memory.
+
+All times are float seconds, convert the integer nanosecond timestamps of
+the acquisition classes with common.ns_to_sec first. Quaternions are (N, 4)
+arrays, the component order does not matter for interpolation as long as it
+is consistent.
+
+Example:
+    >>> aligner = StreamAligner(period=0.01)
+    >>> aligner.add_stream("force")
+    >>> aligner.add_stream("quat", kind=SLERP, clock=fit_clock(src, host))
+    >>> for timeline, values in align_chunks(chunks, aligner):
+    ...     print(timeline[0], values["force"].shape, values["quat"].shape)
+"""
+
+import numpy as np
+
+LINEAR = "linear"
+SLERP = "slerp"
+KINDS = (LINEAR, SLERP)
+
+
+class ClockModel:  # pylint: disable=too-few-public-methods
+    """Affine map from a source clock to the reference clock.
+
+    t_reference = t_source + offset + drift * (t_source - origin)
+    """
+
+    def __init__(
+        self, offset: float = 0.0, drift: float = 0.0, origin: float = 0.0
+    ):
+        """Create the model, the identity by default.
+
+        Args:
+            offset (float): Reference minus source time at origin.
+            drift (float): Rate difference of the clocks, e.g. 1e-5 if the
+                source clock is 10 ppm slow.
+            origin (float): Source time the offset refers to.
+        """
+        self.offset = offset
+        self.drift = drift
+        self.origin = origin
+
+    def to_reference(self, times: np.array) -> np.array:
+        """Convert source timestamps to the reference clock."""
+        times = np.asarray(times, dtype=np.float64)
+        return times + self.offset + self.drift * (times - self.origin)
+
+    def __repr__(self):
+        """Return offset and drift in readable units."""
+        return (
+            f"ClockModel(offset={self.offset:.6f} s, "
+            f"drift={self.drift * 1e6:.2f} ppm, origin={self.origin:.3f})"
+        )
+
+
+class ClockEstimator:
+    """Incrementally estimate a ClockModel from timestamp pairs.
+
+    The host stamps a sample when it arrives, i.e. its source time mapped to
+    the host clock plus a transport and scheduling delay that is never
+    negative. The smallest delay of every window is therefore the best
+    estimate of the pure clock difference, and a line fitted through these
+    minima gives offset and drift unaffected by queueing jitter. Only one
+    value per window is kept, so memory grows with the session duration
+    divided by the window, not with the number of samples.
+    """
+
+    def __init__(self, window: float = 1.0):
+        """Create an estimator.
+
+        Args:
+            window (float): Length of the windows in source seconds.
+        """
+        self.window = window
+        self.origin = None
+        self._min_delay = {}
+
+    def update(self, source_times: np.array, reference_times: np.array):
+        """Add pairs of source timestamps and host arrival timestamps."""
+        source_times = np.asarray(source_times, dtype=np.float64)
+        delays = np.asarray(reference_times, dtype=np.float64) - source_times
+        if len(source_times) == 0:
+            return self
+        if self.origin is None:
+            self.origin = float(source_times[0])
+        bins = np.floor((source_times - self.origin) / self.window)
+        order = np.lexsort((delays, bins))
+        bins = bins[order]
+        first = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+        for key, idx in zip(bins[first].astype(int), order[first]):
+            stored = self._min_delay.get(key)
+            if stored is None or delays[idx] < stored[1]:
+                self._min_delay[key] = (source_times[idx], delays[idx])
+        return self
+
+    @property
+    def model(self) -> ClockModel:
+        """Return the ClockModel fitted to the data so far."""
+        if not self._min_delay:
+            return ClockModel()
+        points = np.array(list(self._min_delay.values()))
+        if len(points) < 2:
+            return ClockModel(points[0, 1], 0.0, self.origin)
+        drift, offset = np.polyfit(points[:, 0] - self.origin, points[:, 1], 1)
+        return ClockModel(offset, drift, self.origin)
+
+
+def fit_clock(
+    source_times: np.array, reference_times: np.array, window: float = 1.0
+) -> ClockModel:
+    """Estimate the clock model of a stream, see ClockEstimator."""
+    return ClockEstimator(window).update(source_times, reference_times).model
+
+
+def _bracket(times: np.array, timeline: np.array, max_gap: float = None):
+    """Return the bracketing indices, fractions and validity of timeline.
+
+    times must contain at least one sample.
+    """
+    last = len(times) - 1
+    idx = np.searchsorted(times, timeline, side="right") - 1
+    valid = (idx >= 0) & (timeline <= times[last])
+    idx = np.clip(idx, 0, max(last - 1, 0))
+    idx_next = np.minimum(idx + 1, last)
+    span = times[idx_next] - times[idx]
+    if max_gap is not None:
+        valid &= span <= max_gap
+    fraction = np.divide(
+        timeline - times[idx],
+        span,
+        out=np.zeros(len(timeline)),
+        where=span > 0,
+    )
+    return idx, idx_next, np.clip(fraction, 0.0, 1.0), valid
+
+
+def interpolate_linear(
+    times: np.array,
+    values: np.array,
+    timeline: np.array,
+    max_gap: float = None,
+) -> np.array:
+    """Linearly interpolate values at the timeline.
+
+    Args:
+        times (array(N,)): Increasing timestamps of the samples.
+        values (array(N,) or array(N, D)): Samples.
+        timeline (array(M,)): Times to interpolate at.
+        max_gap (float): Times between samples further apart than this
+            are treated as a dropout.
+
+    Returns:
+        array(M,) or array(M, D): Interpolated values, NaN outside the
+            samples and in dropouts.
+    """
+    timeline = np.asarray(timeline, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    if len(times) == 0:
+        return np.full((len(timeline),) + values.shape[1:], np.nan)
+    idx, idx_next, fraction, valid = _bracket(times, timeline, max_gap)
+    fraction = fraction.reshape((-1,) + (1,) * (values.ndim - 1))
+    result = values[idx] * (1.0 - fraction) + values[idx_next] * fraction
+    result[~valid] = np.nan
+    return result
+
+
+def interpolate_slerp(
+    times: np.array,
+    quats: np.array,
+    timeline: np.array,
+    max_gap: float = None,
+) -> np.array:
+    """Spherically interpolate unit quaternions at the timeline.
+
+    Args:
+        times (array(N,)): Increasing timestamps of the samples.
+        quats (array(N, 4)): Unit quaternions.
+        timeline (array(M,)): Times to interpolate at.
+        max_gap (float): See interpolate_linear.
+
+    Returns:
+        array(M, 4): Interpolated unit quaternions, NaN outside the samples
+            and in dropouts.
+    """
+    timeline = np.asarray(timeline, dtype=np.float64)
+    quats = np.asarray(quats, dtype=np.float64)
+    if len(times) == 0:
+        return np.full((len(timeline), 4), np.nan)
+    idx, idx_next, fraction, valid = _bracket(times, timeline, max_gap)
+    start = quats[idx]
+    end = quats[idx_next]
+    dot = np.einsum("ij,ij->i", start, end)
+    # q and -q are the same rotation, take the shorter arc.
+    end = np.where((dot < 0)[:, None], -end, end)
+    dot = np.clip(np.abs(dot), 0.0, 1.0)
+    angle = np.arccos(dot)
+    sin_angle = np.sin(angle)
+    # Fall back to linear interpolation for (nearly) identical rotations.
+    small = sin_angle < 1e-6
+    safe_sin = np.where(small, 1.0, sin_angle)
+    weight_start = np.where(
+        small, 1.0 - fraction, np.sin((1.0 - fraction) * angle) / safe_sin
+    )
+    weight_end = np.where(small, fraction, np.sin(fraction * angle) / safe_sin)
+    result = weight_start[:, None] * start + weight_end[:, None] * end
+    result /= np.linalg.norm(result, axis=1, keepdims=True)
+    result[~valid] = np.nan
+    return result
+
+
+def estimate_lag(
+    times_a: np.array,
+    signal_a: np.array,
+    times_b: np.array,
+    signal_b: np.array,
+    max_lag: float,
+    period: float = 0.005,
+) -> float:
+    """Estimate the constant lag between two streams of the same motion.
+
+    Both signals are resampled at period, normalized and cross-correlated
+    with an FFT. The peak is refined with a parabola to sub-sample
+    precision.
+
+    Args:
+        times_a, signal_a (array(N,)): Reference stream.
+        times_b, signal_b (array(K,)): Stream whose clock is off.
+        max_lag (float): Largest lag searched, in seconds.
+        period (float): Resampling period in seconds.
+
+    Returns:
+        float: lag such that times_b + lag is on the clock of stream a.
+    """
+    timeline = np.arange(
+        min(times_a[0], times_b[0]), max(times_a[-1], times_b[-1]), period
+    )
+    resampled = []
+    for times, signal in ((times_a, signal_a), (times_b, signal_b)):
+        values = interpolate_linear(times, signal, timeline)
+        values -= np.nanmean(values)
+        values /= np.nanstd(values) or 1.0
+        resampled.append(np.nan_to_num(values))
+    size = 2 * len(timeline)
+    correlation = np.fft.irfft(
+        np.fft.rfft(resampled[0], size)
+        * np.conj(np.fft.rfft(resampled[1], size)),
+        size,
+    )
+    max_shift = int(round(max_lag / period))
+    shifts = np.arange(-max_shift, max_shift + 1)
+    window = correlation[shifts % size]
+    peak = int(np.argmax(window))
+    offset = 0.0
+    if 0 < peak < len(window) - 1:
+        left, center, right = window[peak - 1 : peak + 2]
+        denominator = left - 2 * center + right
+        if denominator != 0:
+            offset = 0.5 * (left - right) / denominator
+    return (shifts[peak] + offset) * period
+
+
+class _Stream:  # pylint: disable=too-few-public-methods
+    """Buffered samples of one stream of a StreamAligner."""
+
+    def __init__(self, kind: str, clock: ClockModel, max_gap: float):
+        """Create an empty stream."""
+        self.kind = kind
+        self.clock = clock
+        self.max_gap = max_gap
+        self.times = np.empty(0)
+        self.values = None
+        self.first_time = None
+
+    def resample(self, timeline: np.array) -> np.array:
+        """Interpolate the buffered samples at timeline."""
+        if self.kind == SLERP:
+            return interpolate_slerp(
+                self.times, self.values, timeline, self.max_gap
+            )
+        return interpolate_linear(
+            self.times, self.values, timeline, self.max_gap
+        )
+
+    def discard_before(self, time: float):
+        """Drop samples not needed to interpolate at time or later."""
+        keep = max(np.searchsorted(self.times, time, side="right") - 1, 0)
+        self.times = self.times[keep:]
+        self.values = self.values[keep:]
+
+
+class StreamAligner:
+    """Resample chunks of several streams onto a common fixed-rate timeline.
+
+    Push chunks of each stream in any interleaving with push, then pop
+    returns the part of the timeline that all streams have covered so far.
+    The timeline starts at the latest first sample of all streams (or at
+    start) and has one point every period.
+    """
+
+    def __init__(
+        self, period: float, start: float = None, max_gap: float = None
+    ):
+        """Create an aligner without streams.
+
+        Args:
+            period (float): Period of the common timeline in seconds.
+            start (float): First time of the timeline in reference seconds.
+            max_gap (float): Default dropout threshold of the streams, see
+                interpolate_linear.
+        """
+        self.period = period
+        self.start = start
+        self.max_gap = max_gap
+        self._streams = {}
+        self._next_index = 0
+
+    def add_stream(
+        self,
+        name: str,
+        kind: str = LINEAR,
+        clock: ClockModel = None,
+        max_gap: float = None,
+    ):
+        """Register a stream.
+
+        Args:
+            name (str): Key of the stream in the results of pop.
+            kind (str): "linear" or "slerp" for (N, 4) quaternions.
+            clock (ClockModel): Maps the stream's timestamps to the
+                reference clock, None if they already are.
+            max_gap (float): Dropout threshold, defaults to the aligner's.
+        """
+        if kind not in KINDS:
+            raise ValueError(f"Unknown kind {kind}, use {KINDS}")
+        self._streams[name] = _Stream(
+            kind,
+            clock or ClockModel(),
+            self.max_gap if max_gap is None else max_gap,
+        )
+
+    def push(self, name: str, times: np.array, values: np.array):
+        """Append a chunk of increasing timestamps and values to a stream."""
+        stream = self._streams[name]
+        if len(times) == 0:
+            return
+        times = stream.clock.to_reference(times)
+        values = np.asarray(values, dtype=np.float64)
+        if stream.values is None:
+            stream.values = values[:0]
+            stream.first_time = times[0]
+        stream.times = np.concatenate([stream.times, times])
+        stream.values = np.concatenate([stream.values, values])
+
+    def _timeline_until(self, end: float) -> np.array:
+        """Return the not yet emitted timeline points up to end."""
+        if self.start is None:
+            self.start = max(s.first_time for s in self._streams.values())
+        last_index = int(np.floor((end - self.start) / self.period + 1e-9))
+        indices = np.arange(self._next_index, last_index + 1)
+        return self.start + indices * self.period
+
+    def _resample(self, timeline: np.array):
+        """Resample all streams at timeline and drop unneeded samples."""
+        values = {
+            name: stream.resample(timeline)
+            for name, stream in self._streams.items()
+        }
+        self._next_index += len(timeline)
+        next_time = self.start + self._next_index * self.period
+        for stream in self._streams.values():
+            stream.discard_before(next_time)
+        return timeline, values
+
+    def _empty(self):
+        """Return an empty result."""
+        return np.empty(0), {
+            name: np.empty((0, 4) if stream.kind == SLERP else (0,))
+            for name, stream in self._streams.items()
+        }
+
+    def pop(self):
+        """Resample the part of the timeline covered by all streams.
+
+        Returns:
+            tuple: timeline (array(M,)) and a dict of the resampled values
+                of every stream (array(M,) or array(M, D)).
+        """
+        streams = self._streams.values()
+        if not streams or any(s.values is None for s in streams):
+            return self._empty()
+        timeline = self._timeline_until(min(s.times[-1] for s in streams))
+        if len(timeline) == 0:
+            return self._empty()
+        return self._resample(timeline)
+
+    def flush(self):
+        """Resample the rest of the timeline, NaN where a stream ended."""
+        streams = [s for s in self._streams.values() if s.values is not None]
+        if not streams or len(streams) < len(self._streams):
+            return self._empty()
+        timeline = self._timeline_until(max(s.times[-1] for s in streams))
+        if len(timeline) == 0:
+            return self._empty()
+        return self._resample(timeline)
+
+
+def align_chunks(chunks, aligner: StreamAligner):
+    """Push chunks into aligner and yield the resampled parts.
+
+    Args:
+        chunks: Iterable of (name, times, values) chunks, e.g. read in
+            blocks from memory-mapped logs.
+        aligner (StreamAligner): Aligner with all streams added.
+
+    Yields:
+        tuple: timeline and values, see StreamAligner.pop.
+    """
+    for name, times, values in chunks:
+        aligner.push(name, times, values)
+        timeline, resampled = aligner.pop()
+        if len(timeline):
+            yield timeline, resampled
+    timeline, resampled = aligner.flush()
+    if len(timeline):
+        yield timeline, resampled